@@ -0,0 +1,181 @@
+"""Benchmark: one-read file processing vs. the previous multi-read pipeline.
+
+Usage:
+    python benchmarks/bench_process_file.py [ROOT] [--repeat 3]
+
+Runs ASTGenerator._process_file and the previous implementation (two
+stats, a text-mode pass to count lines, then a second read for parsing)
+over every code file under ROOT, checks that both produce the same
+entries, and reports for each the file system calls it makes (opens and
+stats, and read syscalls from /proc/self/io where available), wall time
+and peak traced memory.
+
+The change removes I/O calls, which is what the counts show: one open,
+one stat and one read per file instead of two opens, two stats and four
+or more reads. Wall time over a warm page cache does not move (0.95x to
+1.05x), since parsing dominates; the saving only shows where each call
+is expensive, such as cold caches or network file systems.
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from kodo.ast_generator import (  # noqa: E402
+    TREE_SITTER_AVAILABLE, ASTGenerator, PythonAnalyzer, get_analyzer
+)
+
+EMPTY = {'imports': [], 'classes': [], 'functions': [], 'variables': []}
+
+
+def legacy_process_file(generator: ASTGenerator, filepath: Path) -> dict:
+    """The previous _process_file, reading each file two or three times."""
+    file_data = {
+        'mtime': filepath.stat().st_mtime,
+        'size': filepath.stat().st_size,
+        'language': generator.language_map.get(filepath.suffix, 'unknown'),
+        'error': None,
+        'line_count': 0
+    }
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            file_data['line_count'] = sum(1 for _ in f)
+        if filepath.suffix == '.py':
+            try:
+                analyzer = PythonAnalyzer()
+                analyzer.visit(ast.parse(filepath.read_text(encoding='utf-8')))
+                file_data.update({'imports': analyzer.imports, 'classes': analyzer.classes,
+                                  'functions': analyzer.functions, 'variables': analyzer.variables})
+            except Exception as e:
+                file_data.update(EMPTY, error=f"Python AST parsing failed: {str(e)}")
+        elif TREE_SITTER_AVAILABLE and filepath.suffix in generator.language_map:
+            file_data.update(get_analyzer(generator.language_map[filepath.suffix]).analyze(filepath))
+        else:
+            file_data.update(EMPTY)
+    except Exception as e:
+        file_data.update(EMPTY, error=str(e))
+    return file_data
+
+
+class CallCounter:
+    """Counts opens, stats and read syscalls made while it is active.
+
+    Opens come from the "open" audit event and stats from wrapping
+    os.stat (which pathlib's stat() calls); reads are the kernel's count.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.opens = 0
+        self.stats = 0
+        sys.addaudithook(self._audit)
+
+    def _audit(self, event, args):
+        # builtins.open, io.open and os.open all raise "open"
+        if self.active and event == 'open':
+            self.opens += 1
+
+    @staticmethod
+    def read_syscalls() -> int:
+        """Read syscalls of this process so far, -1 if /proc is unavailable"""
+        try:
+            with open('/proc/self/io') as f:
+                for line in f:
+                    if line.startswith('syscr:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return -1
+
+    def count(self, process, files) -> dict:
+        """Calls made while processing every file once"""
+        real_stat = os.stat
+
+        def counting_stat(*args, **kwargs):
+            if self.active:
+                self.stats += 1
+            return real_stat(*args, **kwargs)
+
+        self.opens = self.stats = 0
+        os.stat = counting_stat
+        reads_before = self.read_syscalls()
+        self.active = True
+        try:
+            for path in files:
+                process(path)
+        finally:
+            self.active = False
+            os.stat = real_stat
+        reads_after = self.read_syscalls()
+        reads = reads_after - reads_before if reads_before >= 0 else -1
+        return {'opens': self.opens, 'stats': self.stats, 'reads': reads}
+
+
+def best_time(process, files, repeat: int) -> float:
+    """Best wall time of processing every file, over ``repeat`` runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in files:
+            process(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(process, files) -> int:
+    """Peak traced bytes while processing files one at a time."""
+    # Results are discarded, so the peak is the per-file working set
+    tracemalloc.start()
+    for path in files:
+        process(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', nargs='?', default='.', type=Path)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    # Bypass the parse cache so both sides really parse every file
+    generator = ASTGenerator(str(args.root), parse_cache=False)
+    files = [path for path, _ in generator._walk_code_files()]
+    total_bytes = sum(os.stat(path).st_size for path in files)
+
+    def legacy(path):
+        return legacy_process_file(generator, path)
+
+    if [legacy(path) for path in files] != [generator._process_file(path) for path in files]:
+        sys.exit("Mismatch between legacy and one-read processing")
+
+    counter = CallCounter()
+    legacy_calls = counter.count(legacy, files)
+    new_calls = counter.count(generator._process_file, files)
+
+    # Alternate the two implementations so warm-up and cache effects even out
+    legacy_time = new_time = float('inf')
+    for _ in range(args.repeat):
+        legacy_time = min(legacy_time, best_time(legacy, files, 1))
+        new_time = min(new_time, best_time(generator._process_file, files, 1))
+    legacy_peak = peak_memory(legacy, files)
+    new_peak = peak_memory(generator._process_file, files)
+
+    print(f"files: {len(files):,}, bytes: {total_bytes:,}")
+    print(f"{'':12} {'opens':>7} {'stats':>7} {'reads':>7} {'time (ms)':>10} {'peak (KiB)':>11}")
+    for name, calls, elapsed, peak in (('legacy', legacy_calls, legacy_time, legacy_peak),
+                                       ('one-read', new_calls, new_time, new_peak)):
+        reads = calls['reads'] if calls['reads'] >= 0 else 'n/a'
+        print(f"{name:12} {calls['opens']:7} {calls['stats']:7} {reads:>7} "
+              f"{elapsed * 1000:10.1f} {peak / 1024:11.1f}")
+    print(f"speedup: {legacy_time / new_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
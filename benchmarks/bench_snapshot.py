@@ -0,0 +1,212 @@
+"""Benchmark: snapshot generation on synthetic repositories of increasing size.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--files 1000 10000 100000] [--languages python=5,javascript=3,go=2]
+                                        [--depth 4] [--ignore-density 0.1] [--seed 0] [--jobs 1]
+                                        [--repeat 3] [--output results.json]
+                                        [--compare baseline.json] [--threshold 10]
+
+For each file count a deterministic repository is generated with
+synthetic_repo.py (kept under --workdir so later runs reuse it), then a
+fresh interpreter times ASTGenerator.generate_snapshot, _build_indexes,
+save_ast_snapshot and load_ast_snapshot and records the peak RSS of the
+run, worker processes included. Times are the best of --repeat runs.
+
+Results are written as JSON; with --compare, phase times are compared
+with a previous results file for the same configurations, and the exit
+status is 1 if any phase is slower by more than --threshold percent.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic_repo import config_key, generate_repo, parse_languages  # noqa: E402
+
+PHASES = ['generate_snapshot', 'build_indexes', 'save_snapshot', 'load_snapshot']
+
+# Marks a synthetic repository whose generation completed
+COMPLETE_MARKER = '.bench-complete'
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process and its waited-for children."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(repo: Path, jobs: int, parse_cache: bool) -> Dict:
+    """Time each phase once on an existing repository (run in a fresh process)."""
+    from kodo.ast_generator import ASTGenerator, load_ast_snapshot, save_ast_snapshot
+
+    generator = ASTGenerator(str(repo), jobs=jobs, parse_cache=parse_cache)
+    phases = {}
+
+    start = time.perf_counter()
+    snapshot = generator.generate_snapshot()
+    phases['generate_snapshot'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generator._build_indexes(snapshot)
+    phases['build_indexes'] = time.perf_counter() - start
+
+    snapshot_path = repo.parent / f"{repo.name}-snapshot.json"
+    start = time.perf_counter()
+    save_ast_snapshot(snapshot, snapshot_path)
+    phases['save_snapshot'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_ast_snapshot(snapshot_path)
+    phases['load_snapshot'] = time.perf_counter() - start
+    snapshot_bytes = snapshot_path.stat().st_size
+    snapshot_path.unlink()
+
+    files = snapshot['summary']['total_files']
+    source_bytes = sum(entry.get('size', 0) for entry in snapshot['files'].values())
+    return {
+        'phases': phases,
+        'files': files,
+        'source_bytes': source_bytes,
+        'snapshot_bytes': snapshot_bytes,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_config(config: Dict, workdir: Path, jobs: int, parse_cache: bool, repeat: int) -> Dict:
+    """Generate (or reuse) the repository for a configuration and benchmark it."""
+    repo = workdir / f"repo-{config_key(config)}"
+    if not (repo / COMPLETE_MARKER).exists():
+        if repo.exists():
+            sys.exit(f"{repo} is incomplete; delete it and run again")
+        print(f"Generating {config['files']:,} files in {repo}...", file=sys.stderr)
+        generate_repo(repo, config['files'], config['languages'], config['depth'],
+                      config['ignore_density'], config['seed'])
+        (repo / COMPLETE_MARKER).touch()
+
+    runs = []
+    for _ in range(repeat):
+        command = [sys.executable, __file__, '--measure', str(repo), '--jobs', str(jobs)]
+        if parse_cache:
+            command.append('--parse-cache')
+        result = subprocess.run(command, capture_output=True, text=True, cwd=REPO_ROOT)
+        if result.returncode != 0:
+            sys.exit(f"Benchmark run failed:\n{result.stderr[-2000:]}")
+        runs.append(json.loads(result.stdout))
+
+    best = dict(runs[0])
+    best['phases'] = {phase: min(run['phases'][phase] for run in runs) for phase in PHASES}
+    rss = [run['peak_rss_mb'] for run in runs if run['peak_rss_mb'] is not None]
+    best['peak_rss_mb'] = max(rss) if rss else None
+
+    elapsed = best['phases']['generate_snapshot']
+    best['throughput'] = {
+        'files_per_s': best['files'] / elapsed if elapsed else None,
+        'mb_per_s': best['source_bytes'] / (1024 * 1024) / elapsed if elapsed else None,
+    }
+    best['config'] = dict(config, jobs=jobs, parse_cache=parse_cache)
+    return best
+
+
+def result_key(result: Dict) -> str:
+    return config_key(result['config'])
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> bool:
+    """Print phase times against a baseline to stderr; True if any phase regressed."""
+    previous = {result_key(result): result for result in baseline.get('results', [])}
+    regressed = False
+    print(f"\n{'files':>8} {'phase':18} {'baseline (s)':>12} {'current (s)':>12} {'change':>8}",
+          file=sys.stderr)
+    for result in results:
+        base = previous.get(result_key(result))
+        if base is None:
+            print(f"{result['config']['files']:>8,} (no baseline for this configuration)", file=sys.stderr)
+            continue
+        for phase in PHASES:
+            old, new = base['phases'][phase], result['phases'][phase]
+            change = (new - old) / old * 100 if old else 0.0
+            flag = '  REGRESSION' if change > threshold else ''
+            regressed = regressed or bool(flag)
+            print(f"{result['config']['files']:>8,} {phase:18} {old:12.3f} {new:12.3f} "
+                  f"{change:+7.1f}%{flag}", file=sys.stderr)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[1000, 10000],
+                        help="File counts to benchmark, e.g. 1000 10000 100000")
+    parser.add_argument('--languages', default='python=5,javascript=3,go=2',
+                        help="Language mix as name=weight pairs")
+    parser.add_argument('--depth', type=int, default=4, help="Maximum directory depth")
+    parser.add_argument('--ignore-density', type=float, default=0.1,
+                        help="Ignored files per indexed file")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=1, help="Worker processes for parsing")
+    parser.add_argument('--parse-cache', action='store_true',
+                        help="Use the user-level parse cache (off: every file is parsed)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per configuration")
+    parser.add_argument('--workdir', type=Path, default=Path(tempfile.gettempdir()) / 'kodo-bench',
+                        help="Where synthetic repositories are kept")
+    parser.add_argument('--output', type=Path, help="Write results JSON here (default: stdout)")
+    parser.add_argument('--compare', type=Path, help="Previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Percent slowdown reported as a regression")
+    parser.add_argument('--measure', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.jobs, args.parse_cache)))
+        return
+
+    languages = parse_languages(args.languages)
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for files in args.files:
+        config = {'files': files, 'languages': languages, 'depth': args.depth,
+                  'ignore_density': args.ignore_density, 'seed': args.seed}
+        result = run_config(config, args.workdir, args.jobs, args.parse_cache, args.repeat)
+        results.append(result)
+        print(f"{files:>8,} files: {result['phases']['generate_snapshot']:.2f}s snapshot, "
+              f"{result['throughput']['files_per_s']:,.0f} files/s, "
+              f"{result['throughput']['mb_per_s']:.2f} MB/s, "
+              f"peak RSS {result['peak_rss_mb'] or 0:.0f} MB", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        if compare(results, json.loads(args.compare.read_text()), args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Micro-benchmark: single-pass tree-sitter extraction vs. one pass per node type.
+
+Usage:
+    python benchmarks/bench_tree_sitter_extraction.py [--language javascript] [--repeat 20] [FILE ...]
+
+Without files, a synthetic source is generated for the chosen language.
+Both implementations are run on the same parsed trees and their output is
+checked for equality before timings are reported.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from kodo.ast_generator import (  # noqa: E402
+    DEFAULT_NODE_TYPES, TREE_SITTER_AVAILABLE, TREE_SITTER_NODE_TYPES, TreeSitterAnalyzer
+)
+
+SYNTHETIC_SOURCES = {
+    'javascript': '''import {{ helper{i} }} from "./helpers/h{i}";
+import * as mod{i} from "mod{i}";
+
+class Widget{i} extends Base {{
+  constructor(a, b) {{ super(a); this.b = b; }}
+  render() {{ const items = this.items.map((x) => x * {i}); return items; }}
+  update(value) {{ let next = value + 1; return () => next; }}
+}}
+
+function build{i}(config) {{
+  var total = 0;
+  for (const key of Object.keys(config)) {{ total += config[key]; }}
+  const compute = (n) => n * total;
+  return compute({i});
+}}
+''',
+    'go': '''import (
+    "fmt"
+    "strings{i}"
+)
+
+type Service{i} struct {{ name string }}
+
+func (s *Service{i}) Run{i}(input string) string {{
+    var result = strings.ToUpper(input)
+    return fmt.Sprintf("%s-%d", result, {i})
+}}
+
+func helper{i}(a int, b int) int {{ var c = a + b; return c }}
+''',
+}
+
+
+def legacy_extract(analyzer: TreeSitterAnalyzer, root, source_bytes: bytes) -> dict:
+    """The previous implementation: one recursive tree search per node type."""
+    def find_nodes(node, node_type):
+        if node.type == node_type:
+            yield node
+        for child in node.children:
+            yield from find_nodes(child, node_type)
+
+    result = {}
+    for category in ('imports', 'classes', 'functions', 'variables'):
+        entries = []
+        node_types = TREE_SITTER_NODE_TYPES[category].get(analyzer.language, DEFAULT_NODE_TYPES[category])
+        for node_type in node_types:
+            for node in find_nodes(root, node_type):
+                if category == 'imports':
+                    entries.append({"name": analyzer._get_node_text(node, source_bytes),
+                                    "line": node.start_point[0] + 1})
+                    continue
+                name_node = analyzer._find_first_child_by_type(node, 'identifier')
+                if not name_node:
+                    continue
+                if category == 'variables':
+                    entries.append({"name": analyzer._get_node_text(name_node, source_bytes),
+                                    "line": node.start_point[0] + 1})
+                else:
+                    entries.append({"name": analyzer._get_node_text(name_node, source_bytes),
+                                    "start_line": node.start_point[0] + 1,
+                                    "end_line": node.end_point[0] + 1,
+                                    "type": node_type})
+        result[category] = entries
+    return result
+
+
+def time_it(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', type=Path)
+    parser.add_argument('--language', default='javascript', choices=sorted(SYNTHETIC_SOURCES))
+    parser.add_argument('--units', type=int, default=200, help="Synthetic code units per source")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if not TREE_SITTER_AVAILABLE:
+        sys.exit("tree-sitter-language-pack is required for this benchmark")
+
+    analyzer = TreeSitterAnalyzer(args.language)
+    if args.files:
+        sources = [path.read_bytes() for path in args.files]
+    else:
+        template = SYNTHETIC_SOURCES[args.language]
+        sources = [''.join(template.format(i=i) for i in range(args.units)).encode('utf-8')]
+
+    trees = [(analyzer.parser.parse(source).root_node, source) for source in sources]
+
+    for root, source in trees:
+        if legacy_extract(analyzer, root, source) != analyzer._extract(root, source):
+            sys.exit("Mismatch between legacy and single-pass extraction")
+
+    legacy = time_it(lambda: [legacy_extract(analyzer, root, source) for root, source in trees], args.repeat)
+    single = time_it(lambda: [analyzer._extract(root, source) for root, source in trees], args.repeat)
+    total_bytes = sum(len(source) for source in sources)
+
+    print(f"language: {analyzer.language}, sources: {len(sources)}, bytes: {total_bytes:,}")
+    print(f"per-node-type passes: {legacy * 1000:8.2f} ms")
+    print(f"single pass:          {single * 1000:8.2f} ms")
+    print(f"speedup:              {legacy / single:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
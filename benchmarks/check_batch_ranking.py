@@ -0,0 +1,67 @@
+"""Batch ranking check: search_batch must rank exactly like search.
+
+Usage:
+    python benchmarks/check_batch_ranking.py [--files 3000] [--limit 20 50] [--seed 0]
+
+Builds the search index of a synthetic repository (generated with
+synthetic_repo.py in a scratch directory), then ranks a set of queries
+with SearchIndex.search_batch and with search() one by one, and fails
+(exit status 1) unless every ranking is identical, scores and ties
+included. The NumPy path is what is checked, so NumPy must be installed
+(exit status 2 otherwise).
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic_repo import generate_repo  # noqa: E402
+
+# Rare and common terms, prefixes, and queries with nothing in common
+QUERIES = [
+    "handler process", "Handler12 process_12", "helper value", "config limit",
+    "module", "modu", "proc items total", "import os", "render request handler",
+    "helper_7", "nothing matches zzzz", "Handler", "limit config process helper module",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=3000, help="Files in the generated repository")
+    parser.add_argument('--limit', type=int, nargs='+', default=[20, 50], help="Ranking lengths to compare")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from kodo.ast_generator import ASTGenerator
+    from kodo.search_index import SearchIndex, _numpy
+
+    if _numpy() is None:
+        print("NumPy is not installed; install kodo[fast] to check the batch path")
+        sys.exit(2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / 'repo'
+        generate_repo(repo, files=args.files, seed=args.seed)
+        snapshot = ASTGenerator(str(repo), parse_cache=False).generate_snapshot()
+    index = SearchIndex.build(snapshot['files'].items())
+
+    failed = False
+    for limit in args.limit + [None]:
+        batch = index.search_batch(QUERIES, limit)
+        for query, ranking in zip(QUERIES, batch):
+            expected = index.search(query, limit)
+            if ranking != expected:
+                first = next((i for i, (a, b) in enumerate(zip(ranking, expected)) if a != b),
+                             min(len(ranking), len(expected)))
+                print(f"FAIL: {query!r} (limit {limit}) differs at rank {first}: "
+                      f"{ranking[first:first + 2]} != {expected[first:first + 2]}")
+                failed = True
+        print(f"limit {limit}: {len(QUERIES)} queries compared")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
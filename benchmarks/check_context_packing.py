@@ -0,0 +1,73 @@
+"""Context packing check: token reports must match the packed context.
+
+Usage:
+    python benchmarks/check_context_packing.py [--budget 12000]
+
+Copies the kodo package into a scratch project, initialises its context
+and, in one process, formats the context of several queries that share
+files but render them differently (matching chunks for one query, the
+whole file when it is named). Fails (exit status 1) if the tokens the
+packer reports for a query differ from the tokens of the context it
+returned, or if a context is over budget, as happens when a count cached
+for one rendering of a file is reused for another.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# The same files, found by symbol for some and named for others
+QUERIES = [
+    "snapshot_id",
+    "show kodo/search_index.py",
+    "how does search_batch rank files",
+    "explain kodo/context_packer.py truncate_to_tokens",
+    "snapshot_id",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=int, default=12000, help="max_context_tokens to pack into")
+    args = parser.parse_args()
+
+    from kodo.context_manager import ContextManager
+    from kodo.context_packer import estimate_tokens
+
+    failed = False
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp)
+        shutil.copytree(REPO_ROOT / 'kodo', project / 'kodo',
+                        ignore=shutil.ignore_patterns('__pycache__'))
+        os.chdir(project)
+        try:
+            context_manager = ContextManager(project)
+            if not context_manager.initialize_context():
+                sys.exit("Could not initialise the scratch project")
+            with open(context_manager.rules_path, 'a', encoding='utf-8') as f:
+                f.write(f"\nmax_context_tokens={args.budget}\n")
+
+            for query in QUERIES:
+                context = context_manager.get_context_for_query(query)
+                reported = context_manager.last_context_usage['used']
+                actual = estimate_tokens(context)
+                print(f"{query!r}: reported {reported:,} tokens, packed {actual:,}")
+                if reported != actual:
+                    print(f"  FAIL: report is off by {actual - reported:+,} tokens")
+                    failed = True
+                if actual > args.budget:
+                    print(f"  FAIL: over the {args.budget:,} token budget")
+                    failed = True
+        finally:
+            os.chdir(cwd)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Git enumeration check: use_git must produce the same snapshot as the walk.
+
+Usage:
+    python benchmarks/check_git_snapshot.py [--files 400] [--seed 0]
+                                            [--languages python=5,javascript=3,go=2]
+
+Generates a deterministic repository with synthetic_repo.py in a scratch
+directory, commits it to a new git repository (leaving a few files
+untracked), and builds its snapshot by walking the tree and from the git
+index, with the parse cache off. Fails (exit status 1) if the snapshots
+differ in anything but their timestamps and the git metadata (HEAD and
+changed paths), or if the files were listed in a different order. The
+first differences are listed.
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.check_parallel_snapshot import MAX_REPORTED, differences, without_timestamps  # noqa: E402
+from benchmarks.synthetic_repo import generate_repo, parse_languages  # noqa: E402
+
+# Only recorded when the files come from git
+GIT_META_KEYS = ('git_head', 'git_dirty')
+
+# Every this many generated files, one is left untracked
+UNTRACKED_EVERY = 10
+
+
+def git(repo: Path, *args: str):
+    subprocess.run(['git', '-c', 'user.name=kodo', '-c', 'user.email=kodo@localhost', *args],
+                   cwd=repo, check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=400, help="Files in the generated repository")
+    parser.add_argument('--languages', default='python=5,javascript=3,go=2',
+                        help="Relative weight of each language")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from kodo.ast_generator import ASTGenerator
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / 'repo'
+        generate_repo(repo, files=args.files, languages=parse_languages(args.languages), seed=args.seed)
+        git(repo, 'init', '-q')
+        git(repo, 'add', '-A')
+        sources = sorted(path for path in repo.rglob('module*') if path.is_file())
+        git(repo, 'rm', '-q', '--cached', *[str(path) for path in sources[::UNTRACKED_EVERY]])
+        git(repo, 'commit', '-q', '-m', 'synthetic repository')
+        walked = ASTGenerator(str(repo), parse_cache=False).generate_snapshot()
+        listed = ASTGenerator(str(repo), use_git=True, parse_cache=False).generate_snapshot()
+
+    failed = False
+    if 'git_head' not in listed['meta']:
+        print("FAIL: the git snapshot did not come from the git index")
+        failed = True
+    for key in GIT_META_KEYS:
+        listed['meta'].pop(key, None)
+    found = differences(without_timestamps(walked), without_timestamps(listed))
+    print(f"{len(walked['files'])} files, walk vs git: {len(found)} differences")
+    for difference in found[:MAX_REPORTED]:
+        print(f"  {difference}")
+    if list(walked['files']) != list(listed['files']):
+        print("FAIL: files are listed in a different order")
+        failed = True
+    if not walked['files']:
+        print("FAIL: no files were indexed")
+        failed = True
+    sys.exit(1 if failed or found else 0)
+
+
+if __name__ == '__main__':
+    main()
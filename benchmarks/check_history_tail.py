@@ -0,0 +1,61 @@
+"""History tail check: HistoryLog.recent returns whole entries only.
+
+Usage:
+    python benchmarks/check_history_tail.py [--window 2000]
+
+Writes a history log in a scratch directory whose newest rotated segment
+ends with an entry larger than the read window, followed by a few small
+entries in history.md, and reads it back with HistoryLog.recent. Fails
+(exit status 1) if the result starts inside an entry, i.e. a fragment of
+the large entry was prepended, or if any small entry is missing.
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from kodo.history_log import ENTRY_MARKER, HistoryLog  # noqa: E402
+
+HEADER = "# Development History\n"
+
+
+def entry(title: str, body: str) -> str:
+    return f"{ENTRY_MARKER}{title}\n{body}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--window', type=int, default=2000, help="Bytes asked of recent()")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(Path(tmp) / 'history.md', Path(tmp) / 'history', segment_bytes=0)
+        log.start(HEADER)
+        log.append(entry("Small entry before", "short"))
+        log.append(entry("Large entry", "x" * (args.window * 3)))
+        log.rotate()
+        small = [entry(f"Small entry {n}", f"body {n}") for n in range(3)]
+        for text in small:
+            log.append(text)
+
+        text = log.recent(args.window) or ''
+        print(f"{len(text)} chars read with a {args.window} byte window")
+        if not text.startswith(ENTRY_MARKER) and not text.startswith('# '):
+            print(f"FAIL: starts inside an entry: {text[:40]!r}")
+            failed = True
+        if 'xxxx' in text:
+            print("FAIL: a fragment of the entry larger than the window was included")
+            failed = True
+        for item in small:
+            if item not in text:
+                print(f"FAIL: missing {item.strip().splitlines()[0]!r}")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
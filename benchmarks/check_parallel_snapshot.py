@@ -0,0 +1,84 @@
+"""Parallel parsing check: jobs=N must produce the same snapshot as jobs=1.
+
+Usage:
+    python benchmarks/check_parallel_snapshot.py [--files 400] [--jobs 4] [--seed 0]
+                                                 [--languages python=5,javascript=3,go=2]
+
+Generates a deterministic repository with synthetic_repo.py in a scratch
+directory, builds its snapshot serially and with --jobs worker processes
+(with the parse cache off, so both really parse), and fails (exit status
+1) if the snapshots differ in anything but their created_at/updated_at
+timestamps. The first differences are listed.
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic_repo import generate_repo, parse_languages  # noqa: E402
+
+# Differ between any two runs
+TIMESTAMP_KEYS = {'created_at', 'updated_at'}
+
+# Differences listed on failure
+MAX_REPORTED = 20
+
+
+def without_timestamps(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: without_timestamps(item) for key, item in value.items() if key not in TIMESTAMP_KEYS}
+    if isinstance(value, list):
+        return [without_timestamps(item) for item in value]
+    return value
+
+
+def differences(serial: Any, parallel: Any, path: str = '') -> List[str]:
+    """Paths at which two JSON-like values differ"""
+    if isinstance(serial, dict) and isinstance(parallel, dict):
+        found = []
+        for key in sorted(set(serial) | set(parallel), key=str):
+            where = f"{path}/{key}"
+            if key not in serial or key not in parallel:
+                found.append(f"{where}: only with jobs={'1' if key in serial else 'N'}")
+            else:
+                found.extend(differences(serial[key], parallel[key], where))
+        return found
+    if serial != parallel:
+        return [f"{path or '/'}: {json.dumps(serial)[:80]} != {json.dumps(parallel)[:80]}"]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=400, help="Files in the generated repository")
+    parser.add_argument('--languages', default='python=5,javascript=3,go=2',
+                        help="Relative weight of each language")
+    parser.add_argument('--jobs', type=int, default=4, help="Worker processes of the parallel run")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from kodo.ast_generator import ASTGenerator
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / 'repo'
+        generate_repo(repo, files=args.files, languages=parse_languages(args.languages), seed=args.seed)
+        serial = ASTGenerator(str(repo), jobs=1, parse_cache=False).generate_snapshot()
+        parallel = ASTGenerator(str(repo), jobs=args.jobs, parse_cache=False).generate_snapshot()
+
+    found = differences(without_timestamps(serial), without_timestamps(parallel))
+    print(f"{len(serial['files'])} files, jobs=1 vs jobs={args.jobs}: {len(found)} differences")
+    for difference in found[:MAX_REPORTED]:
+        print(f"  {difference}")
+    if not serial['files']:
+        print("FAIL: no files were indexed")
+        sys.exit(1)
+    sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Startup budget check: `kodo status` must not pay for heavy imports.
+
+Usage:
+    python benchmarks/check_startup.py [--budget-ms 400] [--command status]
+
+Runs ``python -X importtime -m kodo.main <command>`` in a fresh interpreter
+and fails (exit status 1) if the total import time of the process exceeds
+the budget, or if any module that should be imported lazily
+(litellm, the tree-sitter language pack, the agent) was loaded. The
+slowest imports are listed to help track down a regression.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that only the commands using them may import
+LAZY_MODULES = ['litellm', 'tree_sitter_language_pack', 'kodo.agent.core', 'kodo.llm.providers']
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, bool]]:
+    """(module, self us, cumulative us, top level) per line of -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        # Nested imports are indented by two spaces per level
+        top_level = not fields[2].startswith('   ')
+        entries.append((fields[2].strip(), int(fields[0]), int(fields[1]), top_level))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=400.0,
+                        help="Maximum total import time of the command")
+    parser.add_argument('--command', default='status', help="kodo command to run")
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [str(REPO_ROOT), os.environ.get('PYTHONPATH')])))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'kodo.main', args.command],
+        capture_output=True, text=True, env=env, cwd=REPO_ROOT,
+    )
+    entries = parse_importtime(result.stderr)
+    if not entries:
+        sys.exit(f"No -X importtime output; the command failed:\n{result.stderr[-2000:]}")
+
+    # kodo.main runs as __main__, so its imports show up as top-level entries
+    total_ms = sum(total for _, _, total, top_level in entries if top_level) / 1000
+    imported = {module for module, _, _, _ in entries}
+    loaded = [module for module in LAZY_MODULES if module in imported]
+
+    print(f"kodo {args.command}: {total_ms:.1f} ms of imports (budget {args.budget_ms:.0f} ms)")
+    print("\nslowest imports (self time):")
+    for module, self_us, total_us, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {total_us / 1000:8.1f} ms cumulative  {module}")
+
+    failed = False
+    if loaded:
+        print(f"\nFAIL: imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nFAIL: startup import time over budget by {total_ms - args.budget_ms:.1f} ms")
+        failed = True
+    if result.returncode != 0:
+        print(f"\nFAIL: command exited with status {result.returncode}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""Deterministic synthetic repositories for snapshot benchmarks.
+
+Usage:
+    python benchmarks/synthetic_repo.py OUTPUT [--files 1000] [--languages python=5,javascript=3,go=2]
+                                               [--depth 4] [--ignore-density 0.1] [--seed 0]
+
+The same options and seed always produce byte-identical trees. ``--files``
+counts the files kodo should index; ``--ignore-density`` adds that fraction
+again as files excluded by .gitignore rules (build output, vendored
+dependencies, scratch files), spread over root and nested .gitignore files.
+"""
+import argparse
+import hashlib
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_LANGUAGES = {'python': 5, 'javascript': 3, 'go': 2}
+
+EXTENSIONS = {
+    'python': '.py', 'javascript': '.js', 'typescript': '.ts', 'go': '.go',
+    'rust': '.rs', 'java': '.java',
+}
+
+# One block per language; files repeat it a varying number of times
+TEMPLATES = {
+    'python': '''from {package} import module{other}
+import os
+
+
+class Handler{n}:
+    """Handle requests of kind {n}."""
+
+    def __init__(self, config):
+        self.config = config
+        self.limit = {n}
+
+    def process_{n}(self, items):
+        total = 0
+        for item in items:
+            total += item * self.limit
+        return module{other}.finish(total)
+
+
+def helper_{n}(value):
+    result = os.path.join(str(value), "{n}")
+    return result
+
+''',
+    'javascript': '''import {{ helper{other} }} from "./module{other}";
+const config{n} = require("config{n}");
+
+class Widget{n} {{
+  constructor(options) {{ this.options = options; this.size = {n}; }}
+  render() {{ return this.options.items.map((x) => x * this.size); }}
+}}
+
+function build{n}(input) {{
+  var total = 0;
+  for (const key of Object.keys(input)) {{ total += input[key]; }}
+  return helper{other}(total + {n});
+}}
+
+''',
+    'typescript': '''import {{ Service{other} }} from "./service{other}";
+
+interface Options{n} {{ name: string; size: number; }}
+
+class Service{n} {{
+  private options: Options{n};
+  constructor(options: Options{n}) {{ this.options = options; }}
+  run(values: number[]): number {{ return values.reduce((a, b) => a + b, {n}); }}
+}}
+
+function create{n}(name: string): Service{n} {{
+  const options = {{ name, size: {n} }};
+  return new Service{n}(options);
+}}
+
+''',
+    'go': '''import (
+\t"fmt"
+\t"strings"
+)
+
+type Store{n} struct {{
+\tname  string
+\tlimit int
+}}
+
+func (s *Store{n}) Get{n}(key string) string {{
+\tvar value = strings.ToUpper(key)
+\treturn fmt.Sprintf("%s-%d", value, s.limit)
+}}
+
+func helper{n}(a int, b int) int {{ var c = a + b; return c * {n} }}
+
+''',
+    'rust': '''use std::collections::HashMap;
+
+pub struct Cache{n} {{
+    entries: HashMap<String, u64>,
+}}
+
+impl Cache{n} {{
+    pub fn get_{n}(&self, key: &str) -> Option<u64> {{
+        let value = self.entries.get(key).copied();
+        value.map(|v| v + {n})
+    }}
+}}
+
+fn helper_{n}(a: u64) -> u64 {{ let b = a * {n}; b }}
+
+''',
+    'java': '''import java.util.List;
+
+class Processor{n} {{
+    private int limit = {n};
+
+    public int process{n}(List<Integer> items) {{
+        int total = 0;
+        for (int item : items) {{ total += item * limit; }}
+        return total;
+    }}
+}}
+
+''',
+}
+
+# Package prefix of Go and Java files (one per file, before the blocks)
+HEADERS = {
+    'go': 'package pkg{n}\n\n',
+    'java': 'package com.example.pkg{n};\n\n',
+}
+
+# (pattern, path builder) pairs for ignored files; each pattern is written
+# to a .gitignore and each builder makes a path the pattern excludes
+IGNORED_LAYOUTS = [
+    ('build/', lambda d, n, ext: f"{d}/build/out{n}{ext}"),
+    ('node_modules/', lambda d, n, ext: f"node_modules/dep{n % 50}/index{n}{ext}"),
+    ('*.generated{ext}', lambda d, n, ext: f"{d}/schema{n}.generated{ext}"),
+    ('scratch_*', lambda d, n, ext: f"{d}/scratch_{n}{ext}"),
+]
+
+
+def parse_languages(spec: str) -> Dict[str, float]:
+    """Parse a language mix such as 'python=5,javascript=3'."""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in TEMPLATES:
+            raise ValueError(f"Unknown language '{name}' (choose from {', '.join(TEMPLATES)})")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def config_key(config: Dict) -> str:
+    """Short stable hash identifying a generator configuration."""
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _directories(rng: random.Random, count: int, depth: int) -> List[str]:
+    """Directory paths up to ``depth`` levels deep with a moderate fan-out."""
+    dirs = ['src']
+    while len(dirs) < count:
+        parent = rng.choice(dirs)
+        if parent.count('/') + 1 >= depth:
+            continue
+        dirs.append(f"{parent}/pkg{len(dirs)}")
+    return dirs
+
+
+def _source(rng: random.Random, language: str, n: int, files: int, package: str) -> str:
+    blocks = rng.choice((1, 1, 2, 3, 5, 8))
+    parts = [HEADERS.get(language, '').format(n=n)]
+    for i in range(blocks):
+        other = rng.randrange(files)
+        parts.append(TEMPLATES[language].format(n=n * 10 + i, other=other, package=package))
+    return ''.join(parts)
+
+
+def generate_repo(root: Path, files: int = 1000, languages: Dict[str, float] = None,
+                  depth: int = 4, ignore_density: float = 0.1, seed: int = 0) -> Dict:
+    """Write a synthetic repository under root and return its statistics.
+
+    root must not exist yet or be empty. Returns the number of indexed
+    and ignored files and the bytes of indexed source.
+    """
+    languages = languages or DEFAULT_LANGUAGES
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    dirs = _directories(rng, max(1, files // 20), max(1, depth))
+    names, weights = zip(*sorted(languages.items()))
+
+    source_bytes = 0
+    for n in range(files):
+        directory = rng.choice(dirs)
+        language = rng.choices(names, weights)[0]
+        path = root / directory / f"module{n}{EXTENSIONS[language]}"
+        content = _source(rng, language, n, files, directory.replace('/', '.')).encode()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        source_bytes += len(content)
+
+    # Ignore rules go in the root .gitignore and in some nested ones
+    ignored = int(files * ignore_density)
+    gitignores: Dict[str, List[str]] = {}
+    for n in range(ignored):
+        pattern, build_path = IGNORED_LAYOUTS[n % len(IGNORED_LAYOUTS)]
+        language = rng.choices(names, weights)[0]
+        ext = EXTENSIONS[language]
+        directory = rng.choice(dirs)
+        owner = '' if pattern == 'node_modules/' or rng.random() < 0.5 else directory
+        rules = gitignores.setdefault(owner, [])
+        if pattern.format(ext=ext) not in rules:
+            rules.append(pattern.format(ext=ext))
+        path = root / build_path(directory, n, ext)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(_source(rng, language, n, files, 'ignored'))
+
+    for owner, rules in gitignores.items():
+        (root / owner / '.gitignore').write_text('\n'.join(rules) + '\n')
+
+    return {'files': files, 'ignored_files': ignored, 'source_bytes': source_bytes,
+            'directories': len(dirs)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', type=Path, help="Directory to create")
+    parser.add_argument('--files', type=int, default=1000, help="Files to index")
+    parser.add_argument('--languages', default='python=5,javascript=3,go=2',
+                        help="Language mix as name=weight pairs")
+    parser.add_argument('--depth', type=int, default=4, help="Maximum directory depth")
+    parser.add_argument('--ignore-density', type=float, default=0.1,
+                        help="Ignored files per indexed file")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.output.exists() and any(args.output.iterdir()):
+        parser.error(f"{args.output} is not empty")
+    stats = generate_repo(args.output, args.files, parse_languages(args.languages),
+                          args.depth, args.ignore_density, args.seed)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -70,10 +70,10 @@ class ExecutionPlan:
 class CodeAgent:
     """Intelligent Code Agent with planning, acting, and reflection capabilities"""
     
-    def __init__(self, llm_manager, project_root: Path):
+    def __init__(self, llm_manager, project_root: Path, context_manager: Optional[ContextManager] = None):
         self.llm_manager = llm_manager
         self.project_root = project_root
-        self.context_manager = ContextManager(project_root)
+        self.context_manager = context_manager or ContextManager(project_root)
         self.console = Console()
         
         # Agent state
@@ -289,6 +289,7 @@ IMPORTANT:
         self.console.print("\n[green]Execution phase...[/green]")
         
         success_count = 0
+        self._rank_plan_files()
         
         with Progress(
             SpinnerColumn(),
@@ -326,6 +327,13 @@ IMPORTANT:
             self.console.print(f"\n[yellow]Completed {success_count}/{len(self.current_plan.steps)} steps[/yellow]")
             return False
     
+    def _rank_plan_files(self):
+        """Rank relevant files for every step of the plan in one batch"""
+        steps = self.current_plan.steps
+        rankings = self.context_manager.rank_files_batch([step.target for step in steps])
+        for step, ranked in zip(steps, rankings):
+            step.metadata["ranked_files"] = ranked
+    
     def _execute_action(self, action: Action) -> ActionResult:
         """Execute a single action"""
         
@@ -417,10 +425,18 @@ Keep the analysis practical and actionable."""
     
     def _search_codebase_action(self, action: Action) -> ActionResult:
         """Execute a codebase search action"""
-        # Use context manager's search capabilities
-        context = self.context_manager.get_context_for_query(action.target)
-        
-        return ActionResult(True, output=f"Search results for '{action.target}': {len(context)} characters of context found")
+        # Ranked with the rest of the plan; rank here only if the step was added later
+        ranked = action.metadata.get("ranked_files")
+        if ranked is None:
+            ranked = self.context_manager.rank_files_batch([action.target])[0]
+        
+        self.memory[f"search_{action.target}"] = [path for path, _ in ranked]
+        if not ranked:
+            return ActionResult(True, output=f"Search results for '{action.target}': no matching files found")
+        
+        matches = ", ".join(f"{path} ({score:.1f})" for path, score in ranked)
+        return ActionResult(True, output=f"Search results for '{action.target}': {matches}",
+                            metadata={"files": [path for path, _ in ranked]})
     
     def _handle_action_failure(self, action: Action, result: ActionResult) -> bool:
         """Handle action failure and attempt recovery"""
@@ -489,7 +505,8 @@ Keep the analysis practical and actionable."""
         self.context_manager.log_interaction(
             query=f"Agent Goal: {self.current_plan.goal if self.current_plan else 'Unknown'}",
             response_summary=f"Agent session completed with {session_summary['steps_completed']}/{session_summary['total_steps']} successful steps",
-            files_involved=files_involved
+            files_involved=files_involved,
+            outcome=self.state.value
         )
     
     def get_session_summary(self) -> Dict[str, Any]:
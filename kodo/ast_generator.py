@@ -1,19 +1,114 @@
 import ast
 import os
 import json
+import functools
+import hashlib
+import importlib.util
+import itertools
+import stat as stat_module
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
-import fnmatch
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-try:
-    from tree_sitter_language_pack import get_language, get_parser
-    TREE_SITTER_AVAILABLE = True
-except ImportError:
+from kodo.file_filters import BINARY, FileFilter
+from kodo.git_index import GitRepository, to_snapshot_path
+from kodo.ignore import DEFAULT_IGNORE_PATTERNS, IgnoreMatcher
+from kodo.import_resolver import ImportResolver
+from kodo.parse_cache import ParseCache
+from kodo.profiling import PhaseProfiler
+
+# The language pack is imported when the first grammar is needed; checking
+# for it here keeps importing this module cheap
+TREE_SITTER_AVAILABLE = importlib.util.find_spec('tree_sitter_language_pack') is not None
+if not TREE_SITTER_AVAILABLE:
     print("Warning: tree-sitter-language-pack not found. Multi-language support will be limited.")
-    get_language = None
-    get_parser = None
-    TREE_SITTER_AVAILABLE = False
+
+# Bump when the per-file entry format changes so stale entries are not reused
+SNAPSHOT_VERSION = '2.2'
+
+# Bump when parser output changes so cached parse results are not reused
+ANALYZER_VERSION = '1'
+
+
+def _content_hash(data: bytes) -> str:
+    """Hash file contents for change detection."""
+    return hashlib.sha256(data).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _parser_id(language: Optional[str]) -> str:
+    """Identify the parser that produces a language's output (None = Python ast).
+
+    Part of every parse cache key, so results from another Python release
+    or grammar version are never reused.
+    """
+    import importlib.metadata
+
+    if language is None:
+        return f"python-ast:{sys.version_info[0]}.{sys.version_info[1]}:{ANALYZER_VERSION}"
+    try:
+        grammars = importlib.metadata.version('tree-sitter-language-pack')
+    except importlib.metadata.PackageNotFoundError:
+        grammars = 'unknown'
+    return f"tree-sitter:{language}:{grammars}:{ANALYZER_VERSION}"
+
+
+def read_file_bytes(filepath: Path, size: int) -> bytes:
+    """Read a whole file, normally in a single read call.
+
+    ``size`` comes from a stat the caller already has; reading one byte
+    more than that tells us whether we hit EOF without another syscall.
+    """
+    fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        data = os.read(fd, size + 1)
+        if len(data) <= size:
+            return data
+
+        # The file grew since it was stat-ed; read the rest
+        chunks = [data]
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
+def count_lines(data: bytes) -> int:
+    """Count lines the way iterating a text-mode file does.
+
+    Text mode splits on LF, CRLF and lone CR. LF-only files are counted on
+    the raw buffer; files containing CR are decoded first because dropped
+    invalid bytes can join a CR and LF into a single CRLF.
+    """
+    if b'\r' in data:
+        text = data.decode('utf-8', errors='ignore')
+        if not text:
+            return 0
+        newlines = text.count('\n') + text.count('\r') - text.count('\r\n')
+        return newlines + (0 if text[-1] in '\r\n' else 1)
+
+    # A trailing partial line only counts if something survives decoding
+    tail = data[data.rfind(b'\n') + 1:]
+    partial = bool(tail) and bool(tail.decode('utf-8', errors='ignore'))
+    return data.count(b'\n') + (1 if partial else 0)
+
+
+def walk_order(path: str) -> List[Tuple[int, str]]:
+    """Sort key putting '/'-separated relative paths in walk order.
+
+    The walker visits each directory's files by name, then its
+    subdirectories by name, depth first; git-listed paths sorted by this
+    key come out in the same order.
+    """
+    parts = path.split('/')
+    return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
 
 class PythonAnalyzer(ast.NodeVisitor):
     """Extracts key information from a Python AST."""
@@ -35,13 +130,17 @@ class PythonAnalyzer(ast.NodeVisitor):
     def visit_ImportFrom(self, node):
         if node.module:
             for alias in node.names:
-                self.imports.append({
+                entry = {
                     "name": f"{node.module}.{alias.name}",
                     "from": node.module,
                     "import": alias.name,
                     "alias": alias.asname,
                     "line": node.lineno
-                })
+                }
+                if node.level:
+                    # Relative import ("from ..pkg import x"), needed to resolve it
+                    entry["level"] = node.level
+                self.imports.append(entry)
         self.generic_visit(node)
 
     def visit_ClassDef(self, node):
@@ -84,144 +183,158 @@ class PythonAnalyzer(ast.NodeVisitor):
         return "unknown"
 
 
+# Node types extracted per language for each category, in output order
+TREE_SITTER_NODE_TYPES = {
+    'imports': {
+        'javascript': ['import_statement', 'import_clause'],
+        'typescript': ['import_statement', 'import_clause'],
+        'go': ['import_declaration', 'import_spec'],
+        'java': ['import_declaration'],
+        'rust': ['use_declaration'],
+        'c': ['preproc_include'],
+        'cpp': ['preproc_include']
+    },
+    'classes': {
+        'javascript': ['class_declaration'],
+        'typescript': ['class_declaration'],
+        'go': ['type_declaration'],
+        'java': ['class_declaration'],
+        'rust': ['struct_item', 'enum_item'],
+        'c': ['struct_specifier'],
+        'cpp': ['class_specifier', 'struct_specifier']
+    },
+    'functions': {
+        'javascript': ['function_declaration', 'method_definition', 'arrow_function'],
+        'typescript': ['function_declaration', 'method_definition', 'arrow_function'],
+        'go': ['function_declaration', 'method_declaration'],
+        'java': ['method_declaration'],
+        'rust': ['function_item'],
+        'c': ['function_definition'],
+        'cpp': ['function_definition']
+    },
+    'variables': {
+        'javascript': ['variable_declaration', 'lexical_declaration'],
+        'typescript': ['variable_declaration', 'lexical_declaration'],
+        'go': ['var_declaration'],
+        'java': ['variable_declarator'],
+        'rust': ['let_declaration'],
+        'c': ['declaration'],
+        'cpp': ['declaration']
+    }
+}
+
+# Fallback node types for languages without an explicit entry
+DEFAULT_NODE_TYPES = {
+    'imports': ['import_statement'],
+    'classes': ['class_declaration'],
+    'functions': ['function_declaration'],
+    'variables': ['variable_declaration']
+}
+
+
 class TreeSitterAnalyzer:
     """Enhanced Tree-sitter analyzer for multiple languages"""
     
     def __init__(self, language: str):
         self.language = language
-        self.parser = get_parser(language) if TREE_SITTER_AVAILABLE else None
+        self._parser = None
+        self._parser_error: Optional[str] = None
+
+        # (category, node type) pairs in output order
+        self.node_types = [
+            (category, node_type)
+            for category in ('imports', 'classes', 'functions', 'variables')
+            for node_type in TREE_SITTER_NODE_TYPES[category].get(language, DEFAULT_NODE_TYPES[category])
+        ]
         
+    @property
+    def parser(self):
+        """Tree-sitter parser, with the grammar loaded on first use."""
+        if self._parser is None and TREE_SITTER_AVAILABLE:
+            if self._parser_error is not None:
+                raise LookupError(self._parser_error)
+            try:
+                from tree_sitter_language_pack import get_parser
+                self._parser = get_parser(self.language)
+            except Exception as e:
+                # Remember the failure so unsupported grammars are not retried per file
+                self._parser_error = str(e)
+                raise LookupError(self._parser_error)
+        return self._parser
+
     def analyze(self, filepath: Path) -> Dict:
         """Analyze file using tree-sitter"""
-        if not self.parser:
+        try:
+            source_bytes = filepath.read_bytes()
+        except Exception as e:
+            return {"error": str(e), "imports": [], "classes": [], "functions": [], "variables": []}
+        return self.analyze_source(source_bytes)
+
+    def analyze_source(self, source_bytes: bytes) -> Dict:
+        """Analyze source that has already been read"""
+        if not TREE_SITTER_AVAILABLE:
             return {"imports": [], "classes": [], "functions": [], "variables": []}
             
         try:
-            source_bytes = filepath.read_bytes()
             tree = self.parser.parse(source_bytes)
-            
-            return {
-                "imports": self._extract_imports(tree.root_node, source_bytes),
-                "classes": self._extract_classes(tree.root_node, source_bytes),
-                "functions": self._extract_functions(tree.root_node, source_bytes),
-                "variables": self._extract_variables(tree.root_node, source_bytes)
-            }
+            return self._extract(tree.root_node, source_bytes)
         except Exception as e:
             return {"error": str(e), "imports": [], "classes": [], "functions": [], "variables": []}
 
-    def _extract_imports(self, node, source_bytes: bytes) -> List[Dict]:
-        """Extract import statements"""
-        imports = []
-        
-        # Language-specific import patterns
-        import_queries = {
-            'javascript': ['import_statement', 'import_clause'],
-            'typescript': ['import_statement', 'import_clause'],
-            'go': ['import_declaration', 'import_spec'],
-            'java': ['import_declaration'],
-            'rust': ['use_declaration'],
-            'c': ['preproc_include'],
-            'cpp': ['preproc_include']
-        }
-        
-        query_types = import_queries.get(self.language, ['import_statement'])
-        for query_type in query_types:
-            for child in self._find_nodes_by_type(node, query_type):
-                imports.append({
-                    "name": self._get_node_text(child, source_bytes),
-                    "line": child.start_point[0] + 1
-                })
-        
-        return imports
+    def _extract(self, root, source_bytes: bytes) -> Dict:
+        """Extract imports, classes, functions and variables in one traversal.
 
-    def _extract_classes(self, node, source_bytes: bytes) -> List[Dict]:
-        """Extract class definitions"""
-        classes = []
-        
-        class_queries = {
-            'javascript': ['class_declaration'],
-            'typescript': ['class_declaration'],
-            'go': ['type_declaration'],
-            'java': ['class_declaration'],
-            'rust': ['struct_item', 'enum_item'],
-            'c': ['struct_specifier'],
-            'cpp': ['class_specifier', 'struct_specifier']
-        }
-        
-        query_types = class_queries.get(self.language, ['class_declaration'])
-        for query_type in query_types:
-            for child in self._find_nodes_by_type(node, query_type):
-                name_node = self._find_first_child_by_type(child, 'identifier')
-                if name_node:
-                    classes.append({
-                        "name": self._get_node_text(name_node, source_bytes),
-                        "start_line": child.start_point[0] + 1,
-                        "end_line": child.end_point[0] + 1,
-                        "type": query_type
+        Matching nodes are bucketed by (category, node type) during a single
+        pre-order cursor walk, then emitted bucket by bucket so the result
+        has the same order as searching the tree once per node type.
+        """
+        buckets = {key: [] for key in self.node_types}
+        dispatch = {}
+        for category, node_type in self.node_types:
+            dispatch.setdefault(node_type, []).append(buckets[(category, node_type)])
+
+        cursor = root.walk()
+        walking = True
+        while walking:
+            targets = dispatch.get(cursor.node.type)
+            if targets:
+                for bucket in targets:
+                    bucket.append(cursor.node)
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    walking = False
+                    break
+
+        result = {"imports": [], "classes": [], "functions": [], "variables": []}
+        for (category, node_type), nodes in buckets.items():
+            entries = result[category]
+            for node in nodes:
+                if category == 'imports':
+                    entries.append({
+                        "name": self._get_node_text(node, source_bytes),
+                        "line": node.start_point[0] + 1
                     })
-        
-        return classes
+                    continue
 
-    def _extract_functions(self, node, source_bytes: bytes) -> List[Dict]:
-        """Extract function definitions"""
-        functions = []
-        
-        function_queries = {
-            'javascript': ['function_declaration', 'method_definition', 'arrow_function'],
-            'typescript': ['function_declaration', 'method_definition', 'arrow_function'],
-            'go': ['function_declaration', 'method_declaration'],
-            'java': ['method_declaration'],
-            'rust': ['function_item'],
-            'c': ['function_definition'],
-            'cpp': ['function_definition']
-        }
-        
-        query_types = function_queries.get(self.language, ['function_declaration'])
-        for query_type in query_types:
-            for child in self._find_nodes_by_type(node, query_type):
-                name_node = self._find_first_child_by_type(child, 'identifier')
-                if name_node:
-                    functions.append({
+                name_node = self._find_first_child_by_type(node, 'identifier')
+                if not name_node:
+                    continue
+                if category == 'variables':
+                    entries.append({
                         "name": self._get_node_text(name_node, source_bytes),
-                        "start_line": child.start_point[0] + 1,
-                        "end_line": child.end_point[0] + 1,
-                        "type": query_type
+                        "line": node.start_point[0] + 1
                     })
-        
-        return functions
-
-    def _extract_variables(self, node, source_bytes: bytes) -> List[Dict]:
-        """Extract variable declarations"""
-        variables = []
-        
-        var_queries = {
-            'javascript': ['variable_declaration', 'lexical_declaration'],
-            'typescript': ['variable_declaration', 'lexical_declaration'],
-            'go': ['var_declaration'],
-            'java': ['variable_declarator'],
-            'rust': ['let_declaration'],
-            'c': ['declaration'],
-            'cpp': ['declaration']
-        }
-        
-        query_types = var_queries.get(self.language, ['variable_declaration'])
-        for query_type in query_types:
-            for child in self._find_nodes_by_type(node, query_type):
-                name_node = self._find_first_child_by_type(child, 'identifier')
-                if name_node:
-                    variables.append({
+                else:
+                    entries.append({
                         "name": self._get_node_text(name_node, source_bytes),
-                        "line": child.start_point[0] + 1
+                        "start_line": node.start_point[0] + 1,
+                        "end_line": node.end_point[0] + 1,
+                        "type": node_type
                     })
-        
-        return variables
 
-    def _find_nodes_by_type(self, node, node_type: str):
-        """Find all nodes of a specific type"""
-        if node.type == node_type:
-            yield node
-        for child in node.children:
-            yield from self._find_nodes_by_type(child, node_type)
+        return result
 
     def _find_first_child_by_type(self, node, node_type: str):
         """Find first child node of a specific type"""
@@ -235,46 +348,79 @@ class TreeSitterAnalyzer:
         return source_bytes[node.start_byte:node.end_byte].decode('utf-8', errors='ignore')
 
 
+class AnalyzerPool:
+    """Language-keyed cache of tree-sitter analyzers.
+
+    Parsers are not safe to share between threads, and a parser inherited
+    through fork must not be used by the child, so each (process, thread)
+    gets its own set of analyzers. Grammars load on first use.
+    """
+
+    def __init__(self):
+        self._pid = os.getpid()
+        self._local = threading.local()
+
+    def get(self, language: str) -> TreeSitterAnalyzer:
+        """Return this thread's analyzer for a language, creating it lazily."""
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._local = threading.local()
+
+        analyzers = getattr(self._local, 'analyzers', None)
+        if analyzers is None:
+            analyzers = self._local.analyzers = {}
+
+        analyzer = analyzers.get(language)
+        if analyzer is None:
+            analyzer = analyzers[language] = TreeSitterAnalyzer(language)
+        return analyzer
+
+
+_analyzer_pool = AnalyzerPool()
+
+
+def get_analyzer(language: str) -> TreeSitterAnalyzer:
+    """Return the pooled tree-sitter analyzer for a language."""
+    return _analyzer_pool.get(language)
+
+
 class ASTGenerator:
-    def __init__(self, root_path: str):
+    # Number of files sent to a worker process at a time in parallel mode
+    batch_size = 64
+
+    def __init__(self, root_path: str, jobs: int = 1, hash_contents: bool = False,
+                 follow_symlinks: bool = False, use_git: bool = False, parse_cache: bool = True,
+                 file_filter: Optional[FileFilter] = None, profiler: Optional[PhaseProfiler] = None):
         self.root_path = Path(root_path).absolute()
+
+        # Worker processes used for parsing; 0 means one per CPU
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+
+        # Store a content hash per file so touched-but-unchanged files are reused
+        self.hash_contents = hash_contents
         
-        # Enhanced ignore patterns including virtual environments
-        self.ignore_patterns = [
-            # Version control
-            '**/.git/**', '**/.svn/**', '**/.hg/**',
-            
-            # Python virtual environments
-            '**/*venv*/**', '**/.venv/**', '**/venv/**', '**/env/**',
-            '**/virtualenv*/**', '**/VIRTUAL_ENV/**', '**/.virtualenv/**',
-            
-            # UV virtual environments (new Python package manager)
-            '**/.uv/**', '**/uv.lock', '**/uv-cache/**',
-            
-            # Node.js
-            '**/node_modules/**', '**/npm-debug.log*', '**/yarn-debug.log*',
-            '**/yarn-error.log*', '**/.npm/**', '**/.yarn/**',
-            
-            # Compiled/build outputs
-            '**/__pycache__/**', '**/*.pyc', '**/*.pyo', '**/*.pyd',
-            '**/dist/**', '**/build/**', '**/target/**', '**/out/**',
-            '**/*.egg-info/**', '**/.tox/**',
-            
-            # IDEs and editors
-            '**/.vscode/**', '**/.idea/**', '**/*.swp', '**/*.swo',
-            '**/.DS_Store', '**/Thumbs.db',
-            
-            # Dependencies and packages
-            '**/vendor/**', '**/deps/**', '**/lib/**',
-            '**/packages/**', '**/bower_components/**',
-            
-            # Logs and temporary files
-            '**/logs/**', '**/*.log', '**/tmp/**', '**/temp/**',
-            '**/cache/**', '**/.cache/**',
-            
-            # Our own context files
-            '**/.kodo_context/**'
-        ]
+        # Descend into symlinked directories (loops are detected and skipped)
+        self.follow_symlinks = follow_symlinks
+        
+        # In git work trees, list files from the index and detect changes
+        # with git instead of walking and stat-ing the whole tree
+        self.use_git = use_git
+        
+        # Reuse parser output for content already parsed in any project
+        self.use_parse_cache = parse_cache
+        self._parse_cache: Optional[ParseCache] = None
+        
+        # Size caps and binary/minified/generated detection; skipped files
+        # are recorded without being parsed
+        self.file_filter = file_filter or FileFilter()
+        
+        # Phase timings for --profile; disabled unless one is passed in
+        self.profiler = profiler or PhaseProfiler(enabled=False)
+        
+        # Built-in ignore patterns (.gitignore syntax); the project's
+        # .gitignore and .kodoignore files are applied on top of these
+        self.ignore_patterns = list(DEFAULT_IGNORE_PATTERNS)
+        self._ignore_matcher: Optional[IgnoreMatcher] = None
         
         # Enhanced language support
         self.language_map = {
@@ -306,51 +452,106 @@ class ASTGenerator:
             '.dart': 'dart', '.lua': 'lua'
         }
 
+    @property
+    def parse_cache(self) -> Optional[ParseCache]:
+        """User-level parse cache, opened when the first file is parsed."""
+        if self._parse_cache is None and self.use_parse_cache:
+            self._parse_cache = ParseCache()
+        return self._parse_cache
+
+    def flush_parse_cache(self):
+        """Write parse results gathered so far to the parse cache."""
+        if self._parse_cache is not None:
+            with self.profiler.phase('parse cache writes'):
+                self._parse_cache.flush()
+
+    @property
+    def ignore_matcher(self) -> IgnoreMatcher:
+        """Matcher compiled from ignore_patterns and the root ignore files."""
+        if self._ignore_matcher is None:
+            self._ignore_matcher = IgnoreMatcher.for_project(self.root_path, self.ignore_patterns)
+        return self._ignore_matcher
+
     def _should_ignore(self, path: Path) -> bool:
         """Check if path matches any ignore pattern"""
         try:
-            rel_path_str = str(path.relative_to(self.root_path).as_posix())
-            
-            # Check patterns
-            for pattern in self.ignore_patterns:
-                if fnmatch.fnmatch(rel_path_str, pattern):
-                    return True
-                    
-            # Additional checks for hidden files/dirs at any level
-            if any(part.startswith('.') and part not in {'.', '..'} 
-                   for part in path.parts if not part.startswith('.kodo_context')):
-                return True
-                
-            return False
+            rel_path_str = path.relative_to(self.root_path).as_posix()
         except ValueError:
             return True
+        if rel_path_str == '.':
+            return False
+        return self.ignore_matcher.is_path_ignored(rel_path_str, path.is_dir())
 
-    def generate_snapshot(self) -> Dict:
-        """Generate a complete snapshot of the project's codebase."""
+    def generate_snapshot(self, previous: Optional[Dict] = None) -> Dict:
+        """Generate a complete snapshot of the project's codebase.
+
+        When a previous snapshot is given, entries of files that have not
+        changed since it was taken are reused instead of re-parsed. With
+        ``use_git``, files come from the git index and, if the previous
+        snapshot recorded a commit, files git reports as unchanged since
+        then are reused without being stat-ed.
+        """
         snapshot = {
             'meta': {
-                'version': '2.0',
+                'version': SNAPSHOT_VERSION,
                 'created_at': datetime.now().isoformat(),
                 'project_root': str(self.root_path),
                 'tree_sitter_available': TREE_SITTER_AVAILABLE,
-                'languages_supported': list(self.language_map.keys())
+                'languages_supported': list(self.language_map.keys()),
+                'file_filter': self.file_filter.config()
             },
             'files': {},
             'summary': {
                 'total_files': 0,
                 'total_lines': 0,
                 'languages': {},
-                'largest_files': []
+                'largest_files': [],
+                'skipped_files': {}
             }
         }
 
+        previous_files = {}
+        if previous and self._can_reuse(previous):
+            previous_files = previous.get('files', {})
+
+        source = None
+        if self.use_git:
+            repo = GitRepository.discover(self.root_path)
+            if repo is not None:
+                source = self._git_code_files(repo, snapshot['meta'], previous, previous_files)
+        if source is None:
+            source = self._walk_code_files()
+        source = self.profiler.timed_iter('walk', source)
+
+        rel_paths = []
+        reused = {}
+
+        def files_to_parse():
+            # Consumed by _process_files while the walk is still running
+            for filepath, stat in source:
+                rel_path = str(filepath.relative_to(self.root_path))
+                rel_paths.append(rel_path)
+                if stat is None:
+                    # Git reports the file unchanged since the previous snapshot
+                    reused[rel_path] = previous_files[rel_path]
+                    continue
+                with self.profiler.phase('reuse check'):
+                    entry = self._reusable_entry(filepath, stat, previous_files.get(rel_path))
+                if entry is not None:
+                    reused[rel_path] = entry
+                else:
+                    yield filepath, stat
+
+        parsed = dict(self._process_files(files_to_parse()))
+        self.flush_parse_cache()
+
         file_sizes = []
         total_lines = 0
         language_counts = {}
+        skipped_counts = {}
 
-        for filepath in self._walk_code_files():
-            rel_path = str(filepath.relative_to(self.root_path))
-            file_data = self._process_file(filepath)
+        for rel_path in rel_paths:
+            file_data = reused[rel_path] if rel_path in reused else parsed[rel_path]
             snapshot['files'][rel_path] = file_data
             
             # Collect summary statistics
@@ -362,65 +563,293 @@ class ASTGenerator:
                 
             lang = file_data.get('language', 'unknown')
             language_counts[lang] = language_counts.get(lang, 0) + 1
+            
+            if file_data.get('skipped'):
+                reason = file_data['skipped']
+                skipped_counts[reason] = skipped_counts.get(reason, 0) + 1
 
         # Build summary
         snapshot['summary']['total_files'] = len(snapshot['files'])
         snapshot['summary']['total_lines'] = total_lines
         snapshot['summary']['languages'] = language_counts
         snapshot['summary']['largest_files'] = sorted(file_sizes, key=lambda x: x[1], reverse=True)[:10]
+        snapshot['summary']['skipped_files'] = skipped_counts
+
+        # Record how much work the rebuild actually did
+        snapshot['meta']['rebuild'] = {
+            'incremental': bool(previous_files),
+            'reused': len(reused),
+            'parsed': len(parsed),
+            'removed': len(set(previous_files) - set(snapshot['files']))
+        }
         
         # Build indexes
-        snapshot['indexes'] = self._build_indexes(snapshot)
+        with self.profiler.phase('build indexes'):
+            snapshot['indexes'] = self._build_indexes(snapshot)
         return snapshot
 
-    def _walk_code_files(self):
-        """Yield all non-ignored code files that have a parser."""
-        for root, dirs, files in os.walk(self.root_path):
-            root_path = Path(root)
+    def _can_reuse(self, previous: Dict) -> bool:
+        """Check if entries of a previous snapshot were produced compatibly."""
+        meta = previous.get('meta', {})
+        return (meta.get('version') == SNAPSHOT_VERSION and
+                meta.get('tree_sitter_available') == TREE_SITTER_AVAILABLE and
+                meta.get('project_root') == str(self.root_path) and
+                meta.get('file_filter') == self.file_filter.config())
+
+    def _reusable_entry(self, filepath: Path, stat: os.stat_result,
+                        entry: Optional[Dict]) -> Optional[Dict]:
+        """Return the previous entry for a file if the file is unchanged."""
+        if not entry:
+            return None
+
+        if entry.get('size') != stat.st_size:
+            return None
+        if entry.get('mtime') == stat.st_mtime:
+            return entry
+
+        # Touched but possibly identical (checkouts, formatters with no diff)
+        if self.hash_contents and entry.get('content_hash'):
+            try:
+                if _content_hash(read_file_bytes(filepath, stat.st_size)) == entry['content_hash']:
+                    return dict(entry, mtime=stat.st_mtime)
+            except OSError:
+                pass
+        return None
+
+    def _process_files(self, files: Iterable[Tuple[Path, os.stat_result]]):
+        """Yield (relative path, file data) pairs in walk order."""
+        files = iter(files)
+        if self.jobs > 1:
+            # Only start a pool when there is more than one batch of work
+            head = list(itertools.islice(files, self.batch_size + 1))
+            if len(head) > self.batch_size:
+                yield from self._process_files_parallel(itertools.chain(head, files))
+                return
+            files = iter(head)
+
+        for filepath, stat in files:
+            rel_path = str(filepath.relative_to(self.root_path))
+            with self.profiler.file(rel_path):
+                file_data = self._process_file(filepath, stat)
+            yield rel_path, file_data
+
+    def _process_files_parallel(self, files: Iterator[Tuple[Path, os.stat_result]]):
+        """Process files in batches on a pool of worker processes.
+
+        Batches are submitted as the walk produces them, so workers start
+        parsing before the walk finishes. ``executor.map`` returns batches
+        in submission order, so the merged result is identical to the
+        serial path.
+        """
+        def batches():
+            while True:
+                batch = [(str(filepath), stat) for filepath, stat in itertools.islice(files, self.batch_size)]
+                if not batch:
+                    return
+                yield batch
+
+        with ProcessPoolExecutor(max_workers=self.jobs,
+                                 initializer=_init_worker,
+                                 initargs=(str(self.root_path), self.hash_contents,
+                                           self.use_parse_cache, self.file_filter,
+                                           self.profiler.enabled)) as executor:
+            for results, profile in executor.map(_process_batch, batches()):
+                self.profiler.merge(profile)
+                yield from results
+
+    def _walk_code_files(self) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Yield (path, stat) for all non-ignored code files that have a parser.
+
+        Directories are read with os.scandir and visited depth first, each
+        directory's files by name before its subdirectories by name (see
+        ``walk_order``), so the snapshot does not depend on the order the
+        file system lists entries in. Entry types come from the cached
+        directory data, so each yielded file costs a single stat call.
+        A file reached twice (hard links, symlinks) is yielded once, and
+        symlinked directories are only followed with ``follow_symlinks``.
+        """
+        # Nested .gitignore files are added as the walk reaches them
+        self._ignore_matcher = None
+        matcher = self.ignore_matcher
+        is_ignored = self.profiler.timed('ignore matching', matcher.is_ignored)
+        add_ignore_file = self.profiler.timed('ignore matching', matcher.add_ignore_file)
+        seen_files = set()
+        seen_dirs = set()
+        if self.follow_symlinks:
+            root_stat = os.stat(self.root_path)
+            seen_dirs.add((root_stat.st_dev, root_stat.st_ino))
+        
+        # Pre-order traversal; subdirectories are pushed in reverse so they
+        # are popped in name order
+        stack = [(str(self.root_path), '')]
+        while stack:
+            directory, prefix = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            
+            dirs = []
+            files = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                (dirs if is_dir else files).append(entry)
+            
+            if prefix and any(entry.name == '.gitignore' for entry in files):
+                add_ignore_file(Path(directory) / '.gitignore', prefix[:-1])
             
-            # Prune ignored directories
-            dirs[:] = [d for d in dirs if not self._should_ignore(root_path / d)]
+            for entry in files:
+                if (os.path.splitext(entry.name)[1] not in self.language_map or
+                        is_ignored(prefix + entry.name, False)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Broken symlink, or removed since the directory was read
+                    continue
+                if not stat_module.S_ISREG(stat.st_mode):
+                    continue
+                key = (stat.st_dev, stat.st_ino)
+                if key in seen_files:
+                    continue
+                seen_files.add(key)
+                yield Path(entry.path), stat
             
-            if self._should_ignore(root_path):
+            subdirs = []
+            for entry in dirs:
+                # Prune ignored directories so they are never descended into
+                if is_ignored(prefix + entry.name, True):
+                    continue
+                if entry.is_symlink():
+                    if not self.follow_symlinks:
+                        continue
+                    try:
+                        dir_stat = entry.stat()
+                    except OSError:
+                        continue
+                    key = (dir_stat.st_dev, dir_stat.st_ino)
+                    if key in seen_dirs:
+                        # Symlink loop, or a directory already walked
+                        continue
+                    seen_dirs.add(key)
+                elif self.follow_symlinks:
+                    try:
+                        dir_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    seen_dirs.add((dir_stat.st_dev, dir_stat.st_ino))
+                subdirs.append((entry.path, prefix + entry.name + '/'))
+            stack.extend(reversed(subdirs))
+
+    def _git_code_files(self, repo: GitRepository, meta: Dict, previous: Optional[Dict],
+                        previous_files: Dict) -> Iterator[Tuple[Path, Optional[os.stat_result]]]:
+        """Yield (path, stat) for code files listed by git, in walk order.
+
+        Tracked files come from the index and untracked ones from
+        ``git ls-files --others``. The HEAD commit and the paths that differ
+        from it are recorded in ``meta``. A stat of None means git reports
+        the file unchanged since the previous snapshot, whose entry can be
+        reused as is.
+        """
+        with self.profiler.phase('git index and status'):
+            head = repo.head()
+            tracked = repo.tracked_files()
+            untracked = repo.untracked_files()
+            dirty = repo.changed_since(head) if head else None
+        if dirty is not None:
+            meta['git_head'] = head
+            meta['git_dirty'] = sorted(dirty.union(untracked))
+
+        # Tracked files that match the previous snapshot's commit and were
+        # clean then, so their entries were parsed from that commit's content
+        unchanged = set()
+        previous_meta = previous.get('meta', {}) if previous_files else {}
+        if dirty is not None and previous_meta.get('git_head') and 'git_dirty' in previous_meta:
+            since = previous_meta['git_head']
+            changed = dirty if since == head else repo.changed_since(since)
+            if changed is not None:
+                stale = changed.union(previous_meta['git_dirty'], untracked)
+                unchanged = {path for path in tracked if path not in stale}
+
+        self._ignore_matcher = None
+        matcher = self.ignore_matcher
+        is_ignored = self.profiler.timed('ignore matching', matcher.is_ignored)
+        add_ignore_file = self.profiler.timed('ignore matching', matcher.add_ignore_file)
+        # In walk order, so both modes build identical snapshots (where a
+        # name is defined twice, the indexes keep the last file listed)
+        files = sorted(set(tracked).union(untracked), key=walk_order)
+        for path in files:
+            if path.endswith('/.gitignore'):
+                add_ignore_file(self.root_path / path, path[:-len('/.gitignore')])
+
+        ignored_dirs: Dict[str, bool] = {'': False}
+
+        def dir_ignored(directory: str) -> bool:
+            if directory not in ignored_dirs:
+                parent = directory.rsplit('/', 1)[0] if '/' in directory else ''
+                ignored_dirs[directory] = dir_ignored(parent) or is_ignored(directory, True)
+            return ignored_dirs[directory]
+
+        for path in files:
+            if os.path.splitext(path)[1] not in self.language_map:
                 continue
-                
-            for file in files:
-                filepath = root_path / file
-                if (filepath.suffix in self.language_map and 
-                    not self._should_ignore(filepath) and
-                    filepath.is_file()):
-                    yield filepath
-
-    def _process_file(self, filepath: Path) -> Dict:
-        """Process a single file with the appropriate parser."""
+            directory = path.rsplit('/', 1)[0] if '/' in path else ''
+            if dir_ignored(directory) or is_ignored(path, False):
+                continue
+
+            filepath = self.root_path / path
+            if path in unchanged and to_snapshot_path(path) in previous_files:
+                yield filepath, None
+                continue
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                # Deleted from the work tree but still in the index
+                continue
+            if stat_module.S_ISREG(stat.st_mode):
+                yield filepath, stat
+
+    def _process_file(self, filepath: Path, stat: Optional[os.stat_result] = None) -> Dict:
+        """Process a single file with the appropriate parser.
+
+        The file is stat-ed at most once and read exactly once; the line
+        count, content hash and parser all work from the same buffer.
+        Files rejected by the file filter get a ``skipped`` reason and
+        empty symbol lists instead of being parsed.
+        """
+        if stat is None:
+            stat = os.stat(filepath)
+
         file_data = {
-            'mtime': filepath.stat().st_mtime,
-            'size': filepath.stat().st_size,
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
             'language': self.language_map.get(filepath.suffix, 'unknown'),
             'error': None,
             'line_count': 0
         }
         
+        skipped = self.file_filter.check_stat(filepath.name, file_data['language'], stat.st_size)
+        if skipped:
+            return self._skipped_entry(file_data, skipped)
+        
         try:
-            # Count lines
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                file_data['line_count'] = sum(1 for _ in f)
-                
-            # Parse based on language
-            if filepath.suffix == '.py':
-                file_data.update(self._parse_python(filepath))
-            elif TREE_SITTER_AVAILABLE and filepath.suffix in self.language_map:
-                lang = self.language_map[filepath.suffix]
-                analyzer = TreeSitterAnalyzer(lang)
-                file_data.update(analyzer.analyze(filepath))
-            else:
-                # Basic fallback for unsupported languages
-                file_data.update({
-                    'imports': [],
-                    'classes': [],
-                    'functions': [],
-                    'variables': []
-                })
+            with self.profiler.phase('read'):
+                source_bytes = read_file_bytes(filepath, stat.st_size)
+            digest = None
+            if self.hash_contents:
+                digest = file_data['content_hash'] = _content_hash(source_bytes)
+
+            skipped = self.file_filter.check_content(source_bytes)
+            if skipped != BINARY:
+                file_data['line_count'] = count_lines(source_bytes)
+            if skipped:
+                return self._skipped_entry(file_data, skipped)
+            with self.profiler.phase(f"parse {file_data['language']}"):
+                file_data.update(self._parse_source(filepath.suffix, source_bytes, digest))
                 
         except Exception as e:
             file_data['error'] = str(e)
@@ -433,10 +862,57 @@ class ASTGenerator:
             
         return file_data
 
-    def _parse_python(self, filepath: Path) -> Dict:
+    def _skipped_entry(self, file_data: Dict, reason: str) -> Dict:
+        """Complete the entry of a file that is not parsed."""
+        file_data['skipped'] = reason
+        file_data.update({
+            'imports': [],
+            'classes': [],
+            'functions': [],
+            'variables': []
+        })
+        return file_data
+
+    def _parse_source(self, suffix: str, source_bytes: bytes, digest: Optional[str] = None) -> Dict:
+        """Parse source with the parser for its extension, via the parse cache.
+
+        Results are keyed by content hash and parser, so identical files
+        (vendored copies, other checkouts) are parsed once. Results with
+        an error are not cached; they may depend on the environment.
+        """
+        if suffix == '.py':
+            language, parse = None, self._parse_python
+        elif TREE_SITTER_AVAILABLE and suffix in self.language_map:
+            language = self.language_map[suffix]
+            parse = get_analyzer(language).analyze_source
+        else:
+            # Basic fallback for unsupported languages
+            return {
+                'imports': [],
+                'classes': [],
+                'functions': [],
+                'variables': []
+            }
+
+        cache = self.parse_cache
+        if cache is None:
+            return parse(source_bytes)
+
+        key = f"{digest or _content_hash(source_bytes)}:{_parser_id(language)}"
+        result = cache.get(key)
+        if result is None:
+            result = parse(source_bytes)
+            if 'error' not in result:
+                cache.put(key, result)
+        return result
+
+    def _parse_python(self, source_bytes: bytes) -> Dict:
         """Python parser using native AST."""
         try:
-            source = filepath.read_text(encoding='utf-8')
+            source = source_bytes.decode('utf-8')
+            if '\r' in source:
+                # Match text-mode reads, which translate all newline styles
+                source = source.replace('\r\n', '\n').replace('\r', '\n')
             tree = ast.parse(source)
             analyzer = PythonAnalyzer()
             analyzer.visit(tree)
@@ -495,17 +971,30 @@ class ASTGenerator:
                     dependency_map[imp] = []
                 dependency_map[imp].append(file)
 
+        # Resolve imports to project files in one pass over the import lists
+        with self.profiler.phase('resolve imports'):
+            resolver = ImportResolver(snapshot['files'].keys(), self.root_path)
+            resolved_imports = {}
+            for path in import_graph:
+                targets = resolver.resolve_file(path, snapshot['files'][path])
+                if targets:
+                    resolved_imports[path] = targets
+
+        with self.profiler.phase('file relationships'):
+            relationships = self._analyze_file_relationships(import_graph, resolved_imports)
+
         return {
             "import_graph": import_graph,
             "dependency_map": dependency_map,
             "class_locations": class_locations,
             "function_locations": function_locations,
             "variable_locations": variable_locations,
-            "file_relationships": self._analyze_file_relationships(import_graph)
+            "resolved_imports": resolved_imports,
+            "file_relationships": relationships
         }
 
-    def _analyze_file_relationships(self, import_graph: Dict) -> Dict:
-        """Analyze relationships between files."""
+    def _analyze_file_relationships(self, import_graph: Dict, resolved_imports: Dict) -> Dict:
+        """Analyze relationships between files from the resolved import graph."""
         relationships = {}
         
         for file, imports in import_graph.items():
@@ -515,22 +1004,63 @@ class ASTGenerator:
                 "related_files": []
             }
             
-        # Find files that import each other
-        for file, imports in import_graph.items():
-            for other_file, other_imports in import_graph.items():
-                if file != other_file:
-                    # Check if other_file imports from file
-                    if any(imp.startswith(file.replace('/', '.').replace('.py', '')) for imp in other_imports):
-                        relationships[file]["imported_by"].append(other_file)
+        # Reverse edges: every resolved import marks the target as imported by the importer
+        for file, targets in resolved_imports.items():
+            for target in targets:
+                if target not in relationships:
+                    relationships[target] = {
+                        "imports_count": 0,
+                        "imported_by": [],
+                        "related_files": []
+                    }
+                relationships[target]["imported_by"].append(file)
+
+        # Related files: what a file imports, then what imports it
+        for file, relationship in relationships.items():
+            related = dict.fromkeys(resolved_imports.get(file, []))
+            related.update(dict.fromkeys(relationship["imported_by"]))
+            related.pop(file, None)
+            relationship["related_files"] = list(related)
                         
         return relationships
 
 
+# Generator owned by each worker process of a parallel snapshot run
+_worker_generator: Optional[ASTGenerator] = None
+
+
+def _init_worker(root_path: str, hash_contents: bool, parse_cache: bool, file_filter: FileFilter,
+                 profile: bool):
+    """Create the per-process generator used by _process_batch."""
+    global _worker_generator
+    _worker_generator = ASTGenerator(root_path, hash_contents=hash_contents,
+                                     parse_cache=parse_cache, file_filter=file_filter,
+                                     profiler=PhaseProfiler(enabled=profile))
+
+
+def _process_batch(files: List[Tuple[str, os.stat_result]]) -> Tuple[List[Tuple[str, Dict]], Optional[Dict]]:
+    """Process a batch of files inside a worker process.
+
+    Returns the results and, when profiling, the batch's phase timings.
+    """
+    generator = _worker_generator
+    results = []
+    for filepath_str, stat in files:
+        filepath = Path(filepath_str)
+        rel_path = str(filepath.relative_to(generator.root_path))
+        with generator.profiler.file(rel_path):
+            results.append((rel_path, generator._process_file(filepath, stat)))
+    generator.flush_parse_cache()
+    return results, generator.profiler.drain()
+
+
 def save_ast_snapshot(snapshot: Dict, path: Path):
-    """Saves the AST snapshot to a file."""
+    """Saves the AST snapshot to a file, atomically."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, 'w') as f:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
         json.dump(snapshot, f, indent=2)
+    os.replace(tmp_path, path)
 
 
 def load_ast_snapshot(path: Path) -> Optional[Dict]:
@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# A lock file without a readable pid is still being written, unless it is
+# older than this; then the process that created it died before writing it
+UNWRITTEN_LOCK_SECONDS = 60
+
+
+def _lock_holder(lock_path: Path) -> Optional[int]:
+    """Pid of the live refresh holding the lock (0 while the lock is being written).
+
+    None if the lock is free or stale. A lock is only broken when its
+    process is gone, however long the refresh has been running.
+    """
+    try:
+        created = lock_path.stat().st_mtime
+    except OSError:
+        return None
+    try:
+        pid = json.loads(lock_path.read_text()).get('pid')
+    except (OSError, ValueError, AttributeError):
+        pid = None
+    if not isinstance(pid, int):
+        return 0 if time.time() - created <= UNWRITTEN_LOCK_SECONDS else None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except OSError:
+        pass  # Alive, owned by someone else
+    return pid
+
+
+def is_running(lock_path: Path) -> bool:
+    return _lock_holder(lock_path) is not None
+
+
+def _write_lock(fd: int):
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'pid': os.getpid(), 'started_at': datetime.now().isoformat()}, f)
+
+
+def acquire(lock_path: Path) -> bool:
+    """Take the refresh lock for this process; False if another refresh holds it"""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        except FileExistsError:
+            if is_running(lock_path):
+                return False
+            # Stale: remove it and try once more (O_EXCL settles any race)
+            try:
+                lock_path.unlink()
+            except OSError:
+                pass
+            continue
+        _write_lock(fd)
+        return True
+    return False
+
+
+def adopt(lock_path: Path, owner: int) -> bool:
+    """Take over the lock from the process that started this one, else acquire it"""
+    if _lock_holder(lock_path) == owner:
+        tmp_path = lock_path.with_name(f".{lock_path.name}.{os.getpid()}.tmp")
+        _write_lock(os.open(str(tmp_path), os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o600))
+        os.replace(tmp_path, lock_path)
+        return True
+    return acquire(lock_path)
+
+
+def release(lock_path: Path):
+    if _lock_holder(lock_path) == os.getpid():
+        lock_path.unlink()
+
+
+def start(project_root: Path, lock_path: Path) -> bool:
+    """Refresh the snapshot of a project in a detached process, unless one is running.
+
+    The lock is taken here, before the process starts, and handed over to
+    it, so commands in quick succession start one refresh between them.
+    Its output goes to refresh.log next to the lock.
+    """
+    if not acquire(lock_path):
+        return False
+    # The child must import this same kodo, installed or not
+    env = dict(os.environ)
+    package_parent = str(Path(__file__).resolve().parent.parent)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_parent, env.get('PYTHONPATH')]))
+    try:
+        with open(lock_path.with_name('refresh.log'), 'w') as log:
+            subprocess.Popen([sys.executable, '-m', 'kodo.background_refresh', str(project_root),
+                              str(os.getpid())],
+                             cwd=str(project_root), env=env, stdin=subprocess.DEVNULL,
+                             stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    except OSError:
+        release(lock_path)
+        raise
+    return True
+
+
+def main(argv=None) -> int:
+    from kodo.context_manager import ContextManager
+
+    argv = sys.argv[1:] if argv is None else argv
+    context_manager = ContextManager(Path(argv[0]) if argv else Path.cwd())
+    lock_path = context_manager.refresh_lock_path
+    # Started by start(), the lock is held by the parent process
+    if not (adopt(lock_path, int(argv[1])) if len(argv) > 1 else acquire(lock_path)):
+        return 0
+    try:
+        return 0 if context_manager.refresh_snapshot() else 1
+    finally:
+        release(lock_path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Set
+
+from kodo.search_index import MIN_PREFIX, STOPWORDS, tokenize
+
+# Lines of matching code sent per file
+MAX_CHUNK_LINES = 80
+
+# A matching class this short is sent whole; a longer one as its first
+# CLASS_HEADER_LINES lines (signature and docstring, usually)
+SMALL_CLASS_LINES = 30
+CLASS_HEADER_LINES = 5
+
+# Signatures listed for a file none of whose symbols match the query
+MAX_OUTLINE_SIGNATURES = 20
+
+GAP = "..."
+
+
+def query_terms(query: str) -> Set[str]:
+    """Terms symbol names are matched against"""
+    return {term for term in tokenize(query) if term not in STOPWORDS}
+
+
+def _match_count(name: str, terms: Set[str]) -> int:
+    """Query terms a symbol name contains, whole or as a prefix of one of its parts"""
+    parts = tokenize(name) + [name.lower()]
+    return sum(1 for term in terms
+               if any(part == term or (len(term) >= MIN_PREFIX and part.startswith(term))
+                      for part in parts))
+
+
+def _range(symbol: Dict) -> Optional[tuple]:
+    start, end = symbol.get('start_line'), symbol.get('end_line')
+    if not isinstance(start, int) or not isinstance(end, int) or start < 1 or end < start:
+        return None
+    return start, end
+
+
+def _symbols(entries: List) -> List[Dict]:
+    return [entry for entry in entries if isinstance(entry, dict) and _range(entry)]
+
+
+def extract_chunks(lines: List[str], file_data: Dict, terms: Set[str],
+                   max_lines: int = MAX_CHUNK_LINES) -> Optional[str]:
+    """Source of the functions and classes of a file that match the query terms.
+
+    Uses the line ranges in the snapshot: matching functions are sent with
+    their decorators and the signature of their enclosing class, matching
+    classes whole or as their header, best matches first until
+    ``max_lines`` lines are taken. Lines are rendered in file order with
+    ``...`` for what is left out. If no symbol matches, the signatures of
+    the file are listed instead; None if the file has no usable symbols.
+    """
+    classes = _symbols(file_data.get('classes', []))
+    functions = _symbols(file_data.get('functions', []))
+    if not classes and not functions:
+        return None
+
+    def enclosing_class(symbol: Dict) -> Optional[Dict]:
+        start, end = _range(symbol)
+        owners = [cls for cls in classes if cls is not symbol and
+                  _range(cls)[0] < start and _range(cls)[1] >= end]
+        return max(owners, key=lambda cls: _range(cls)[0]) if owners else None
+
+    matches = []
+    for position, symbol in enumerate(classes + functions):
+        score = _match_count(symbol.get('name', ''), terms)
+        if score:
+            # Best match first, then the earliest in the file
+            matches.append((-score, _range(symbol)[0], position, symbol))
+    matches.sort(key=lambda match: match[:3])
+
+    included: Set[int] = set()
+
+    def include(start: int, end: int):
+        for number in range(start, min(end, len(lines)) + 1):
+            if len(included) >= max_lines:
+                return
+            included.add(number)
+
+    if matches:
+        for _, _, _, symbol in matches:
+            if len(included) >= max_lines:
+                break
+            start, end = _range(symbol)
+            owner = enclosing_class(symbol)
+            if owner is not None:
+                include(_range(owner)[0], _range(owner)[0])
+            if symbol in classes and end - start + 1 > SMALL_CLASS_LINES:
+                include(start, start + CLASS_HEADER_LINES - 1)
+                continue
+            # Decorators sit just above the definition
+            while start > 1 and lines[start - 2].lstrip().startswith('@'):
+                start -= 1
+            include(start, end)
+    else:
+        for symbol in sorted(classes + functions, key=lambda symbol: _range(symbol)[0]):
+            if len(included) >= MAX_OUTLINE_SIGNATURES:
+                break
+            include(_range(symbol)[0], _range(symbol)[0])
+
+    if not included:
+        return None
+    rendered = []
+    previous = 0
+    for number in sorted(included):
+        if number != previous + 1:
+            rendered.append(GAP)
+        rendered.append(lines[number - 1].rstrip('\n'))
+        previous = number
+    if previous < len(lines):
+        rendered.append(GAP)
+    return "\n".join(rendered)
@@ -0,0 +1,58 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Sequence, Tuple
+
+
+def file_key(paths: Sequence[Path]) -> Tuple:
+    """Identity of the current revision of some files (None for a missing one)"""
+    key = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            key.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            key.append(None)
+    return tuple(key)
+
+
+class ContextCache:
+    """Memoizes what is loaded from context files until those files change.
+
+    Each entry is keyed by a name and remembers the inode, mtime and size
+    of the files it was loaded from; it is reloaded as soon as any of them
+    changes on disk, so writes by another process are picked up. Values
+    are shared, so callers must not modify them. A replaced value with a
+    ``close`` method (a SnapshotStore) is closed.
+    """
+
+    def __init__(self):
+        # name -> (file key, value)
+        self._entries: Dict[Hashable, Tuple[Tuple, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: Hashable, paths: Sequence[Path], loader: Callable[[], Any]) -> Any:
+        """Cached value of ``name``, calling loader() if it is new or its files changed"""
+        key = file_key(paths)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            previous = self._entries.get(name)
+            self._entries[name] = (key, value)
+        if previous is not None and previous[1] is not value and hasattr(previous[1], 'close'):
+            previous[1].close()
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+# Shared by every ContextManager in the process (the CLI, the agent, the daemon)
+context_cache = ContextCache()
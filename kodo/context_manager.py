@@ -1,17 +1,125 @@
 import json
 import os
+import re
+import sqlite3
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from rich.console import Console
-from rich.markdown import Markdown
-import hashlib
-from rich.progress import Progress, TaskID
 
+from kodo import background_refresh
 from kodo.ast_generator import ASTGenerator, save_ast_snapshot, load_ast_snapshot, is_ast_current
+from kodo.code_chunks import extract_chunks, query_terms
+from kodo.context_cache import context_cache
+from kodo.context_packer import DEFAULT_MAX_CONTEXT_TOKENS, ContextPacker, Segment, estimate_tokens
+from kodo.file_filters import FileFilter, parse_size
+from kodo.history_log import DEFAULT_SEGMENT_BYTES, HistoryLog
+from kodo.interaction_store import InteractionStore
+from kodo.path_index import PathIndex
+from kodo.profiling import PhaseProfiler
+from kodo.search_index import SearchIndex, snapshot_id
+from kodo.snapshot_store import SnapshotStore
 
 console = Console()
 
+# Packing priority of context segments, in tiers: explicit files (score
+# 100), the overview, ranked files, past interactions, then history
+OVERVIEW_SCORE = 90
+HEADING_SCORE = 1000
+HISTORY_SCORE = 0.5
+PAST_INTERACTIONS_SCORE = 1
+
+# Ranked files are packed in this band, in BM25 order; BM25 scores have no
+# upper bound, so they are squashed into it rather than used as they are
+RANKED_SCORE_FLOOR = 2
+RANKED_SCORE_CEILING = 80
+
+# Past interactions looked up for a query
+PAST_INTERACTIONS = 3
+
+# Bump when rules.cline needs migrating (see migrate_rules); the version a
+# project's rules are at is recorded in cache/metadata.json
+RULES_VERSION = 1
+
+# rules.cline as written by kodo before max_file_size was enforced. Its
+# max_file_size=20000 would now skip every file over 20KB, so an unmodified
+# copy is migrated to the default
+LEGACY_MAX_FILE_SIZE = '20000'
+LEGACY_RULES_TEMPLATE = """# {name} - AI Assistant Rules
+
+## Context Configuration
+max_context_files=8
+max_file_size=20000
+context_priority=main_files,recent_changes,query_relevant
+
+## Code Style & Standards
+- Write clean, readable code with meaningful names
+- Add comments for complex logic
+- Follow existing patterns in the codebase
+- Maintain consistent formatting
+
+## Response Guidelines
+- Provide concise, actionable answers
+- Include code examples when helpful
+- Explain reasoning for significant changes
+- Ask for clarification when requirements are unclear
+
+## Project-Specific Notes
+- Check overview.md for current project context
+- Reference history.md for past decisions and changes
+- Prioritize existing architecture patterns
+- Consider performance and maintainability
+
+## Auto-Update Triggers
+- File creation/deletion
+- Significant code changes (>50 lines)
+- New dependencies added
+- Architecture changes
+"""
+
+# Tail of history.md read for the project context
+HISTORY_TAIL_BYTES = 3000
+
+# Tail of history.md packed into a query's context, about what it was
+# before the packer (the newest entries matter; older ones are noise)
+HISTORY_CONTEXT_BYTES = 1000
+
+# Larger files are previewed instead of read for matching functions
+CHUNK_MAX_FILE_BYTES = 512 * 1024
+
+# Lines of an explicit file kept when it has to be summarised
+EXPLICIT_SUMMARY_LINES = 20
+
+# Tokens kept free for the context summary, which is written after packing
+SUMMARY_TOKENS = 200
+
+
+def _read_text(path: Path) -> Optional[str]:
+    """Content of a file, or None if it cannot be read"""
+    try:
+        return path.read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _parse_rules(path: Path) -> Dict[str, str]:
+    """key=value settings of a rules.cline file"""
+    rules = {}
+    content = _read_text(path)
+    if content:
+        for line in content.split('\n'):
+            if '=' in line and not line.strip().startswith('#'):
+                key, value = line.split('=', 1)
+                rules[key.strip()] = value.strip()
+    return rules
+
+
+def _ranked_packing_score(score: float) -> float:
+    """Packing priority of a ranked file: its BM25 score mapped into the ranked band"""
+    score = max(0.0, score)
+    return RANKED_SCORE_FLOOR + (RANKED_SCORE_CEILING - RANKED_SCORE_FLOOR) * score / (score + 1)
+
+
 class ContextManager:
     """Advanced context management using the cline method for intelligent codebase indexing"""
     
@@ -25,9 +133,24 @@ class ContextManager:
         self.overview_path = self.context_dir / "overview.md"
         self.history_path = self.context_dir / "history.md"
         self.rules_path = self.context_dir / "rules.cline"
+        self.snapshot_db_path = self.cache_dir / "snapshot.db"
+        self.search_index_path = self.cache_dir / "search_index.json"
+        self._search_index: Optional[SearchIndex] = None
+        self.path_index_path = self.cache_dir / "path_index.json"
+        self._path_index: Optional[PathIndex] = None
+        # Directory file mentions are resolved from; the process's own when
+        # None (the daemon sets it to each client's)
+        self.working_directory: Optional[Path] = None
+        self.interactions_path = self.cache_dir / "interactions.db"
+        self.refresh_lock_path = self.cache_dir / "refresh.lock"
+        self._interactions: Optional[InteractionStore] = None
+        # Token report of the last formatted context (see ContextPacker.pack)
+        self.last_context_usage: Dict = {}
         
-    def initialize_context(self) -> bool:
+    def initialize_context(self, jobs: int = 1, use_git: Optional[bool] = None,
+                           profiler: Optional[PhaseProfiler] = None) -> bool:
         """Initialize the complete context system for a project"""
+        profiler = profiler or PhaseProfiler(enabled=False)
         try:
             console.print("Initializing context system...")
             
@@ -35,27 +158,34 @@ class ContextManager:
             self.context_dir.mkdir(parents=True, exist_ok=True)
             self.cache_dir.mkdir(parents=True, exist_ok=True)
             
+            # Create default rules.cline first: the snapshot is built with its
+            # settings, and a later refresh can only reuse it if they still match
+            console.print("Setting up project rules...")
+            self._create_default_rules()
+            
             # Generate AST snapshot
             console.print("Generating AST snapshot...")
-            ast_generator = ASTGenerator(str(self.project_root))
+            ast_generator = ASTGenerator(str(self.project_root), jobs=jobs,
+                                         use_git=self._use_git(use_git),
+                                         parse_cache=self._use_parse_cache(),
+                                         file_filter=self._file_filter(),
+                                         profiler=profiler)
             snapshot = ast_generator.generate_snapshot()
-            save_ast_snapshot(snapshot, self.snapshot_path)
+            with profiler.phase('save snapshot'):
+                self.save_snapshot(snapshot)
             
-            # Create cache file for performance tracking
-            self._create_cache_metadata(snapshot)
+            # Create cache file for performance tracking; the rules were just written
+            self._create_cache_metadata(snapshot, rules_version=RULES_VERSION)
             
             # Create overview.md (concise system prompt)
             console.print("Creating project overview...")
-            self._create_overview(snapshot)
+            with profiler.phase('overview'):
+                self._create_overview(snapshot)
             
             # Initialize history.md
             console.print("Initializing project history...")
             self._initialize_history()
             
-            # Create default rules.cline
-            console.print("Setting up project rules...")
-            self._create_default_rules()
-            
             console.print("Context system initialized successfully!")
             self._show_context_summary(snapshot)
             
@@ -65,6 +195,226 @@ class ContextManager:
             console.print(f"Error initializing context: {e}")
             return False
     
+    def refresh_context(self, jobs: int = 1, full: bool = False, hash_contents: bool = False,
+                        use_git: Optional[bool] = None, profiler: Optional[PhaseProfiler] = None) -> bool:
+        """Refresh the AST snapshot, re-parsing only files that changed"""
+        if not self.snapshot_path.exists() and not self.snapshot_db_path.exists():
+            return self.initialize_context(jobs=jobs, use_git=use_git, profiler=profiler)
+            
+        profiler = profiler or PhaseProfiler(enabled=False)
+        try:
+            snapshot = self._refresh_snapshot(jobs, full, hash_contents, use_git, profiler)
+            with profiler.phase('overview'):
+                self._create_overview(snapshot)
+            
+            # History and rules are user-owned; only create them if missing
+            if not self.history_path.exists():
+                self._initialize_history()
+            if not self.rules_path.exists():
+                self._create_default_rules()
+            
+            rebuild = snapshot['meta']['rebuild']
+            console.print(f"Reused {rebuild['reused']} files, re-parsed {rebuild['parsed']}, "
+                          f"removed {rebuild['removed']}")
+            return True
+            
+        except Exception as e:
+            console.print(f"Error refreshing context: {e}")
+            return False
+    
+    def refresh_snapshot(self) -> bool:
+        """Incrementally refresh only the snapshot and its indexes (the background refresh).
+        
+        Everything is written to a temporary file and renamed into place,
+        so a command running meanwhile reads either the old or the new data.
+        """
+        if not self.snapshot_path.exists() and not self.snapshot_db_path.exists():
+            return False
+        try:
+            self._refresh_snapshot(profiler=PhaseProfiler(enabled=False))
+            return True
+        except Exception as e:
+            console.print(f"Error refreshing snapshot: {e}")
+            return False
+    
+    def _refresh_snapshot(self, jobs: int = 1, full: bool = False, hash_contents: bool = False,
+                          use_git: Optional[bool] = None, profiler: PhaseProfiler = None) -> Dict:
+        console.print("Refreshing AST snapshot...")
+        previous = None
+        if not full:
+            with profiler.phase('load previous snapshot'):
+                previous = self.load_snapshot(lazy=False)
+        ast_generator = ASTGenerator(str(self.project_root), jobs=jobs, hash_contents=hash_contents,
+                                     use_git=self._use_git(use_git),
+                                     parse_cache=self._use_parse_cache(),
+                                     file_filter=self._file_filter(),
+                                     profiler=profiler)
+        snapshot = ast_generator.generate_snapshot(previous=previous)
+        with profiler.phase('save snapshot'):
+            self.save_snapshot(snapshot)
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._create_cache_metadata(snapshot)
+        return snapshot
+    
+    def _use_git(self, use_git: Optional[bool] = None) -> bool:
+        """Whether to enumerate files from git; defaults to use_git in rules.cline"""
+        if use_git is not None:
+            return use_git
+        return self._load_rules().get('use_git', 'false').lower() in ('true', 'yes', '1')
+    
+    def _use_parse_cache(self) -> bool:
+        """Whether to share parse results through the user-level cache (parse_cache in rules.cline)"""
+        return self._load_rules().get('parse_cache', 'true').lower() in ('true', 'yes', '1')
+    
+    def _file_filter(self) -> FileFilter:
+        """Size caps and generated-file detection configured in rules.cline"""
+        return FileFilter.from_rules(self._load_rules())
+    
+    def migrate_rules(self):
+        """Bring rules.cline written by an older kodo up to date, once per project.
+        
+        Only called by interactive commands, never by refreshes: an
+        unmodified legacy rules.cline gets the default max_file_size; an
+        edited one that still sets max_file_size=20000 is kept as it is,
+        with a warning that the limit is now enforced.
+        """
+        metadata = self._read_cache_metadata()
+        if metadata is None or metadata.get('rules_version', 0) >= RULES_VERSION:
+            return
+        content = _read_text(self.rules_path)
+        if content == LEGACY_RULES_TEMPLATE.format(name=self.project_root.name):
+            try:
+                self.rules_path.write_text(content.replace(f"max_file_size={LEGACY_MAX_FILE_SIZE}\n",
+                                                           "max_file_size=1m\n"), encoding='utf-8')
+            except OSError as e:
+                console.print(f"Warning: Could not update rules.cline: {e}")
+                return
+            console.print(f"Note: rules.cline from an older kodo set max_file_size={LEGACY_MAX_FILE_SIZE}, "
+                          f"which was not enforced then; changed it to the default, 1m.")
+        elif content is not None and _parse_rules(self.rules_path).get('max_file_size') == LEGACY_MAX_FILE_SIZE:
+            console.print(f"Warning: rules.cline sets max_file_size={LEGACY_MAX_FILE_SIZE}; files over 20KB "
+                          f"are no longer parsed (older kodo ignored this setting).")
+        metadata['rules_version'] = RULES_VERSION
+        self._write_cache_metadata(metadata)
+    
+    def snapshot_backend(self) -> str:
+        """Snapshot storage backend selected in rules.cline ('json' or 'sqlite')"""
+        backend = self._load_rules().get('snapshot_store', 'json').lower()
+        return backend if backend in ('json', 'sqlite') else 'json'
+    
+    def load_snapshot(self, lazy: bool = True):
+        """Load the AST snapshot from the configured backend.
+        
+        With the SQLite backend and ``lazy`` set, a SnapshotStore is returned
+        so callers can load file entries on demand; otherwise
+        the full snapshot dictionary is loaded. Falls back to whichever
+        backend has data when the configured one has none yet.
+        """
+        if lazy:
+            # Shared until the snapshot files or the backend setting change
+            return context_cache.get((str(self.context_dir), 'snapshot'),
+                                     (self.snapshot_path, self.snapshot_db_path, self.rules_path),
+                                     lambda: self._read_snapshot(lazy=True))
+        return self._read_snapshot(lazy=False)
+    
+    def _read_snapshot(self, lazy: bool):
+        use_db = self.snapshot_db_path.exists() and (
+            self.snapshot_backend() == 'sqlite' or not self.snapshot_path.exists()
+        )
+        if not use_db:
+            return load_ast_snapshot(self.snapshot_path)
+        
+        store = SnapshotStore(self.snapshot_db_path)
+        if lazy:
+            return store
+        try:
+            return store.load_snapshot()
+        finally:
+            store.close()
+    
+    def save_snapshot(self, snapshot: Dict):
+        """Save the AST snapshot with the configured backend"""
+        if self.snapshot_backend() == 'sqlite':
+            SnapshotStore(self.snapshot_db_path).write_snapshot(snapshot)
+            stale = self.snapshot_path
+        else:
+            save_ast_snapshot(snapshot, self.snapshot_path)
+            stale = self.snapshot_db_path
+        
+        # Keep a single source of truth so a backend switch never reads old data
+        if stale.exists():
+            stale.unlink()
+        
+        self._save_search_index(snapshot.get('files', {}).items(), snapshot.get('meta', {}))
+    
+    def _save_search_index(self, files, meta: Dict) -> SearchIndex:
+        """Build the BM25 and path indexes for a snapshot and save them next to the snapshot"""
+        index = SearchIndex.build(files, snapshot_id(meta))
+        path_index = PathIndex.build(index.paths, index.source)
+        try:
+            index.save(self.search_index_path)
+            path_index.save(self.path_index_path)
+        except OSError as e:
+            console.print(f"Warning: Could not save search index: {e}")
+        self._search_index = index
+        self._path_index = path_index
+        return index
+    
+    def load_search_index(self, ast_data) -> SearchIndex:
+        """Search index of a loaded snapshot, rebuilt if missing or stale"""
+        if isinstance(ast_data, SnapshotStore):
+            meta, files = ast_data.get_section('meta'), ast_data.iter_files()
+        else:
+            meta, files = ast_data.get('meta', {}), ast_data.get('files', {}).items()
+        
+        source = snapshot_id(meta)
+        if self._search_index is not None and self._search_index.source == source:
+            return self._search_index
+        
+        index = SearchIndex.load(self.search_index_path)
+        if index is None or index.source != source:
+            return self._save_search_index(files, meta)
+        self._search_index = index
+        return index
+    
+    def load_path_index(self, ast_data) -> PathIndex:
+        """Path index of a loaded snapshot, rebuilt if missing or stale"""
+        search_index = self.load_search_index(ast_data)
+        source = search_index.source
+        if self._path_index is not None and self._path_index.source == source:
+            return self._path_index
+        
+        index = PathIndex.load(self.path_index_path)
+        if index is None or index.source != source:
+            index = PathIndex.build(search_index.paths, source)
+            try:
+                index.save(self.path_index_path)
+            except OSError as e:
+                console.print(f"Warning: Could not save path index: {e}")
+        self._path_index = index
+        return index
+    
+    def rank_files_batch(self, queries: List[str], k: int = None) -> List[List[Tuple[str, float]]]:
+        """Top k (path, score) pairs for each query, scored together in one batch"""
+        k = k or self._get_max_context_files()
+        try:
+            ast_data = self.load_snapshot()
+            if not ast_data:
+                return [[] for _ in queries]
+            return self.load_search_index(ast_data).search_batch(queries, k)
+        except Exception as e:
+            console.print(f"Warning: Could not rank files: {e}")
+            return [[] for _ in queries]
+    
+    def export_snapshot(self, output_path: Path) -> bool:
+        """Write the current snapshot as JSON, whatever the backend"""
+        snapshot = self.load_snapshot(lazy=False)
+        if not snapshot:
+            return False
+        save_ast_snapshot(snapshot, output_path)
+        return True
+    
     def _create_overview(self, snapshot: Dict):
         """Create concise project overview as system prompt"""
         project_name = self.project_root.name
@@ -120,8 +470,7 @@ class ContextManager:
 *Each AI query and response will be logged here for future reference.*
 """
         
-        with open(self.history_path, 'w', encoding='utf-8') as f:
-            f.write(history_content)
+        self._history_log().start(history_content)
     
     def _create_default_rules(self):
         """Create default .clinerules file with intelligent defaults"""
@@ -129,7 +478,13 @@ class ContextManager:
 
 ## Context Configuration
 max_context_files=8
-max_file_size=20000
+max_context_tokens={DEFAULT_MAX_CONTEXT_TOKENS}
+max_file_size=1m
+skip_generated=true
+snapshot_store=json
+use_git=false
+parse_cache=true
+history_segment_size=1m
 context_priority=main_files,recent_changes,query_relevant
 
 ## Code Style & Standards
@@ -160,22 +515,38 @@ context_priority=main_files,recent_changes,query_relevant
         with open(self.rules_path, 'w', encoding='utf-8') as f:
             f.write(rules_content)
     
-    def _create_cache_metadata(self, snapshot: Dict):
+    def _create_cache_metadata(self, snapshot: Dict, rules_version: Optional[int] = None):
         """Create cache metadata for performance tracking"""
+        previous = self._read_cache_metadata() or {}
         cache_metadata = {
             "created_at": datetime.now().isoformat(),
             "files_count": len(snapshot['files']),
             "last_update": datetime.now().isoformat(),
             "cache_hits": 0,
-            "cache_misses": 0
+            "cache_misses": 0,
+            # Kept across refreshes: rules.cline is not rewritten by them
+            "rules_version": rules_version if rules_version is not None else previous.get('rules_version', 0)
         }
         
+        self._write_cache_metadata(cache_metadata)
+    
+    def _read_cache_metadata(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_dir / "metadata.json", 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_cache_metadata(self, metadata: Dict):
         cache_file = self.cache_dir / "metadata.json"
-        with open(cache_file, 'w') as f:
-            json.dump(cache_metadata, f, indent=2)
+        tmp_path = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, cache_file)
     
-    def log_interaction(self, query: str, response_summary: str, files_involved: List[str] = None):
-        """Log every AI interaction to history"""
+    def log_interaction(self, query: str, response_summary: str, files_involved: List[str] = None,
+                        outcome: Optional[str] = None):
+        """Log every AI interaction to history and the interaction store"""
         try:
             files_involved = files_involved or []
             
@@ -194,8 +565,8 @@ context_priority=main_files,recent_changes,query_relevant
 """
             
             # Append to history file
-            with open(self.history_path, 'a', encoding='utf-8') as f:
-                f.write(entry)
+            self._history_log().append(entry)
+            self._record_interaction("AI Interaction", query, response_summary, files_involved, outcome)
                 
             # Auto-update context if needed
             self._check_auto_update()
@@ -221,8 +592,10 @@ context_priority=main_files,recent_changes,query_relevant
 """
             
             # Append to history file
-            with open(self.history_path, 'a', encoding='utf-8') as f:
-                f.write(entry)
+            self._history_log().append(entry)
+            self._record_interaction(change_type, details.get('description', details.get('summary', '')),
+                                     details.get('summary', ''), details.get('files', []),
+                                     details.get('outcome', details.get('impact')))
                 
             # Update AST snapshot if files changed
             if details.get('files'):
@@ -231,16 +604,33 @@ context_priority=main_files,recent_changes,query_relevant
         except Exception as e:
             console.print(f"Warning: Could not update history: {e}")
     
+    @property
+    def interactions(self) -> InteractionStore:
+        """Structured log of past interactions, indexed by file and keyword"""
+        if self._interactions is None:
+            self._interactions = InteractionStore(self.interactions_path)
+        return self._interactions
+    
+    def _record_interaction(self, kind: str, query: str, summary: str, files: List[str],
+                            outcome: Optional[str]):
+        try:
+            self.interactions.record(kind, query, summary, files, outcome)
+        except sqlite3.Error as e:
+            console.print(f"Warning: Could not record interaction: {e}")
+    
+    def _get_past_interactions(self, query: str, files: List[str]) -> List[Dict]:
+        """Past interactions sharing keywords with the query or files with its context"""
+        try:
+            return self.interactions.relevant(query, files, PAST_INTERACTIONS)
+        except sqlite3.Error as e:
+            console.print(f"Warning: Could not look up past interactions: {e}")
+            return []
+    
     def _update_ast_cache(self, changed_files: List[str]):
         """Selectively update AST cache for changed files"""
         try:
-            ast_data = load_ast_snapshot(self.snapshot_path)
-            if not ast_data:
-                return
-                
-            ast_generator = ASTGenerator(str(self.project_root))
-            updated = False
-            
+            # Only existing project files can be re-analyzed
+            candidates = []
             for file_path_str in changed_files:
                 # Ensure we have absolute path
                 if not os.path.isabs(file_path_str):
@@ -248,27 +638,41 @@ context_priority=main_files,recent_changes,query_relevant
                 else:
                     file_path_obj = Path(file_path_str)
                 
-                # Check if file exists and needs update
                 if file_path_obj.exists():
                     try:
-                        # Get relative path for storage
-                        rel_path = str(file_path_obj.relative_to(self.project_root))
-                        
-                        # Check if update needed
-                        if not is_ast_current(file_path_obj, ast_data):
-                            # Re-analyze this file
-                            ast_data['files'][rel_path] = ast_generator._process_file(file_path_obj)
-                            updated = True
-                            
+                        file_path_obj.relative_to(self.project_root)
                     except ValueError:
                         # File is not in project directory, skip
                         continue
+                    candidates.append(file_path_obj)
+            if not candidates:
+                return
+            
+            ast_data = self.load_snapshot(lazy=False)
+            if not ast_data:
+                return
+                
+            ast_generator = ASTGenerator(str(self.project_root), parse_cache=self._use_parse_cache(),
+                                         file_filter=self._file_filter())
+            updated = False
+            
+            for file_path_obj in candidates:
+                # Get relative path for storage
+                rel_path = str(file_path_obj.relative_to(self.project_root))
+                
+                # Check if update needed
+                if not is_ast_current(file_path_obj, ast_data):
+                    # Re-analyze this file
+                    ast_data['files'][rel_path] = ast_generator._process_file(file_path_obj)
+                    updated = True
             
             if updated:
+                ast_generator.flush_parse_cache()
+                
                 # Rebuild indexes
                 ast_data['indexes'] = ast_generator._build_indexes(ast_data)
                 ast_data['meta']['updated_at'] = datetime.now().isoformat()
-                save_ast_snapshot(ast_data, self.snapshot_path)
+                self.save_snapshot(ast_data)
                 
                 # Update cache metadata
                 self._update_cache_metadata()
@@ -289,14 +693,13 @@ context_priority=main_files,recent_changes,query_relevant
             metadata["last_update"] = datetime.now().isoformat()
             metadata["cache_hits"] = metadata.get("cache_hits", 0) + 1
             
-            with open(cache_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self._write_cache_metadata(metadata)
                 
         except Exception:
             pass
     
     def _check_auto_update(self):
-        """Check if context should be auto-updated"""
+        """Start a background snapshot refresh if the context is stale"""
         try:
             # Get cache metadata
             cache_file = self.cache_dir / "metadata.json"
@@ -310,10 +713,11 @@ context_priority=main_files,recent_changes,query_relevant
             last_update = datetime.fromisoformat(metadata.get("last_update", datetime.now().isoformat()))
             hours_since_update = (datetime.now() - last_update).total_seconds() / 3600
             
-            # Auto-update if more than 24 hours or many cache misses
+            # Auto-update if more than 24 hours or many cache misses, without
+            # waiting for it; the next command picks up the new snapshot
             if hours_since_update > 24 or metadata.get("cache_misses", 0) > 10:
-                console.print("Auto-updating context...")
-                self.initialize_context()
+                if background_refresh.start(self.project_root, self.refresh_lock_path):
+                    console.print("Refreshing context in the background...")
                 
         except Exception:
             pass
@@ -326,7 +730,7 @@ context_priority=main_files,recent_changes,query_relevant
                 "overview": self._load_overview(),
                 "rules": self._load_rules(),
                 "recent_history": self._load_recent_history(),
-                "ast_snapshot": load_ast_snapshot(self.snapshot_path),
+                "ast_snapshot": self.load_snapshot(),
                 "query_focused": {}
             }
             
@@ -352,7 +756,7 @@ context_priority=main_files,recent_changes,query_relevant
         # Use the new enhanced formatting
         return self._format_context(context)
     
-    def _get_query_focused_context(self, query: str, ast_data: Dict, max_files: int = None) -> Dict:
+    def _get_query_focused_context(self, query: str, ast_data, max_files: int = None) -> Dict:
         """Get context focused on the specific query using AST data"""
         max_files = max_files or self._get_max_context_files()
         query_lower = query.lower()
@@ -361,31 +765,25 @@ context_priority=main_files,recent_changes,query_relevant
         # Extract explicitly mentioned files from the query
         explicit_files = self._extract_file_mentions(query)
         
-        file_scores = []
         explicit_file_data = []
         
         # First, handle explicitly mentioned files
         for file_mention in explicit_files:
-            file_found = False
             # Try to find the file in AST data (exact match or partial match)
-            for file_path, file_data in ast_data.get('files', {}).items():
-                if (file_mention.lower() in file_path.lower() or 
-                    file_path.lower().endswith(file_mention.lower()) or
-                    file_mention.lower() == file_path.lower()):
-                    
-                    explicit_file_data.append({
-                        "path": file_path,
-                        "score": 100,  # Highest priority
-                        "content_preview": self._get_file_content(file_path),  # Full content for explicit requests
-                        "functions": file_data.get('functions', []),
-                        "classes": file_data.get('classes', []),
-                        "explicit": True
-                    })
-                    file_found = True
-                    break
+            match = self._find_snapshot_file(ast_data, file_mention)
+            if match:
+                file_path, file_data = match
+                explicit_file_data.append({
+                    "path": file_path,
+                    "score": 100,  # Highest priority
+                    "content_preview": self._get_file_content(file_path),  # Full content for explicit requests
+                    "functions": file_data.get('functions', []),
+                    "classes": file_data.get('classes', []),
+                    "explicit": True
+                })
             
             # If file not in AST data, try to read it directly
-            if not file_found:
+            else:
                 direct_content = self._try_read_file_directly(file_mention)
                 if direct_content:
                     explicit_file_data.append({
@@ -398,49 +796,28 @@ context_priority=main_files,recent_changes,query_relevant
                         "note": "File read directly (not in AST analysis)"
                     })
         
-        # Then, do normal relevance scoring for additional context
-        for file_path, file_data in ast_data.get('files', {}).items():
-            # Skip if already included as explicit file
-            if any(explicit['path'] == file_path for explicit in explicit_file_data):
-                continue
-                
-            score = 0
-            
-            # Score based on filename relevance
-            if any(keyword in file_path.lower() for keyword in keywords):
-                score += 10
-            
-            # Score based on functions/classes matching query
-            for func in file_data.get('functions', []):
-                func_name = func.get('name', func) if isinstance(func, dict) else func
-                if any(keyword in func_name.lower() for keyword in keywords):
-                    score += 5
-                    
-            for cls in file_data.get('classes', []):
-                cls_name = cls.get('name', cls) if isinstance(cls, dict) else cls
-                if any(keyword in cls_name.lower() for keyword in keywords):
-                    score += 5
-            
-            # Score based on imports
-            for imp in file_data.get('imports', []):
-                imp_name = imp.get('name', imp) if isinstance(imp, dict) else imp
-                if any(keyword in imp_name.lower() for keyword in keywords):
-                    score += 3
-            
-            if score > 0:
-                file_scores.append((file_path, score, file_data))
+        # Then, rank the other files with BM25 over paths, symbols and imports
+        explicit_paths = {explicit['path'] for explicit in explicit_file_data}
+        file_scores = [(path, score) for path, score in self.load_search_index(ast_data).search(query)
+                       if path not in explicit_paths]
         
-        # Sort by score and take top files (excluding space used by explicit files)
-        file_scores.sort(key=lambda x: x[1], reverse=True)
+        # Take the top files (excluding space used by explicit files)
         remaining_slots = max(0, max_files - len(explicit_file_data))
-        relevant_files = file_scores[:remaining_slots]
+        relevant_files = []
+        for path, score in file_scores[:remaining_slots]:
+            if isinstance(ast_data, SnapshotStore):
+                data = ast_data.get_file(path)
+            else:
+                data = ast_data['files'].get(path)
+            relevant_files.append((path, round(score, 2), data or {}))
         
-        # Combine explicit files with relevant files
+        # Combine explicit files with relevant files, sending the code that matches the query
+        terms = query_terms(query)
         all_files = explicit_file_data + [
             {
                 "path": path,
                 "score": score,
-                "content_preview": self._get_file_preview(path),
+                "content_preview": self._get_code_chunks(path, data, terms),
                 "functions": data.get('functions', [])[:5],  # Top 5 functions
                 "classes": data.get('classes', [])[:3],      # Top 3 classes
                 "explicit": False
@@ -453,12 +830,34 @@ context_priority=main_files,recent_changes,query_relevant
             "query_keywords": list(keywords),
             "total_relevant": len(file_scores),
             "explicit_files": len(explicit_file_data),
-            "explicit_file_names": [f["path"] for f in explicit_file_data]
+            "explicit_file_names": [f["path"] for f in explicit_file_data],
+            "past_interactions": self._get_past_interactions(query, [f["path"] for f in all_files])
         }
     
+    def _find_snapshot_file(self, ast_data, file_mention: str) -> Optional[tuple]:
+        """Snapshot file a mention refers to, as (path, data).
+        
+        The mention must match the file name or a trailing part of the
+        path; of several matches, the one nearest the current directory wins.
+        """
+        paths = self.load_path_index(ast_data).lookup(file_mention, self._current_directory())
+        if not paths:
+            return None
+        if isinstance(ast_data, SnapshotStore):
+            return paths[0], ast_data.get_file(paths[0]) or {}
+        return paths[0], ast_data.get('files', {}).get(paths[0], {})
+    
+    def _current_directory(self) -> str:
+        """Current directory relative to the project root ('' at or outside the root)"""
+        try:
+            cwd = self.working_directory or Path.cwd()
+            relative = Path(cwd).resolve().relative_to(self.project_root.resolve())
+        except ValueError:
+            return ''
+        return relative.as_posix() if str(relative) != '.' else ''
+    
     def _extract_file_mentions(self, query: str) -> List[str]:
         """Extract explicit file mentions from a query"""
-        import re
         
         file_mentions = []
         words = query.split()
@@ -544,32 +943,15 @@ context_priority=main_files,recent_changes,query_relevant
             return f"Error reading {file_path}: {str(e)}"
     
     def _try_read_file_directly(self, file_mention: str) -> Optional[str]:
-        """Try to read a file directly from the project directory"""
+        """Read a mentioned file that is not in the snapshot (ignored, or newer than it).
+        
+        Snapshot files are resolved through the path index, so only the
+        mention itself is tried, relative to the project root.
+        """
         try:
-            # Try different variations of the file mention
-            possible_paths = [
-                file_mention,
-                f"./{file_mention}",
-                f"src/{file_mention}",
-                f"lib/{file_mention}",
-                f"app/{file_mention}",
-            ]
-            
-            # If no extension, try common ones
-            if '.' not in file_mention:
-                base_paths = possible_paths.copy()
-                possible_paths = []
-                for base in base_paths:
-                    possible_paths.extend([
-                        f"{base}.py", f"{base}.js", f"{base}.ts", 
-                        f"{base}.md", f"{base}.txt", f"{base}.json"
-                    ])
-            
-            for path_attempt in possible_paths:
-                full_path = self.project_root / path_attempt
-                if full_path.exists() and full_path.is_file():
-                    return self._get_file_content(path_attempt)
-            
+            full_path = self.project_root / file_mention
+            if full_path.is_file():
+                return self._get_file_content(file_mention)
             return None
             
         except Exception:
@@ -652,39 +1034,42 @@ context_priority=main_files,recent_changes,query_relevant
         return ', '.join(sorted(list(dependencies))[:8])
     
     # Existing helper methods with minor improvements
+    def _load_cached(self, name: str, path: Path, loader):
+        """loader(path), cached until the file changes (see ContextCache)"""
+        return context_cache.get((str(self.context_dir), name), (path,), lambda: loader(path))
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Hits and misses of the shared context cache"""
+        return context_cache.stats()
+    
     def _load_overview(self) -> str:
         """Load project overview content"""
-        try:
-            if self.overview_path.exists():
-                return self.overview_path.read_text(encoding='utf-8')
-        except Exception:
-            pass
-        return "Project overview not available"
+        overview = self._load_cached('overview', self.overview_path, _read_text)
+        return overview if overview is not None else "Project overview not available"
     
     def _load_rules(self) -> Dict[str, str]:
         """Load and parse .clinerules file"""
-        rules = {}
+        return dict(self._load_cached('rules', self.rules_path, _parse_rules))
+    
+    def _history_log(self) -> HistoryLog:
+        """history.md and its rotated segments under context/history/"""
         try:
-            if self.rules_path.exists():
-                content = self.rules_path.read_text(encoding='utf-8')
-                for line in content.split('\n'):
-                    if '=' in line and not line.strip().startswith('#'):
-                        key, value = line.split('=', 1)
-                        rules[key.strip()] = value.strip()
-        except Exception:
-            pass
-        return rules
+            segment_bytes = parse_size(self._load_rules().get('history_segment_size', str(DEFAULT_SEGMENT_BYTES)))
+        except ValueError:
+            segment_bytes = DEFAULT_SEGMENT_BYTES
+        return HistoryLog(self.history_path, self.context_dir / "history", segment_bytes)
+    
+    def _load_history_tail(self, max_bytes: int = HISTORY_TAIL_BYTES) -> Optional[str]:
+        return self._load_cached(f'history:{max_bytes}', self.history_path,
+                                 lambda path: self._history_log().recent(max_bytes))
     
     def _load_recent_history(self, days: int = 7) -> str:
         """Load recent project history"""
-        try:
-            if self.history_path.exists():
-                content = self.history_path.read_text(encoding='utf-8')
-                # Return last 3000 characters for recent context
-                return content[-3000:] if len(content) > 3000 else content
-        except Exception:
-            pass
-        return "Project history not available"
+        # Return the last few thousand characters for recent context
+        content = self._load_history_tail()
+        if content is None:
+            return "Project history not available"
+        return content[-HISTORY_TAIL_BYTES:]
     
     def _get_max_context_files(self) -> int:
         """Get maximum context files from rules"""
@@ -694,6 +1079,29 @@ context_priority=main_files,recent_changes,query_relevant
         except (ValueError, TypeError):
             return 8
     
+    def _get_max_context_tokens(self) -> int:
+        """Token budget of the formatted context, from rules"""
+        try:
+            return int(self._load_rules().get('max_context_tokens', DEFAULT_MAX_CONTEXT_TOKENS))
+        except (ValueError, TypeError):
+            return DEFAULT_MAX_CONTEXT_TOKENS
+    
+    def _get_code_chunks(self, file_path: str, file_data: Dict, terms) -> str:
+        """Functions and classes of a file matching the query terms, else its preview"""
+        try:
+            full_path = self.project_root / file_path
+            stat = full_path.stat()
+            # Line ranges are only trusted while the file is as the snapshot saw it
+            unchanged = file_data.get('size') == stat.st_size and file_data.get('mtime') == stat.st_mtime
+            if unchanged and stat.st_size < CHUNK_MAX_FILE_BYTES:
+                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    chunks = extract_chunks(f.readlines(), file_data, terms)
+                if chunks:
+                    return chunks
+        except Exception:
+            pass
+        return self._get_file_preview(file_path)
+    
     def _get_file_preview(self, file_path: str, lines: int = 10) -> str:
         """Get preview of file content"""
         try:
@@ -730,135 +1138,196 @@ context_priority=main_files,recent_changes,query_relevant
         console.print(f"• Classes indexed: {len(snapshot['indexes']['class_locations'])}")
         console.print(f"• Functions indexed: {len(snapshot['indexes']['function_locations'])}")
         console.print(f"• Import relationships: {len(snapshot['indexes']['import_graph'])}")
+        skipped = snapshot['summary'].get('skipped_files')
+        if skipped:
+            reasons = ', '.join(f"{count} {reason.replace('_', ' ')}" for reason, count in sorted(skipped.items()))
+            console.print(f"• Skipped (not parsed): {reasons}")
         
         console.print(f"\nContext files created:")
-        console.print(f"• {self.snapshot_path.relative_to(self.project_root)}")
+        snapshot_file = self.snapshot_db_path if self.snapshot_backend() == 'sqlite' else self.snapshot_path
+        console.print(f"• {snapshot_file.relative_to(self.project_root)}")
         console.print(f"• {self.overview_path.relative_to(self.project_root)}")
         console.print(f"• {self.history_path.relative_to(self.project_root)}")
         console.print(f"• {self.rules_path.relative_to(self.project_root)}")
         console.print(f"• Cache: {self.cache_dir.relative_to(self.project_root)}")
     
     def _format_context(self, context: Dict) -> str:
-        """Format context for LLM consumption"""
-        formatted = []
+        """Format context for LLM consumption, packed into the token budget"""
+        segments = []
         
         # Project overview
-        overview_file = self.context_dir / "overview.md"
-        if overview_file.exists():
-            formatted.append("# Project Overview\n")
-            with open(overview_file, 'r', encoding='utf-8') as f:
-                formatted.append(f.read())
-            formatted.append("\n" + "="*50 + "\n")
+        overview = self._load_cached('overview', self.overview_path, _read_text)
+        if overview is not None:
+            segments.append(Segment("overview", "# Project Overview\n\n" + overview + "\n\n" + "="*50 + "\n",
+                                    OVERVIEW_SCORE))
         
         # Relevant files with explicit file handling
         relevant_files = context.get('query_focused', {}).get('relevant_files', [])
+        explicit_files = [f for f in relevant_files if f.get('explicit', False)]
+        regular_files = [f for f in relevant_files if not f.get('explicit', False)]
+        # Segment index of each section heading
+        headings = {}
+        
+        # Show explicitly requested files first with full content
+        if explicit_files:
+            headings["explicit files"] = len(segments)
+            segments.append(Segment("explicit files", "# Explicitly Requested Files\n", HEADING_SCORE))
+            for file_info in explicit_files:
+                segments.append(Segment(
+                    "explicit files", self._format_explicit_file(file_info), file_info.get('score', 100),
+                    summary=self._format_explicit_file(file_info, summary=True)
+                ))
+        
+        # Then show additional context files with previews
+        if regular_files:
+            headings["context files"] = len(segments)
+            segments.append(Segment("context files", "# Additional Context Files\n", HEADING_SCORE))
+            for file_info in regular_files:
+                segments.append(Segment(
+                    "context files", self._format_context_file(file_info),
+                    _ranked_packing_score(file_info.get('score', 0)),
+                    summary=self._format_context_file(file_info, summary=True)
+                ))
+        summary_position = len(segments)
+        
+        # Past interactions that touched the same files or asked about the same things
+        past_interactions = context.get('query_focused', {}).get('past_interactions', [])
+        if past_interactions:
+            headings["past interactions"] = len(segments)
+            segments.append(Segment("past interactions", "# Relevant Past Interactions\n", HEADING_SCORE))
+            for interaction in past_interactions:
+                segments.append(Segment("past interactions", self._format_past_interaction(interaction),
+                                        PAST_INTERACTIONS_SCORE))
+        
+        # Recent history for additional context; truncation keeps the newest entries
+        recent_history = self._load_history_tail(HISTORY_CONTEXT_BYTES)
+        if recent_history and recent_history.strip():
+            headings["history"] = len(segments)
+            segments.append(Segment("history", "# Recent Development History\n", HEADING_SCORE))
+            segments.append(Segment("history", recent_history + "\n", HISTORY_SCORE, keep='end'))
+        
+        budget = self._get_max_context_tokens()
+        packed, usage = ContextPacker(max(0, budget - SUMMARY_TOKENS)).pack(segments)
+        
+        # A heading is only kept if something of its section was
+        for section, index in headings.items():
+            if not any(text is not None for segment, text in zip(segments[index + 1:], packed[index + 1:])
+                       if segment.section == section):
+                usage['sections'][section] -= estimate_tokens(packed[index])
+                usage['used'] -= estimate_tokens(packed[index])
+                packed[index] = None
+        
+        # Add context summary, reporting what the packing used
         if relevant_files:
-            # Separate explicit files from regular files
-            explicit_files = [f for f in relevant_files if f.get('explicit', False)]
-            regular_files = [f for f in relevant_files if not f.get('explicit', False)]
-            
-            # Show explicitly requested files first with full content
-            if explicit_files:
-                formatted.append("# Explicitly Requested Files\n")
-                for file_info in explicit_files:
-                    formatted.append(f"## File: {file_info['path']}\n")
-                    if file_info.get('note'):
-                        formatted.append(f"*{file_info['note']}*\n\n")
-                    
-                    # Include full content for explicit requests
-                    content = file_info.get('content_preview', '')
-                    if content:
-                        formatted.append(f"```{self._get_file_language(file_info['path'])}\n")
-                        formatted.append(content)
-                        if not content.endswith('\n'):
-                            formatted.append('\n')
-                        formatted.append("```\n\n")
-                    
-                    # Add function/class info if available
-                    if file_info.get('functions'):
-                        formatted.append("**Functions:**\n")
-                        for func in file_info.get('functions', [])[:10]:  # Show more for explicit files
-                            if isinstance(func, dict):
-                                formatted.append(f"- {func.get('name', 'Unknown')} (line {func.get('line', '?')})\n")
-                            else:
-                                formatted.append(f"- {func}\n")
-                        formatted.append("\n")
-                    
-                    if file_info.get('classes'):
-                        formatted.append("**Classes:**\n")
-                        for cls in file_info.get('classes', [])[:10]:  # Show more for explicit files
-                            if isinstance(cls, dict):
-                                formatted.append(f"- {cls.get('name', 'Unknown')} (line {cls.get('line', '?')})\n")
-                            else:
-                                formatted.append(f"- {cls}\n")
-                        formatted.append("\n")
-                    
-                    formatted.append("-" * 40 + "\n\n")
-            
-            # Then show additional context files with previews
-            if regular_files:
-                formatted.append("# Additional Context Files\n")
-                for file_info in regular_files:
-                    formatted.append(f"## {file_info['path']} (relevance: {file_info['score']})\n")
-                    
-                    preview = file_info.get('content_preview', '')
-                    if preview:
-                        formatted.append(f"```{self._get_file_language(file_info['path'])}\n")
-                        formatted.append(preview)
-                        if not preview.endswith('\n'):
-                            formatted.append('\n')
-                        formatted.append("```\n")
-                    
-                    if file_info.get('functions'):
-                        formatted.append("**Key Functions:** ")
-                        func_names = []
-                        for func in file_info.get('functions', [])[:5]:
-                            if isinstance(func, dict):
-                                func_names.append(func.get('name', 'Unknown'))
-                            else:
-                                func_names.append(str(func))
-                        formatted.append(", ".join(func_names) + "\n")
-                    
-                    if file_info.get('classes'):
-                        formatted.append("**Key Classes:** ")
-                        class_names = []
-                        for cls in file_info.get('classes', [])[:3]:
-                            if isinstance(cls, dict):
-                                class_names.append(cls.get('name', 'Unknown'))
-                            else:
-                                class_names.append(str(cls))
-                        formatted.append(", ".join(class_names) + "\n")
-                    
-                    formatted.append("\n")
-            
-            # Add context summary
-            formatted.append("# Context Summary\n")
+            summary = ["# Context Summary\n"]
             query_focused = context.get('query_focused', {})
             if query_focused.get('explicit_files', 0) > 0:
-                formatted.append(f"- **Explicit files included:** {query_focused.get('explicit_files', 0)} ({', '.join(query_focused.get('explicit_file_names', []))})\n")
-            formatted.append(f"- **Additional context files:** {len(regular_files)}\n")
-            formatted.append(f"- **Query keywords:** {', '.join(query_focused.get('query_keywords', []))}\n")
-            formatted.append(f"- **Total relevant files found:** {query_focused.get('total_relevant', 0)}\n\n")
-        
-        # Recent history for additional context
-        history_file = self.context_dir / "history.md"
-        if history_file.exists():
-            try:
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    history_content = f.read()
-                    # Include only the most recent entries (last 1000 characters)
-                    if len(history_content) > 1000:
-                        recent_history = "..." + history_content[-1000:]
-                    else:
-                        recent_history = history_content
-                    
-                    if recent_history.strip():
-                        formatted.append("# Recent Development History\n")
-                        formatted.append(recent_history)
-                        formatted.append("\n")
-            except Exception:
-                pass  # Skip if history cannot be read
+                summary.append(f"- **Explicit files included:** {query_focused.get('explicit_files', 0)} ({', '.join(query_focused.get('explicit_file_names', []))})\n")
+            included = sum(1 for segment, text in zip(segments, packed)
+                           if text is not None and segment.section == "context files")
+            summary.append(f"- **Additional context files:** {max(0, included - 1)} of {len(regular_files)}\n")
+            summary.append(f"- **Query keywords:** {', '.join(query_focused.get('query_keywords', []))}\n")
+            summary.append(f"- **Total relevant files found:** {query_focused.get('total_relevant', 0)}\n")
+            if past_interactions:
+                summary.append(f"- **Past interactions:** {len(past_interactions)}\n")
+            sections = ", ".join(f"{name} {tokens:,}" for name, tokens in usage['sections'].items() if tokens)
+            summary.append(f"- **Context tokens:** ~{usage['used']:,} of {budget:,} ({sections})\n")
+            if usage['summarised'] or usage['truncated'] or usage['dropped']:
+                summary.append(f"- **Trimmed to fit:** {usage['summarised']} summarised, "
+                               f"{usage['truncated']} truncated, {usage['dropped']} dropped\n")
+            summary_text = "\n".join(summary) + "\n"
+            usage['sections']['summary'] = estimate_tokens(summary_text)
+            usage['used'] += usage['sections']['summary']
+            packed.insert(summary_position, summary_text)
+        
+        usage['budget'] = budget
+        self.last_context_usage = usage
+        return "\n".join(text for text in packed if text is not None)
+    
+    def _format_explicit_file(self, file_info: Dict, summary: bool = False) -> str:
+        """Markdown for an explicitly requested file; the summary shows a short preview"""
+        formatted = [f"## File: {file_info['path']}\n"]
+        if file_info.get('note'):
+            formatted.append(f"*{file_info['note']}*\n\n")
+        
+        # Include full content for explicit requests
+        content = file_info.get('content_preview', '')
+        if summary and content:
+            lines = content.splitlines()
+            content = "\n".join(lines[:EXPLICIT_SUMMARY_LINES])
+            if len(lines) > EXPLICIT_SUMMARY_LINES:
+                content += f"\n\n... (showing first {EXPLICIT_SUMMARY_LINES} lines to fit the context budget)"
+        if content:
+            formatted.append(f"```{self._get_file_language(file_info['path'])}\n")
+            formatted.append(content)
+            if not content.endswith('\n'):
+                formatted.append('\n')
+            formatted.append("```\n\n")
+        
+        # Add function/class info if available
+        if file_info.get('functions'):
+            formatted.append("**Functions:**\n")
+            for func in file_info.get('functions', [])[:10]:  # Show more for explicit files
+                if isinstance(func, dict):
+                    formatted.append(f"- {func.get('name', 'Unknown')} (line {func.get('line', '?')})\n")
+                else:
+                    formatted.append(f"- {func}\n")
+            formatted.append("\n")
+        
+        if file_info.get('classes'):
+            formatted.append("**Classes:**\n")
+            for cls in file_info.get('classes', [])[:10]:  # Show more for explicit files
+                if isinstance(cls, dict):
+                    formatted.append(f"- {cls.get('name', 'Unknown')} (line {cls.get('line', '?')})\n")
+                else:
+                    formatted.append(f"- {cls}\n")
+            formatted.append("\n")
+        
+        formatted.append("-" * 40 + "\n\n")
+        return "\n".join(formatted)
+    
+    def _format_past_interaction(self, interaction: Dict) -> str:
+        lines = [f"\n## {interaction['created_at'].replace('T', ' ')} - {interaction['kind']}\n",
+                 f"**Query:** {interaction['query']}\n"]
+        if interaction['summary'] and interaction['summary'] != interaction['query']:
+            lines.append(f"**Summary:** {interaction['summary']}\n")
+        if interaction['files']:
+            lines.append(f"**Files:** {', '.join(interaction['files'])}\n")
+        if interaction['outcome']:
+            lines.append(f"**Outcome:** {interaction['outcome']}\n")
+        return "".join(lines)
+    
+    def _format_context_file(self, file_info: Dict, summary: bool = False) -> str:
+        """Markdown for an additional context file; the summary leaves out the preview"""
+        formatted = [f"## {file_info['path']} (relevance: {file_info['score']})\n"]
+        
+        preview = file_info.get('content_preview', '')
+        if preview and not summary:
+            formatted.append(f"```{self._get_file_language(file_info['path'])}\n")
+            formatted.append(preview)
+            if not preview.endswith('\n'):
+                formatted.append('\n')
+            formatted.append("```\n")
+        
+        if file_info.get('functions'):
+            func_names = []
+            for func in file_info.get('functions', [])[:5]:
+                if isinstance(func, dict):
+                    func_names.append(func.get('name', 'Unknown'))
+                else:
+                    func_names.append(str(func))
+            formatted.append("**Key Functions:** " + ", ".join(func_names) + "\n")
+        
+        if file_info.get('classes'):
+            class_names = []
+            for cls in file_info.get('classes', [])[:3]:
+                if isinstance(cls, dict):
+                    class_names.append(cls.get('name', 'Unknown'))
+                else:
+                    class_names.append(str(cls))
+            formatted.append("**Key Classes:** " + ", ".join(class_names) + "\n")
         
+        formatted.append("\n")
         return "\n".join(formatted)
     
     def _get_file_language(self, file_path: str) -> str:
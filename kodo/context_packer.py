@@ -0,0 +1,127 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Token budget of a packed context unless rules.cline sets max_context_tokens
+DEFAULT_MAX_CONTEXT_TOKENS = 12000
+
+# A truncated segment shorter than this is not worth including
+MIN_TRUNCATED_TOKENS = 50
+
+# Token counts kept between calls; cleared when it grows past this
+MAX_CACHED_COUNTS = 4096
+
+# Roughly one BPE token each: a short run of letters, up to three digits,
+# or one symbol. Within ~15% of real tokenizers on code and English prose.
+_PIECE = re.compile(r'[A-Za-z]{1,6}|[0-9]{1,3}|[^\sA-Za-z0-9]')
+
+_TRUNCATION_NOTE = "\n... (truncated to fit the context budget)\n"
+
+# Digest of a text -> token count
+_token_counts: Dict[bytes, int] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text, without a model tokenizer"""
+    return len(_PIECE.findall(text))
+
+
+def count_tokens(text: str) -> int:
+    """Token count of a text, cached by a digest of the text.
+
+    Hashing is much cheaper than counting, and a file rendered the same
+    way for another query is then only counted once; any difference in
+    the rendering (chunks matching another query, a summary) is a new text.
+    """
+    digest = hashlib.blake2b(text.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+    count = _token_counts.get(digest)
+    if count is None:
+        if len(_token_counts) >= MAX_CACHED_COUNTS:
+            _token_counts.clear()
+        count = _token_counts[digest] = estimate_tokens(text)
+    return count
+
+
+@dataclass
+class Segment:
+    """One piece of a context, packed whole, summarised or truncated as budget allows"""
+    section: str
+    text: str
+    # Higher scores are packed first, and cut last
+    score: float
+    # Shorter stand-in used when the full text does not fit
+    summary: str = ""
+    # Which end survives truncation: 'start' or 'end' (recent history)
+    keep: str = 'start'
+
+
+def truncate_to_tokens(text: str, tokens: int, keep: str = 'start') -> str:
+    """Whole lines of a text adding up to at most ``tokens``, from the kept end"""
+    lines = text.splitlines(keepends=True)
+    if keep == 'end':
+        lines.reverse()
+    kept = []
+    used = estimate_tokens(_TRUNCATION_NOTE)
+    for line in lines:
+        cost = estimate_tokens(line)
+        if used + cost > tokens:
+            break
+        kept.append(line)
+        used += cost
+    if keep == 'end':
+        kept.reverse()
+        return _TRUNCATION_NOTE.lstrip('\n') + ''.join(kept)
+    return ''.join(kept) + _TRUNCATION_NOTE
+
+
+class ContextPacker:
+    """Fills a token budget with context segments by relevance.
+
+    Segments are taken highest score first: whole if they fit, else their
+    summary, else truncated to the remaining budget; what does not fit at
+    all is dropped. The lowest-value segments are therefore the first to
+    be cut, and the packed text keeps the original segment order.
+    """
+
+    def __init__(self, budget: int = DEFAULT_MAX_CONTEXT_TOKENS):
+        self.budget = budget
+
+    def pack(self, segments: List[Segment]) -> Tuple[List[Optional[str]], Dict]:
+        """The text packed for each segment (None if dropped) and a report of the tokens used.
+
+        The report has ``budget``, ``used``, ``sections`` (tokens per
+        section), and ``summarised``, ``truncated`` and ``dropped`` counts.
+        """
+        remaining = self.budget
+        chosen: List[Optional[str]] = [None] * len(segments)
+        report = {'budget': self.budget, 'used': 0, 'sections': {},
+                  'summarised': 0, 'truncated': 0, 'dropped': 0}
+
+        order = sorted(range(len(segments)), key=lambda i: segments[i].score, reverse=True)
+        for i in order:
+            segment = segments[i]
+            text = segment.text
+            tokens = count_tokens(text)
+            outcome = None
+            if tokens > remaining and segment.summary:
+                text = segment.summary
+                tokens = count_tokens(text)
+                outcome = 'summarised'
+            if tokens > remaining:
+                if remaining < MIN_TRUNCATED_TOKENS:
+                    report['dropped'] += 1
+                    continue
+                text = truncate_to_tokens(text, remaining, segment.keep)
+                tokens = estimate_tokens(text)
+                outcome = 'truncated'
+            if outcome:
+                report[outcome] += 1
+
+            chosen[i] = text
+            remaining -= tokens
+            report['used'] += tokens
+            sections = report['sections']
+            sections[segment.section] = sections.get(segment.section, 0) + tokens
+
+        return chosen, report
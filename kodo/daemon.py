@@ -0,0 +1,118 @@
+import json
+import os
+import signal
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from rich.console import Console
+
+from kodo.context_manager import ContextManager
+from kodo.daemon_client import DaemonClient, socket_path
+
+console = Console()
+
+
+class ContextDaemon:
+    """Serves context and completions for one project over a Unix socket.
+
+    The snapshot, rules and overview stay loaded in the shared context
+    cache between requests, and are reloaded when their files change.
+
+    Requests and responses are single-line JSON objects:
+    ``{"op": "context", "query": ..., "cwd": ...}`` -> ``{"ok": true, "context": ...}``
+    ``{"op": "rank", "queries": [...], "k": ...}`` -> ``{"ok": true, "rankings": ...}``
+    ``{"op": "complete", "messages": [...]}`` -> ``{"ok": true, "response": ...}``
+    plus ``ping`` and ``shutdown``. Failures answer ``{"ok": false, "error": ...}``.
+    ``cwd`` is the client's working directory, which file mentions in the
+    query are resolved from; without it the daemon's own is used.
+    """
+
+    def __init__(self, project_root: Path, llm_manager=None):
+        self.project_root = Path(project_root)
+        self.socket_path = socket_path(self.project_root)
+        self.context_manager = ContextManager(self.project_root)
+        self.llm_manager = llm_manager
+        # Snapshot stores are not safe for concurrent use; build context one at a time
+        self._context_lock = threading.Lock()
+        self._server: Optional[socketserver.UnixStreamServer] = None
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "project_root": str(self.project_root),
+                    "llm": self.llm_manager is not None, "cache": self.context_manager.cache_stats()}
+        if op == "context":
+            with self._context_lock:
+                cwd = request.get("cwd")
+                self.context_manager.working_directory = Path(cwd) if cwd else None
+                try:
+                    context = self.context_manager.get_context_for_query(request.get("query", ""))
+                finally:
+                    self.context_manager.working_directory = None
+            return {"ok": True, "context": context}
+        if op == "rank":
+            with self._context_lock:
+                rankings = self.context_manager.rank_files_batch(request.get("queries", []),
+                                                                 request.get("k"))
+            return {"ok": True, "rankings": rankings}
+        if op == "complete":
+            if self.llm_manager is None:
+                return {"ok": False, "error": "No LLM provider configured in daemon"}
+            response = self.llm_manager.get_completion(request.get("messages", []),
+                                                       **request.get("options", {}))
+            return {"ok": True, "response": response}
+        if op == "shutdown":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def serve_forever(self):
+        """Listen on the project socket until shut down"""
+        if DaemonClient(self.project_root).is_running():
+            raise RuntimeError(f"A daemon is already serving {self.project_root}")
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            # Left behind by a daemon that did not exit cleanly
+            self.socket_path.unlink()
+
+        self._server = _Server(str(self.socket_path), _RequestHandler)
+        self._server.context_daemon = self
+        os.chmod(self.socket_path, 0o600)
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=self.stop).start())
+
+        # Load the snapshot before the first request arrives
+        self.context_manager.load_snapshot()
+        console.print(f"Kōdō daemon listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    context_daemon: ContextDaemon
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.context_daemon.handle(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+            self.wfile.flush()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import socket
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from kodo.context_manager import ContextManager
+
+# Unix socket paths are limited to ~108 bytes; longer ones move to the temp dir
+MAX_SOCKET_PATH = 100
+
+# Seconds to wait when probing whether the daemon is alive
+PING_TIMEOUT = 1.0
+
+
+class DaemonError(Exception):
+    """Raised when the daemon is unreachable or reports an error"""
+
+
+def socket_path(project_root: Path) -> Path:
+    """Socket the daemon of a project listens on"""
+    path = Path(project_root).resolve() / "kodo_context" / "cache" / "kodo.sock"
+    if len(str(path)) <= MAX_SOCKET_PATH:
+        return path
+    digest = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"kodo-{digest}.sock"
+
+
+class DaemonClient:
+    """Client for the `kodo serve` daemon (one JSON object per line each way)"""
+
+    def __init__(self, project_root: Path, timeout: Optional[float] = None):
+        self.project_root = Path(project_root)
+        self.socket_path = socket_path(self.project_root)
+        self.timeout = timeout
+
+    def request(self, op: str, timeout: Optional[float] = None, **params) -> Dict[str, Any]:
+        """Send one request and return the daemon's response"""
+        if not self.socket_path.exists():
+            raise DaemonError("Daemon is not running")
+
+        payload = json.dumps({"op": op, **params}) + "\n"
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout if timeout is not None else self.timeout)
+                sock.connect(str(self.socket_path))
+                sock.sendall(payload.encode('utf-8'))
+                with sock.makefile('r', encoding='utf-8') as stream:
+                    line = stream.readline()
+        except OSError as e:
+            raise DaemonError(f"Could not reach daemon: {e}")
+
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown daemon error"))
+        return response
+
+    def ping(self) -> Optional[Dict[str, Any]]:
+        """Daemon status, or None if no daemon is answering"""
+        try:
+            return self.request("ping", timeout=PING_TIMEOUT)
+        except (DaemonError, ValueError):
+            return None
+
+    def is_running(self) -> bool:
+        return self.ping() is not None
+
+    def get_context(self, query: str) -> str:
+        # Sent along so file mentions resolve from where the command ran
+        return self.request("context", query=query, cwd=str(Path.cwd()))["context"]
+
+    def rank_files(self, queries: List[str], k: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        rankings = self.request("rank", queries=queries, k=k)["rankings"]
+        return [[(path, score) for path, score in ranking] for ranking in rankings]
+
+    def complete(self, messages: List[Dict], **kwargs) -> str:
+        return self.request("complete", messages=messages, options=kwargs)["response"]
+
+    def shutdown(self):
+        self.request("shutdown", timeout=PING_TIMEOUT)
+
+
+class DaemonProvider:
+    """LLM provider that forwards completions to the daemon's warm provider"""
+
+    def __init__(self, client: DaemonClient):
+        self.client = client
+
+    def get_completion(self, messages: List[Dict], **kwargs) -> str:
+        return self.client.complete(messages, **kwargs)
+
+    def validate_config(self) -> bool:
+        return True
+
+    def get_required_fields(self) -> List[str]:
+        return []
+
+
+class RemoteContextManager(ContextManager):
+    """Context manager that builds query context in the daemon.
+
+    Everything else (history, rules, snapshot updates) still runs locally;
+    if the daemon stops answering, context is built in-process instead.
+    """
+
+    def __init__(self, project_root: Path = None, client: DaemonClient = None):
+        super().__init__(project_root)
+        self.client = client or DaemonClient(self.project_root)
+
+    def get_context_for_query(self, query: str) -> str:
+        try:
+            return self.client.get_context(query)
+        except DaemonError:
+            return super().get_context_for_query(query)
+
+    def rank_files_batch(self, queries: List[str], k: int = None) -> List[List[Tuple[str, float]]]:
+        try:
+            return self.client.rank_files(queries, k)
+        except DaemonError:
+            return super().rank_files_batch(queries, k)
+
+
+def connect(project_root: Path) -> Optional[DaemonClient]:
+    """Client for the project's daemon if one is running, else None"""
+    client = DaemonClient(project_root)
+    return client if client.is_running() else None
@@ -0,0 +1,138 @@
+import fnmatch
+import re
+from typing import Dict, Optional
+
+# Files larger than this are not parsed unless rules.cline says otherwise
+DEFAULT_MAX_FILE_SIZE = 1024 * 1024
+
+# Bytes inspected for binary content and minified code
+SNIFF_BYTES = 64 * 1024
+
+# Minified files: very long lines on average, or one enormous line.
+# Small files are exempt so one-line configs are still parsed.
+MINIFIED_MIN_SIZE = 4096
+MINIFIED_AVG_LINE = 300
+MINIFIED_MAX_LINE = 5000
+
+# Skip reasons recorded in the snapshot entry of a file
+TOO_LARGE = 'too_large'
+BINARY = 'binary'
+MINIFIED = 'minified'
+GENERATED = 'generated'
+
+# File names of bundles, lockfiles and code generator output
+GENERATED_NAME_PATTERNS = [
+    '*.min.js', '*.min.css', '*-min.js', '*.bundle.js', '*.chunk.js',
+    'package-lock.json', 'npm-shrinkwrap.json', 'pnpm-lock.yaml',
+    '*_pb2.py', '*_pb2.pyi', '*_pb2_grpc.py', '*.pb.go', '*.pb.cc', '*.pb.h',
+    '*.g.dart', '*.freezed.dart', '*.generated.*',
+]
+
+# Headers code generators put in the first lines of their output. Only
+# comment lines at the start of a file are searched, and a line must be a
+# generator's banner, not prose that mentions "generated" or "do not edit"
+HEADER_BYTES = 1024
+# Bump when GENERATED_HEADERS changes, so snapshot entries are re-checked
+GENERATED_HEADERS_VERSION = 2
+_COMMENT_LINE = re.compile(rb'^[ \t]*(?:#|//|/\*+|\*|--|;|<!--)[ \t]*(.*?)[ \t]*(?:\*/|-->)?[ \t]*\r?$', re.M)
+GENERATED_HEADERS = [
+    # Go (https://go.dev/s/generatedcode)
+    re.compile(rb'^Code generated .* DO NOT EDIT\.$'),
+    # Phabricator / Meta tooling, Cargo, Buck
+    re.compile(rb'^(?:@generated|.*\bis (?:automatically )?@generated)\b'),
+    # protoc
+    re.compile(rb'^Generated by the protocol buffer compiler\.\s+DO NOT EDIT!', re.I),
+    # .NET tools
+    re.compile(rb'^<auto-generated[\s>/]', re.I),
+    # Banners such as "This file was automatically generated by X. Do not edit."
+    re.compile(rb'^(?:this (?:file|code|module) (?:is|was|has been) )?(?:auto-?|automatically )?generated\b'
+               rb'.*\bdo not (?:edit|modify)\b', re.I),
+]
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as 20000, 512k or 2MB into bytes."""
+    text = value.strip().lower().rstrip('b')
+    multiplier = 1
+    if text and text[-1] in 'km':
+        multiplier = 1024 if text[-1] == 'k' else 1024 * 1024
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+
+class FileFilter:
+    """Decides which files are parsed and why the others are skipped.
+
+    Skipped files stay in the snapshot with a ``skipped`` reason and empty
+    symbol lists, so they can still be found by path.
+    """
+
+    def __init__(self, max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+                 language_limits: Optional[Dict[str, int]] = None,
+                 skip_generated: bool = True):
+        # 0 disables the size cap
+        self.max_file_size = max_file_size
+        self.language_limits = dict(language_limits or {})
+        self.skip_generated = skip_generated
+
+    @classmethod
+    def from_rules(cls, rules: Dict[str, str]) -> 'FileFilter':
+        """Build a filter from rules.cline keys.
+
+        ``max_file_size`` caps every language and ``max_file_size.<language>``
+        overrides it for one language; ``skip_generated=false`` parses
+        minified and generated files anyway. Malformed values are ignored.
+        """
+        max_file_size = DEFAULT_MAX_FILE_SIZE
+        language_limits = {}
+        for key, value in rules.items():
+            if key != 'max_file_size' and not key.startswith('max_file_size.'):
+                continue
+            try:
+                size = parse_size(value)
+            except ValueError:
+                continue
+            if key == 'max_file_size':
+                max_file_size = size
+            else:
+                language_limits[key[len('max_file_size.'):].lower()] = size
+        skip_generated = rules.get('skip_generated', 'true').lower() in ('true', 'yes', '1')
+        return cls(max_file_size, language_limits, skip_generated)
+
+    def config(self) -> Dict:
+        """Settings recorded in the snapshot; entries are reused only if they match."""
+        return {
+            'max_file_size': self.max_file_size,
+            'language_limits': dict(sorted(self.language_limits.items())),
+            'skip_generated': self.skip_generated,
+            'generated_headers': GENERATED_HEADERS_VERSION
+        }
+
+    def check_stat(self, filename: str, language: str, size: int) -> Optional[str]:
+        """Skip reason known before reading the file, or None."""
+        limit = self.language_limits.get(language, self.max_file_size)
+        if limit and size > limit:
+            return TOO_LARGE
+        if self.skip_generated and any(fnmatch.fnmatch(filename, pattern)
+                                       for pattern in GENERATED_NAME_PATTERNS):
+            return GENERATED
+        return None
+
+    def check_content(self, data: bytes) -> Optional[str]:
+        """Skip reason found by sniffing the content, or None."""
+        sample = data[:SNIFF_BYTES]
+        if b'\0' in sample:
+            return BINARY
+        if not self.skip_generated:
+            return None
+
+        for comment in _COMMENT_LINE.finditer(sample[:HEADER_BYTES]):
+            if any(header.match(comment.group(1)) for header in GENERATED_HEADERS):
+                return GENERATED
+
+        if len(data) >= MINIFIED_MIN_SIZE:
+            lines = sample.split(b'\n')
+            if (len(sample) / len(lines) > MINIFIED_AVG_LINE or
+                    max(map(len, lines)) > MINIFIED_MAX_LINE):
+                return MINIFIED
+        return None
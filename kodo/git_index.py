@@ -0,0 +1,228 @@
+import os
+import struct
+import subprocess
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+# Index entry modes (object type bits) that are not regular files
+GITLINK_MODE = 0o160000
+TREE_MODE = 0o040000
+
+# Flag bits of an index entry
+EXTENDED_FLAG = 0x4000
+SKIP_WORKTREE_FLAG = 0x4000  # in the extended flags
+STAGE_MASK = 0x3000
+NAME_MASK = 0x0fff
+
+# Seconds allowed for a git subprocess before giving up on it
+GIT_TIMEOUT = 30
+
+
+class GitIndexError(ValueError):
+    """Raised when .git/index cannot be parsed"""
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    mode: int
+    size: int
+    mtime: float
+    sha: str
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Decode the offset varint used by index version 4 path compression."""
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, pos
+
+
+def read_index(index_path: Path) -> List[IndexEntry]:
+    """Parse a git index file (versions 2-4) into stage-0 file entries.
+
+    Raises GitIndexError for formats this reader does not handle fully
+    (split or sparse indexes), so callers can fall back to git itself.
+    """
+    data = index_path.read_bytes()
+    if len(data) < 12 or data[:4] != b'DIRC':
+        raise GitIndexError("Not a git index file")
+    version, count = struct.unpack('>II', data[4:12])
+    if version not in (2, 3, 4):
+        raise GitIndexError(f"Unsupported index version {version}")
+
+    entries = []
+    pos = 12
+    previous_path = b''
+    for _ in range(count):
+        (_, _, mtime_s, mtime_ns, _, _, mode, _, _, size) = struct.unpack('>10I', data[pos:pos + 40])
+        sha = data[pos + 40:pos + 60].hex()
+        flags, = struct.unpack('>H', data[pos + 60:pos + 62])
+        entry_start = pos
+        pos += 62
+
+        extended = 0
+        if flags & EXTENDED_FLAG:
+            if version < 3:
+                raise GitIndexError("Extended flags in a version 2 index")
+            extended, = struct.unpack('>H', data[pos:pos + 2])
+            pos += 2
+
+        if version == 4:
+            strip, pos = _read_varint(data, pos)
+            end = data.index(b'\0', pos)
+            path = previous_path[:len(previous_path) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            name_length = flags & NAME_MASK
+            if name_length == NAME_MASK:
+                end = data.index(b'\0', pos)
+            else:
+                end = pos + name_length
+            path = data[pos:end]
+            # Entries are NUL-padded to a multiple of eight bytes
+            pos = entry_start + ((end - entry_start) // 8 + 1) * 8
+        previous_path = path
+
+        if mode & 0o170000 == TREE_MODE:
+            raise GitIndexError("Sparse index; directory entries hide files")
+        if (flags & STAGE_MASK or extended & SKIP_WORKTREE_FLAG or
+                mode & 0o170000 == GITLINK_MODE):
+            # Conflict stages, sparse-checkout exclusions and submodules
+            continue
+        entries.append(IndexEntry(path.decode('utf-8', 'surrogateescape'), mode, size,
+                                  mtime_s + mtime_ns / 1e9, sha))
+
+    # Extensions follow the entries; a split index keeps entries elsewhere
+    while pos + 8 <= len(data) - 20:
+        signature = data[pos:pos + 4]
+        length, = struct.unpack('>I', data[pos + 4:pos + 8])
+        if signature == b'link':
+            raise GitIndexError("Split index")
+        pos += 8 + length
+
+    return entries
+
+
+def _run_git(args: List[str], cwd: Path) -> Optional[bytes]:
+    """Output of a git command, or None if git is missing or fails."""
+    try:
+        result = subprocess.run(['git', *args], cwd=cwd, capture_output=True, timeout=GIT_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _split_z(output: bytes) -> List[str]:
+    return [p.decode('utf-8', 'surrogateescape') for p in output.split(b'\0') if p]
+
+
+class GitRepository:
+    """Git metadata for a project directory inside a work tree.
+
+    Paths returned by the methods are '/'-separated and relative to the
+    project root, which may be a subdirectory of the work tree.
+    """
+
+    def __init__(self, root: Path, work_tree: Path, git_dir: Path):
+        self.root = root
+        self.work_tree = work_tree
+        self.git_dir = git_dir
+        # Linked worktrees keep refs in the main repository's git dir
+        common_dir_file = git_dir / 'commondir'
+        try:
+            self.common_dir = (git_dir / common_dir_file.read_text().strip()).resolve()
+        except OSError:
+            self.common_dir = git_dir
+        prefix = root.relative_to(work_tree).as_posix()
+        self.prefix = '' if prefix == '.' else prefix + '/'
+
+    @classmethod
+    def discover(cls, root: Path) -> Optional['GitRepository']:
+        """Repository containing root, or None outside a git work tree."""
+        root = Path(root).resolve()
+        for candidate in (root, *root.parents):
+            dot_git = candidate / '.git'
+            if dot_git.is_dir():
+                return cls(root, candidate, dot_git)
+            if dot_git.is_file():
+                # Worktrees and submodules: ".git" names the real git dir
+                try:
+                    content = dot_git.read_text(encoding='utf-8').strip()
+                except OSError:
+                    return None
+                if content.startswith('gitdir:'):
+                    git_dir = Path(content[len('gitdir:'):].strip())
+                    return cls(root, candidate, (candidate / git_dir).resolve())
+                return None
+        return None
+
+    def _relative(self, paths: List[str]) -> List[str]:
+        """Work-tree paths under the project root, made relative to it."""
+        if not self.prefix:
+            return paths
+        n = len(self.prefix)
+        return [p[n:] for p in paths if p.startswith(self.prefix)]
+
+    def tracked_files(self) -> List[str]:
+        """Tracked files, read from .git/index with `git ls-files` as fallback."""
+        try:
+            if self._uses_sha256():
+                raise GitIndexError("SHA-256 object names")
+            entries = read_index(self.git_dir / 'index')
+            return self._relative([entry.path for entry in entries])
+        except (OSError, GitIndexError, struct.error, IndexError):
+            pass
+        output = _run_git(['ls-files', '-z'], self.root)
+        return _split_z(output) if output is not None else []
+
+    def _uses_sha256(self) -> bool:
+        """Whether the repository uses SHA-256 object names (longer index entries)."""
+        try:
+            config = (self.common_dir / 'config').read_text(encoding='utf-8', errors='ignore')
+        except OSError:
+            return False
+        return 'objectformat=sha256' in config.lower().replace(' ', '')
+
+    def untracked_files(self) -> List[str]:
+        """Untracked files that are not excluded by .gitignore."""
+        output = _run_git(['ls-files', '-z', '--others', '--exclude-standard'], self.root)
+        return _split_z(output) if output is not None else []
+
+    def head(self) -> Optional[str]:
+        """Commit checked out, read from the refs with `git rev-parse` as fallback."""
+        try:
+            head = (self.git_dir / 'HEAD').read_text(encoding='utf-8').strip()
+            if not head.startswith('ref:'):
+                return head or None
+            ref = head[len('ref:'):].strip()
+            for base in (self.git_dir, self.common_dir):
+                ref_file = base / ref
+                if ref_file.is_file():
+                    return ref_file.read_text(encoding='utf-8').strip()
+            for line in (self.common_dir / 'packed-refs').read_text(encoding='utf-8').splitlines():
+                if line.endswith(' ' + ref):
+                    return line.split(' ', 1)[0]
+        except OSError:
+            pass
+        output = _run_git(['rev-parse', '--verify', '-q', 'HEAD'], self.root)
+        return output.decode('ascii').strip() if output else None
+
+    def changed_since(self, commit: str) -> Optional[Set[str]]:
+        """Paths whose working-tree content differs from a commit.
+
+        Covers commits made since, staged and unstaged edits, and deletions.
+        Returns None if the commit is unknown (e.g. rewritten history).
+        """
+        output = _run_git(['diff', '--name-only', '-z', '--no-renames', '--relative',
+                           commit, '--'], self.root)
+        return set(_split_z(output)) if output is not None else None
+
+
+def to_snapshot_path(path: str) -> str:
+    """Convert a '/'-separated git path to the snapshot's key format."""
+    return path.replace('/', os.sep) if os.sep != '/' else path
@@ -0,0 +1,174 @@
+import gzip
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# history.md is rotated into a segment once it grows past this
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+
+# Bump when the index format changes
+INDEX_VERSION = 1
+
+# Every entry written by kodo starts with this (a blank line, then its heading)
+ENTRY_MARKER = "\n### "
+
+# One compaction at a time per process (rotations can come in quick succession)
+_compact_lock = threading.Lock()
+
+
+class HistoryLog:
+    """history.md as the active segment of a size-rotated log.
+
+    Entries are appended to history.md and the byte offset of each is
+    recorded in ``<archive>/active.idx``, so the last entries can be read
+    by seeking from the end instead of reading the file. Once history.md
+    outgrows the segment size it is moved to ``<archive>/segment-NNNNNN.md``
+    (listed in ``<archive>/index.json``) and a new history.md is started;
+    older segments are gzipped by a background thread.
+    """
+
+    def __init__(self, path: Path, archive_dir: Path, segment_bytes: int = DEFAULT_SEGMENT_BYTES):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.segment_bytes = segment_bytes
+        self.offsets_path = archive_dir / "active.idx"
+        self.index_path = archive_dir / "index.json"
+
+    def start(self, content: str):
+        """Begin a new active segment with the given header"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.offsets_path.write_text('')
+
+    def append(self, entry: str):
+        """Append an entry, rotating history.md first if it is full"""
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            size = 0
+        if self.segment_bytes and size and size + len(entry.encode('utf-8')) > self.segment_bytes:
+            self.rotate()
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            offset = f.tell()
+            f.write(entry)
+        with open(self.offsets_path, 'a', encoding='utf-8') as f:
+            f.write(f"{offset}\n")
+
+    def recent(self, max_bytes: int) -> Optional[str]:
+        """About the last ``max_bytes`` of history, starting at an entry boundary.
+
+        Only the tail is read. If history.md was rotated recently and is
+        shorter than asked for, the tail of the newest segment comes first.
+        """
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return None
+
+        tail_start = max(0, size - max_bytes)
+        with open(self.path, 'rb') as f:
+            f.seek(tail_start)
+            data = f.read()
+        if tail_start:
+            # Begin at the first whole entry inside the tail, unless the
+            # index no longer matches the file (edited by hand)
+            later = [offset for offset in self._offsets() if tail_start <= offset < size]
+            if later and data[later[0] - tail_start:].startswith(ENTRY_MARKER.encode('utf-8')):
+                data = data[later[0] - tail_start:]
+        text = data.decode('utf-8', errors='ignore')
+
+        missing = max_bytes - len(text)
+        if missing > 0:
+            segments = self.segments()
+            if segments and not segments[-1].get('compressed'):
+                earlier = self._read_tail(self.archive_dir / segments[-1]['file'], missing)
+                # Whole entries only: a fragment of an entry larger than the
+                # rest of the window is left out
+                boundary = earlier.find(ENTRY_MARKER) if earlier else -1
+                if boundary >= 0:
+                    text = earlier[boundary:] + text
+        return text
+
+    def segments(self) -> List[Dict]:
+        """Rotated segments, oldest first"""
+        try:
+            data = json.loads(self.index_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return []
+        return data.get('segments', []) if data.get('version') == INDEX_VERSION else []
+
+    def rotate(self):
+        """Move history.md into a new segment and start a fresh one"""
+        segments = self.segments()
+        number = len(segments) + 1
+        name = f"segment-{number:06d}.md"
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        os.replace(self.path, self.archive_dir / name)
+        entries = len(self._offsets())
+
+        segments.append({
+            'file': name,
+            'bytes': (self.archive_dir / name).stat().st_size,
+            'entries': entries,
+            'rotated_at': datetime.now().isoformat(),
+            'compressed': False
+        })
+        self._write_index(segments)
+        self.start(f"# Development History (continued)\n\n"
+                   f"Earlier entries are archived in {self.archive_dir.name}/ ({name} and before).\n")
+
+        # Keep the newest segment plain so recent() can still read its tail
+        if any(not segment['compressed'] for segment in segments[:-1]):
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        """Gzip every segment but the newest; safe to interrupt and run again"""
+        with _compact_lock:
+            self._compact()
+
+    def _compact(self):
+        segments = self.segments()
+        for segment in segments[:-1]:
+            if segment.get('compressed'):
+                continue
+            source = self.archive_dir / segment['file']
+            target = source.with_name(source.name + '.gz')
+            tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+            try:
+                with open(source, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(tmp_path, target)
+            except OSError:
+                continue
+            segment['file'] = target.name
+            segment['compressed'] = True
+            self._write_index(segments)
+            source.unlink()
+
+    def _write_index(self, segments: List[Dict]):
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({'version': INDEX_VERSION, 'segments': segments}, indent=2),
+                            encoding='utf-8')
+        os.replace(tmp_path, self.index_path)
+
+    def _offsets(self) -> List[int]:
+        try:
+            return [int(line) for line in self.offsets_path.read_text().split()]
+        except (OSError, ValueError):
+            return []
+
+    @staticmethod
+    def _read_tail(path: Path, size: int) -> Optional[str]:
+        try:
+            with open(path, 'rb') as f:
+                f.seek(max(0, path.stat().st_size - size))
+                return f.read().decode('utf-8', errors='ignore')
+        except OSError:
+            return None
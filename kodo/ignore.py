@@ -0,0 +1,237 @@
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Built-in ignore rules, in .gitignore syntax
+# "**/*/name/" matches nested directories only: a root lib/, packages/
+# (JS monorepos), out/, env/ or deps/ usually holds the project's own source
+DEFAULT_IGNORE_PATTERNS = [
+    # Version control
+    '.git/', '.svn/', '.hg/',
+
+    # Python virtual environments
+    '*venv*/', '.venv/', 'venv/', '**/*/env/',
+    'virtualenv*/', 'VIRTUAL_ENV/', '.virtualenv/',
+
+    # UV virtual environments (new Python package manager)
+    '.uv/', 'uv.lock', 'uv-cache/',
+
+    # Node.js
+    'node_modules/', 'npm-debug.log*', 'yarn-debug.log*',
+    'yarn-error.log*', '.npm/', '.yarn/',
+
+    # Compiled/build outputs
+    '__pycache__/', '*.pyc', '*.pyo', '*.pyd',
+    'dist/', 'build/', 'target/', '**/*/out/',
+    '*.egg-info/', '.tox/',
+
+    # IDEs and editors
+    '.vscode/', '.idea/', '*.swp', '*.swo',
+    '.DS_Store', 'Thumbs.db',
+
+    # Dependencies and packages
+    'vendor/', '**/*/deps/', '**/*/lib/',
+    '**/*/packages/', 'bower_components/',
+
+    # Logs and temporary files
+    'logs/', '*.log', 'tmp/', 'temp/',
+    'cache/', '.cache/',
+
+    # Our own context files
+    '.kodo_context/', 'kodo_context/',
+
+    # Hidden files and directories
+    '.*'
+]
+
+# Project files whose patterns are applied on top of the built-in rules
+IGNORE_FILES = ['.gitignore', '.kodoignore']
+
+
+class IgnoreRule:
+    """A compiled ignore pattern.
+
+    Adjacent non-negated patterns with the same flags are merged into one
+    rule with a single alternation regex, so a typical rule set costs a
+    handful of regex calls per path instead of one fnmatch per pattern.
+    """
+
+    def __init__(self, regex: str, negated: bool, dir_only: bool, anchored: bool):
+        self.regex = regex
+        self.negated = negated
+        self.dir_only = dir_only
+        self.anchored = anchored
+        self._compiled = re.compile(regex)
+
+    def matches(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return self._compiled.fullmatch(rel_path if self.anchored else name) is not None
+
+    def merge(self, other: 'IgnoreRule') -> Optional['IgnoreRule']:
+        """Combine with another rule if both can be evaluated as one."""
+        if (self.negated or other.negated or
+                self.dir_only != other.dir_only or self.anchored != other.anchored):
+            return None
+        return IgnoreRule(f"{self.regex}|{other.regex}", False, self.dir_only, self.anchored)
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob into a regex over '/'-separated paths."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                if i + 2 < n and pattern[i + 2] == '/':
+                    # "**/" matches zero or more leading directories
+                    out.append('(?:.*/)?')
+                    i += 3
+                else:
+                    out.append('.*')
+                    i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            start = i + 1
+            if start < n and pattern[start] in '!^':
+                start += 1
+            if start < n and pattern[start] == ']':
+                start += 1
+            end = pattern.find(']', start)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def parse_pattern(line: str) -> Optional[IgnoreRule]:
+    """Parse one line of a .gitignore file into a rule."""
+    line = line.rstrip('\n').rstrip('\r')
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    if not line or line.startswith('#'):
+        return None
+
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\!') or line.startswith('\\#'):
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to the ignore file's directory
+    anchored = '/' in line
+    line = line.lstrip('/')
+
+    return IgnoreRule(_glob_to_regex(line), negated, dir_only, anchored)
+
+
+def compile_patterns(lines: Iterable[str]) -> List[IgnoreRule]:
+    """Compile pattern lines, merging runs of compatible rules."""
+    rules: List[IgnoreRule] = []
+    for line in lines:
+        rule = parse_pattern(line)
+        if rule is None:
+            continue
+        merged = rules[-1].merge(rule) if rules else None
+        if merged is not None:
+            rules[-1] = merged
+        else:
+            rules.append(rule)
+    return rules
+
+
+class IgnoreMatcher:
+    """Gitignore-style matcher for paths relative to a project root.
+
+    Rules are grouped by the directory of the file that declared them
+    ('' for the root). For a given path, rule groups are applied from the
+    root down and the last matching rule wins, so a ``!pattern`` in a
+    deeper or later file re-includes what an earlier rule excluded.
+    Ancestors are not checked: callers walking the tree are expected to
+    prune ignored directories, which is what gives gitignore its "cannot
+    re-include a file if its parent directory is excluded" semantics.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._rules: Dict[str, List[IgnoreRule]] = {}
+        self.add_patterns(patterns)
+
+    @classmethod
+    def for_project(cls, root: Path, patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS) -> 'IgnoreMatcher':
+        """Build a matcher from built-in patterns and the root ignore files."""
+        matcher = cls(patterns)
+        for ignore_file in IGNORE_FILES:
+            matcher.add_ignore_file(root / ignore_file)
+        return matcher
+
+    def add_patterns(self, patterns: Iterable[str], base: str = ''):
+        """Add pattern lines declared in the directory ``base``."""
+        rules = compile_patterns(patterns)
+        if rules:
+            self._rules.setdefault(base, []).extend(rules)
+
+    def add_ignore_file(self, path: Path, base: str = ''):
+        """Add the patterns of an ignore file, if it exists."""
+        try:
+            lines = path.read_text(encoding='utf-8', errors='ignore').splitlines()
+        except OSError:
+            return
+        self.add_patterns(lines, base)
+
+    def _rule_groups(self, rel_path: str) -> List[Tuple[str, List[IgnoreRule]]]:
+        """Rule groups that apply to a path, shallowest first."""
+        groups = []
+        rules = self._rules.get('')
+        if rules:
+            groups.append(('', rules))
+        if len(self._rules) > 1:
+            index = rel_path.find('/')
+            while index != -1:
+                base = rel_path[:index]
+                rules = self._rules.get(base)
+                if rules:
+                    groups.append((base, rules))
+                index = rel_path.find('/', index + 1)
+        return groups
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Check a '/'-separated path relative to the project root."""
+        name = rel_path.rsplit('/', 1)[-1]
+        ignored = False
+        for base, rules in self._rule_groups(rel_path):
+            sub_path = rel_path[len(base) + 1:] if base else rel_path
+            for rule in rules:
+                if rule.matches(sub_path, name, is_dir):
+                    ignored = not rule.negated
+        return ignored
+
+    def is_path_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Check a path and each of its parent directories."""
+        parts = rel_path.split('/')
+        for i in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:i]), True):
+                return True
+        return self.is_ignored(rel_path, is_dir)
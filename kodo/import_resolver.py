@@ -0,0 +1,257 @@
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Extensions tried, in order, for extensionless JavaScript/TypeScript imports
+JS_EXTENSIONS = ['.ts', '.tsx', '.js', '.jsx', '.mjs', '.d.ts']
+
+_QUOTED = re.compile(r'["\'`]([^"\'`]+)["\'`]')
+_JS_SPECIFIER = re.compile(r'(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)["\'`]([^"\'`]+)["\'`]')
+_INCLUDE = re.compile(r'#\s*include\s*([<"])([^>"]+)[>"]')
+_GO_MODULE = re.compile(r'^\s*module\s+(\S+)', re.MULTILINE)
+
+
+class ImportResolver:
+    """Resolves import entries of snapshot files to other project files.
+
+    Lookup tables (module name -> file, directory -> files, path suffix ->
+    files) are built once from the file list, so resolving every import of
+    every file is linear in the number of imports rather than comparing
+    each file against every other file.
+    """
+
+    def __init__(self, file_paths: Iterable[str], root_path: Optional[Path] = None):
+        # Snapshot keys use the OS separator; work on posix paths internally
+        self._keys: Dict[str, str] = {}
+        self._python_modules: Dict[str, str] = {}
+        self._dir_files: Dict[str, List[str]] = {}
+        self._suffixes: Optional[Dict[str, List[str]]] = None
+        self._dir_suffixes: Optional[Dict[str, List[str]]] = None
+        self._go_module = self._read_go_module(root_path) if root_path else None
+
+        for key in file_paths:
+            path = key.replace('\\', '/')
+            self._keys[path] = key
+            self._dir_files.setdefault(posixpath.dirname(path), []).append(path)
+
+            module = python_module_name(path)
+            if module:
+                self._python_modules.setdefault(module, path)
+                # src-layout packages are imported without the src prefix
+                if module.startswith('src.'):
+                    self._python_modules.setdefault(module[4:], path)
+
+    @staticmethod
+    def _read_go_module(root_path: Path) -> Optional[str]:
+        try:
+            match = _GO_MODULE.search((root_path / 'go.mod').read_text(encoding='utf-8'))
+        except OSError:
+            return None
+        return match.group(1) if match else None
+
+    def resolve_file(self, file_path: str, file_data: Dict) -> List[str]:
+        """Return the project files imported by a file, in import order."""
+        path = file_path.replace('\\', '/')
+        language = file_data.get('language')
+        targets = []
+        seen = {path}
+
+        for imp in file_data.get('imports', []):
+            for target in self.resolve(path, imp, language):
+                if target not in seen:
+                    seen.add(target)
+                    targets.append(self._keys[target])
+        return targets
+
+    def resolve(self, path: str, imp, language: str) -> List[str]:
+        """Resolve a single import entry of a (posix) path."""
+        name = imp.get('name', '') if isinstance(imp, dict) else str(imp)
+        if not name:
+            return []
+
+        if language == 'python':
+            level = imp.get('level', 0) if isinstance(imp, dict) else 0
+            return self._resolve_python(path, name, level)
+        if language in ('javascript', 'typescript'):
+            return self._resolve_javascript(path, name)
+        if language in ('c', 'cpp'):
+            return self._resolve_include(path, name)
+        if language == 'go':
+            return self._resolve_go(name)
+        if language == 'java':
+            return self._resolve_java(name)
+        if language == 'rust':
+            return self._resolve_rust(path, name)
+        return []
+
+    def _resolve_python(self, path: str, name: str, level: int) -> List[str]:
+        if level:
+            package = python_module_name(path) or ''
+            parts = package.split('.') if package else []
+            if not path.endswith('__init__.py') and not path.endswith('__init__.pyi'):
+                parts = parts[:-1]
+            if level > 1:
+                parts = parts[:-(level - 1)] if len(parts) >= level - 1 else []
+            name = '.'.join(parts + [name])
+
+        # Longest importable prefix: "pkg.mod.Class" resolves to pkg/mod.py
+        parts = name.split('.')
+        for end in range(len(parts), 0, -1):
+            target = self._python_modules.get('.'.join(parts[:end]))
+            if target:
+                return [target]
+        return []
+
+    def _resolve_javascript(self, path: str, statement: str) -> List[str]:
+        match = _JS_SPECIFIER.search(statement)
+        if not match:
+            return []
+        specifier = match.group(1)
+        if not specifier.startswith(('./', '../', '/')):
+            # Bare specifiers are packages, not project files
+            return []
+
+        if specifier.startswith('/'):
+            base = posixpath.normpath(specifier.lstrip('/'))
+        else:
+            base = posixpath.normpath(posixpath.join(posixpath.dirname(path), specifier))
+
+        candidates = [base]
+        stem, ext = posixpath.splitext(base)
+        if ext in ('.js', '.jsx', '.mjs'):
+            # TypeScript sources are imported by their emitted .js name
+            candidates.extend(stem + e for e in ('.ts', '.tsx'))
+        candidates.extend(base + e for e in JS_EXTENSIONS)
+        candidates.extend(f"{base}/index{e}" for e in JS_EXTENSIONS)
+        for candidate in candidates:
+            if candidate in self._keys:
+                return [candidate]
+        return []
+
+    def _resolve_include(self, path: str, statement: str) -> List[str]:
+        match = _INCLUDE.search(statement)
+        if not match:
+            return []
+        delimiter, header = match.groups()
+        header = header.strip()
+
+        if delimiter == '"':
+            for candidate in (posixpath.normpath(posixpath.join(posixpath.dirname(path), header)),
+                              posixpath.normpath(header)):
+                if candidate in self._keys:
+                    return [candidate]
+
+        # Fall back to include directories: any file whose path ends with the header
+        matches = self._files_with_suffix(posixpath.normpath(header))
+        return matches[:1]
+
+    def _resolve_go(self, statement: str) -> List[str]:
+        targets = []
+        for import_path in _QUOTED.findall(statement):
+            directory = None
+            if self._go_module and (import_path == self._go_module or
+                                    import_path.startswith(self._go_module + '/')):
+                directory = import_path[len(self._go_module):].lstrip('/')
+            else:
+                # Without go.mod, match the longest multi-segment directory suffix
+                parts = import_path.split('/')
+                for start in range(len(parts) - 1):
+                    suffix = '/'.join(parts[start:])
+                    if suffix in self._dir_files:
+                        directory = suffix
+                        break
+            if directory is None:
+                continue
+            targets.extend(f for f in self._dir_files.get(directory, [])
+                           if f.endswith('.go') and not f.endswith('_test.go'))
+        return targets
+
+    def _resolve_java(self, statement: str) -> List[str]:
+        name = statement.strip().rstrip(';').strip()
+        name = re.sub(r'^import\s+(static\s+)?', '', name).strip()
+        parts = name.split('.')
+
+        if parts[-1] == '*':
+            directory = '/'.join(parts[:-1])
+            return [f for d in self._dirs_with_suffix(directory)
+                    for f in self._dir_files[d] if f.endswith('.java')]
+
+        # "a.b.C" or "a.b.C.member" for static imports and nested classes
+        for end in range(len(parts), 0, -1):
+            matches = self._files_with_suffix('/'.join(parts[:end]) + '.java')
+            if matches:
+                return matches[:1]
+        return []
+
+    def _resolve_rust(self, path: str, statement: str) -> List[str]:
+        name = statement.strip()
+        name = re.sub(r'^(pub(\([^)]*\))?\s+)?use\s+', '', name).rstrip(';').strip()
+        name = name.split('{', 1)[0].rstrip(':')
+        segments = [s.strip() for s in name.split('::') if s.strip()]
+        if not segments:
+            return []
+
+        directory = posixpath.dirname(path)
+        if segments[0] == 'crate':
+            # The crate root is the nearest enclosing src directory
+            src_parts = directory.split('/')
+            while src_parts and src_parts[-1] != 'src':
+                src_parts.pop()
+            directory = '/'.join(src_parts) if src_parts else posixpath.dirname(path)
+            segments = segments[1:]
+        elif segments[0] == 'self':
+            segments = segments[1:]
+        elif segments[0] == 'super':
+            while segments and segments[0] == 'super':
+                directory = posixpath.dirname(directory)
+                segments = segments[1:]
+        else:
+            # External crate
+            return []
+
+        for end in range(len(segments), 0, -1):
+            module = posixpath.join(directory, *segments[:end]) if directory else '/'.join(segments[:end])
+            for candidate in (module + '.rs', module + '/mod.rs'):
+                if candidate in self._keys:
+                    return [candidate]
+        return []
+
+    def _files_with_suffix(self, suffix: str) -> List[str]:
+        """Files equal to, or ending in '/' + suffix."""
+        if self._suffixes is None:
+            self._suffixes = _suffix_index(self._keys)
+        return self._suffixes.get(suffix, [])
+
+    def _dirs_with_suffix(self, suffix: str) -> List[str]:
+        """Directories equal to, or ending in '/' + suffix."""
+        if self._dir_suffixes is None:
+            self._dir_suffixes = _suffix_index(d for d in self._dir_files if d)
+        return self._dir_suffixes.get(suffix, [])
+
+
+def _suffix_index(paths: Iterable[str]) -> Dict[str, List[str]]:
+    """Map every component-wise suffix of each path to the paths ending in it."""
+    index: Dict[str, List[str]] = {}
+    for path in paths:
+        parts = path.split('/')
+        for start in range(len(parts)):
+            index.setdefault('/'.join(parts[start:]), []).append(path)
+    return index
+
+
+def python_module_name(path: str) -> Optional[str]:
+    """Dotted module name for a posix path to a Python file."""
+    for extension in ('.py', '.pyi'):
+        if path.endswith(extension):
+            module = path[:-len(extension)]
+            break
+    else:
+        return None
+
+    parts = module.split('/')
+    if parts[-1] == '__init__':
+        parts = parts[:-1]
+    if not parts or not all(part.isidentifier() for part in parts):
+        return None
+    return '.'.join(parts)
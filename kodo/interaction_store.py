@@ -0,0 +1,154 @@
+import json
+import math
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from kodo.search_index import STOPWORDS, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    query TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    outcome TEXT,
+    files TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interaction_files (
+    interaction_id INTEGER NOT NULL REFERENCES interactions(id),
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interaction_terms (
+    interaction_id INTEGER NOT NULL REFERENCES interactions(id),
+    term TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS key_counts (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS interaction_files_path ON interaction_files(path, interaction_id);
+CREATE INDEX IF NOT EXISTS interaction_terms_term ON interaction_terms(term, interaction_id);
+"""
+
+# A shared file counts this many times as much as an equally rare keyword
+FILE_WEIGHT = 3
+
+# Only the newest matches of each term or file are considered, so lookups
+# cost the same however long the history grows
+MATCHES_PER_KEY = 200
+
+# Query terms and files looked up at most (SQLite limits bound parameters)
+MAX_KEYS = 50
+
+
+def _terms(*texts: str) -> List[str]:
+    return list(dict.fromkeys(term for text in texts for term in tokenize(text or '')
+                              if term not in STOPWORDS))
+
+
+def _key(kind: str, value: str) -> str:
+    """Row of key_counts counting the interactions with a file or term"""
+    return f"{kind}:{value}"
+
+
+class InteractionStore:
+    """Append-only SQLite log of past interactions, indexed by file and keyword.
+
+    Each record keeps the query, response summary, files involved and
+    outcome; the files and the terms of the query and summary go into
+    separate indexed tables, so the interactions relevant to a new query
+    are found with a few index range scans.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Long-lived owners (the daemon) serialise access themselves
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def record(self, kind: str, query: str, summary: str, files: Iterable[str] = (),
+               outcome: Optional[str] = None) -> int:
+        """Append an interaction; returns its id"""
+        files = list(dict.fromkeys(files or []))
+        with self.conn as conn:
+            cursor = conn.execute(
+                "INSERT INTO interactions (created_at, kind, query, summary, outcome, files) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), kind, query, summary, outcome,
+                 json.dumps(files))
+            )
+            interaction_id = cursor.lastrowid
+            conn.executemany("INSERT INTO interaction_files (interaction_id, path) VALUES (?, ?)",
+                             [(interaction_id, path) for path in files])
+            terms = _terms(query, summary)
+            conn.executemany("INSERT INTO interaction_terms (interaction_id, term) VALUES (?, ?)",
+                             [(interaction_id, term) for term in terms])
+            conn.executemany("INSERT INTO key_counts (key, count) VALUES (?, 1) "
+                             "ON CONFLICT(key) DO UPDATE SET count = count + 1",
+                             [(_key('file', path),) for path in files] +
+                             [(_key('term', term),) for term in terms])
+        return interaction_id
+
+    def relevant(self, query: str, files: Iterable[str] = (), limit: int = 3) -> List[Dict]:
+        """Past interactions sharing files or keywords with a query, best first.
+
+        Each shared keyword adds its idf over all interactions, so rare
+        words count for more than common ones, and each shared file adds
+        FILE_WEIGHT times its idf; ties go to the most recent.
+        """
+        if not self.db_path.exists():
+            return []
+        keys = ([('term', term) for term in _terms(query)] +
+                [('file', path) for path in dict.fromkeys(files)])[:MAX_KEYS]
+        if not keys:
+            return []
+
+        names = [_key(kind, value) for kind, value in keys]
+        counts = dict(self.conn.execute(
+            f"SELECT key, count FROM key_counts WHERE key IN ({', '.join('?' * len(names))})", names))
+        total = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM interactions").fetchone()[0]
+
+        # One bounded index range scan per key that occurs at all
+        scans, params = [], []
+        for (kind, value), name in zip(keys, names):
+            if name not in counts:
+                continue
+            weight = math.log(1 + total / counts[name]) * (FILE_WEIGHT if kind == 'file' else 1)
+            table, column = ('interaction_files', 'path') if kind == 'file' else ('interaction_terms', 'term')
+            scans.append(f"SELECT * FROM (SELECT interaction_id, ? AS weight FROM {table} "
+                         f"WHERE {column} = ? ORDER BY interaction_id DESC LIMIT {MATCHES_PER_KEY})")
+            params.extend([weight, value])
+        if not scans:
+            return []
+
+        sql = (f"SELECT i.id, i.created_at, i.kind, i.query, i.summary, i.outcome, i.files, m.score "
+               f"FROM (SELECT interaction_id, SUM(weight) AS score FROM ({' UNION ALL '.join(scans)}) "
+               f"GROUP BY interaction_id ORDER BY score DESC, interaction_id DESC LIMIT ?) m "
+               f"JOIN interactions i ON i.id = m.interaction_id ORDER BY m.score DESC, i.id DESC")
+        rows = self.conn.execute(sql, params + [limit]).fetchall()
+        return [
+            {"id": row[0], "created_at": row[1], "kind": row[2], "query": row[3], "summary": row[4],
+             "outcome": row[5], "files": json.loads(row[6]), "score": row[7]}
+            for row in rows
+        ]
+
+    def __len__(self) -> int:
+        if not self.db_path.exists():
+            return 0
+        return self.conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
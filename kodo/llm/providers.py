@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional
-from litellm import completion
 import os
 
+def completion(*args, **kwargs):
+    """litellm completion; litellm takes seconds to import, so load it on first call"""
+    from litellm import completion as litellm_completion
+    return litellm_completion(*args, **kwargs)
+
 class LLMProvider(ABC):
     """Abstract base class for LLM providers"""
     
@@ -1,26 +1,61 @@
+from contextlib import nullcontext
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 import typer
 import json
 from rich.console import Console
 from rich.prompt import Confirm
-from rich.markdown import Markdown
 
 from kodo.file_ops.reader import read_file_content
 from kodo.file_ops.writer import write_file_content, show_diff
-from kodo.llm.providers import LLMManager
-from kodo.config.settings import ConfigManager
-from kodo.context_manager import ContextManager
-from kodo.agent.core import CodeAgent
+
+# Heavy modules (litellm, tree-sitter, the agent) are imported by the
+# commands that need them, so `status`/`context` start quickly
+if TYPE_CHECKING:
+    from kodo.config.settings import ConfigManager
+    from kodo.context_manager import ContextManager
+    from kodo.llm.providers import LLMManager
 
 app = typer.Typer()
 console = Console()
 
-# Global instances
-config_manager = ConfigManager()
-llm_manager = LLMManager()
+# Global instances, created on first use
+_config_manager = None
+_llm_manager = None
+
+def get_config_manager() -> "ConfigManager":
+    """Shared configuration manager"""
+    global _config_manager
+    if _config_manager is None:
+        from kodo.config.settings import ConfigManager
+        _config_manager = ConfigManager()
+    return _config_manager
+
+def get_llm_manager() -> "LLMManager":
+    """Shared LLM manager"""
+    global _llm_manager
+    if _llm_manager is None:
+        from kodo.llm.providers import LLMManager
+        _llm_manager = LLMManager()
+    return _llm_manager
+
+def markdown(text: str):
+    """Render markdown with rich, importing its markdown support on demand"""
+    from rich.markdown import Markdown
+    return Markdown(text)
 
 def ensure_configured():
-    """Ensure LLM provider is configured"""
+    """Ensure LLM provider is configured, preferring a running `kodo serve` daemon"""
+    from kodo.daemon_client import DaemonClient, DaemonProvider
+    
+    config_manager = get_config_manager()
+    llm_manager = get_llm_manager()
+    client = DaemonClient(Path.cwd())
+    daemon_status = client.ping()
+    if daemon_status and daemon_status.get("llm"):
+        llm_manager.set_provider(DaemonProvider(client))
+        return
+    
     if not config_manager.is_configured():
         console.print("LLM provider not configured!")
         console.print("Please run: python main.py configure")
@@ -38,6 +73,19 @@ def ensure_configured():
         raise typer.Exit(1)
 
 
+def get_context_manager() -> "ContextManager":
+    """Context manager for the current project, backed by the daemon when it runs"""
+    from kodo.context_manager import ContextManager
+    from kodo.daemon_client import RemoteContextManager, connect
+    
+    client = connect(Path.cwd())
+    if client:
+        return RemoteContextManager(Path.cwd(), client)
+    context_manager = ContextManager(Path.cwd())
+    context_manager.migrate_rules()
+    return context_manager
+
+
 def model_output(query: str = "", context: str = "", system_message: str = "") -> str:
     """The model will complete the queries with optional context"""
     
@@ -60,11 +108,12 @@ Keep responses concise and practical."""
         {"role": "user", "content": user_message}
     ]
     
-    return llm_manager.get_completion(messages)
+    return get_llm_manager().get_completion(messages)
 
 @app.command()
 def configure():
     """Configure LLM provider and settings"""
+    config_manager = get_config_manager()
     console.print("🔧 Configuration Setup")
     
     if config_manager.is_configured():
@@ -79,6 +128,7 @@ def configure():
 @app.command()
 def status():
     """Show current configuration status"""
+    config_manager = get_config_manager()
     console.print("Kōdō CLI Status\n")
     
     if config_manager.is_configured():
@@ -88,9 +138,22 @@ def status():
         console.print("LLM Provider: Not configured")
         console.print("Run 'python main.py configure' to set up")
 
+def make_profiler(profile: bool, profile_output: Optional[Path]):
+    """Phase profiler for --profile / --profile-output, or None"""
+    if not profile and profile_output is None:
+        return None
+    from kodo.profiling import PhaseProfiler
+    return PhaseProfiler(dump_path=profile_output)
+
 @app.command()
-def init():
+def init(jobs: int = typer.Option(1, "--jobs", "-j", help="Worker processes for parsing (0 = one per CPU)"),
+         use_git: bool = typer.Option(None, "--git/--no-git", help="List files from the git index (default: use_git in rules.cline)"),
+         profile: bool = typer.Option(False, "--profile", help="Print where snapshot generation spends its time"),
+         profile_output: Optional[Path] = typer.Option(None, "--profile-output", help="Also write cProfile stats to this file (implies --profile)")):
     """Initialize Kōdō with advanced context management"""
+    from kodo.context_manager import ContextManager
+    
+    config_manager = get_config_manager()
     console.print("Initializing Kōdō with enhanced context system...")
     
     if not config_manager.is_configured():
@@ -119,7 +182,12 @@ def init():
 
     # Initialize the enhanced context system
     context_manager = ContextManager(Path.cwd())
-    if context_manager.initialize_context():
+    profiler = make_profiler(profile, profile_output)
+    with profiler.session() if profiler else nullcontext():
+        initialized = context_manager.initialize_context(jobs=jobs, use_git=use_git, profiler=profiler)
+    if profiler:
+        profiler.print_report(console)
+    if initialized:
         console.print("\nProject initialized with intelligent context system!")
         console.print("\nAvailable commands:")
         console.print("• `Kōdō chat \"your question\"` - Chat with AI about your code")
@@ -138,21 +206,22 @@ def chat(message: str):
     console.print("Analyzing project context...")
     
     # Get intelligent context using the new system
-    context_manager = ContextManager(Path.cwd())
+    context_manager = get_context_manager()
     context = context_manager.get_context_for_query(message)
     
     # Get AI response
     try:
         response = model_output(message, context)
         console.print("\nResponse:")
-        console.print(Markdown(response))
+        console.print(markdown(response))
         
         # Log this interaction to history
         response_summary = response[:200] + "..." if len(response) > 200 else response
         context_manager.log_interaction(
             query=message,
             response_summary=response_summary,
-            files_involved=_extract_files_from_query(message)
+            files_involved=_extract_files_from_query(message),
+            outcome="answered"
         )
         
     except Exception as e:
@@ -176,7 +245,7 @@ def edit(filepath: str, prompt: str):
         raise typer.Exit(1)
     
     # Get intelligent context
-    context_manager = ContextManager(Path.cwd())
+    context_manager = get_context_manager()
     project_context = context_manager.get_context_for_query(f"edit {filepath} {prompt}")
     
     edit_prompt = f"""Please modify the following file based on this request: "{prompt}"
@@ -212,7 +281,7 @@ Return only the complete modified file content, no explanations or markdown form
         
         # Ask for confirmation
         if Confirm.ask("Apply these changes?"):
-            backup_enabled = config_manager.get('behavior.auto_backup', True)
+            backup_enabled = get_config_manager().get('behavior.auto_backup', True)
             if write_file_content(filepath, new_content, create_backup=backup_enabled):
                 console.print(f"Successfully updated {filepath}")
                 
@@ -228,7 +297,8 @@ Return only the complete modified file content, no explanations or markdown form
                 context_manager.log_interaction(
                     query=f"Edit {filepath}: {prompt}",
                     response_summary="File successfully edited and changes applied",
-                    files_involved=[filepath]
+                    files_involved=[filepath],
+                    outcome="applied"
                 )
             else:
                 console.print(f"Failed to update {filepath}")
@@ -239,7 +309,8 @@ Return only the complete modified file content, no explanations or markdown form
             context_manager.log_interaction(
                 query=f"Edit {filepath}: {prompt}",
                 response_summary="Changes generated but cancelled by user",
-                files_involved=[filepath]
+                files_involved=[filepath],
+                outcome="cancelled"
             )
     
     except Exception as e:
@@ -261,7 +332,7 @@ def generate(filename: str, prompt: str):
     
     try:
         # Get intelligent context for generation
-        context_manager = ContextManager(Path.cwd())
+        context_manager = get_context_manager()
         project_context = context_manager.get_context_for_query(f"generate {filename} {prompt}")
         
         generation_prompt = f"""Create a new file named "{filename}" based on this request: "{prompt}"
@@ -306,7 +377,8 @@ Return only the file content, no explanations or markdown formatting."""
                 context_manager.log_interaction(
                     query=f"Generate {filename}: {prompt}",
                     response_summary="New file successfully generated and created",
-                    files_involved=[filename]
+                    files_involved=[filename],
+                    outcome="created"
                 )
             else:
                 console.print(f"Failed to create {filename}")
@@ -317,7 +389,8 @@ Return only the file content, no explanations or markdown formatting."""
             context_manager.log_interaction(
                 query=f"Generate {filename}: {prompt}",
                 response_summary="File generated but creation cancelled by user",
-                files_involved=[]
+                files_involved=[],
+                outcome="cancelled"
             )
     
     except Exception as e:
@@ -327,7 +400,10 @@ Return only the file content, no explanations or markdown formatting."""
 @app.command()
 def context():
     """Show current project context information"""
+    from kodo.context_manager import ContextManager
+    
     context_manager = ContextManager(Path.cwd())
+    context_manager.migrate_rules()
     
     # Check if context exists
     if not context_manager.context_dir.exists():
@@ -339,7 +415,7 @@ def context():
     # Show overview
     if context_manager.overview_path.exists():
         overview = context_manager._load_overview()
-        console.print(Markdown(overview))
+        console.print(markdown(overview))
     
     # Show recent activity
     if context_manager.history_path.exists():
@@ -360,18 +436,31 @@ def context():
                 recent_entries.insert(0, line)
         
         if recent_entries:
-            console.print(Markdown('\n'.join(recent_entries)))
+            console.print(markdown('\n'.join(recent_entries)))
         else:
             console.print("No recent activity found")
 
 @app.command() 
-def update_context():
+def update_context(jobs: int = typer.Option(1, "--jobs", "-j", help="Worker processes for parsing (0 = one per CPU)"),
+                   full: bool = typer.Option(False, "--full", help="Re-parse every file instead of only changed ones"),
+                   hash_contents: bool = typer.Option(False, "--hash", help="Compare content hashes of touched files"),
+                   use_git: bool = typer.Option(None, "--git/--no-git", help="Detect changes with git (default: use_git in rules.cline)"),
+                   profile: bool = typer.Option(False, "--profile", help="Print where the refresh spends its time"),
+                   profile_output: Optional[Path] = typer.Option(None, "--profile-output", help="Also write cProfile stats to this file (implies --profile)")):
     """Update project context and AST snapshot"""
     console.print("Updating project context...")
+    from kodo.context_manager import ContextManager
     
     context_manager = ContextManager(Path.cwd())
-    
-    if context_manager.initialize_context():
+    context_manager.migrate_rules()
+    profiler = make_profiler(profile, profile_output)
+    with profiler.session() if profiler else nullcontext():
+        refreshed = context_manager.refresh_context(jobs=jobs, full=full, hash_contents=hash_contents,
+                                                    use_git=use_git, profiler=profiler)
+    if profiler:
+        profiler.print_report(console)
+    
+    if refreshed:
         console.print("Context updated successfully!")
         
         # Log the update
@@ -385,17 +474,72 @@ def update_context():
         console.print("Failed to update context")
         raise typer.Exit(1)
 
+@app.command()
+def export_snapshot(output: Path = typer.Argument(Path("snapshot.json"), help="Destination JSON file")):
+    """Export the AST snapshot as JSON, whichever storage backend is in use"""
+    from kodo.context_manager import ContextManager
+    
+    context_manager = ContextManager(Path.cwd())
+
+    if context_manager.export_snapshot(output):
+        console.print(f"Snapshot exported to {output}")
+    else:
+        console.print("No AST snapshot found. Run 'kodo init' first.")
+        raise typer.Exit(1)
+
+@app.command()
+def serve(stop: bool = typer.Option(False, "--stop", help="Stop the daemon serving this project")):
+    """Keep context and the LLM provider warm for this project in a background daemon"""
+    from kodo.daemon_client import DaemonClient
+    
+    client = DaemonClient(Path.cwd())
+    if stop:
+        if not client.is_running():
+            console.print("No daemon is running for this project")
+            raise typer.Exit(1)
+        client.shutdown()
+        console.print("Daemon stopped")
+        return
+    
+    from kodo.daemon import ContextDaemon
+    
+    config_manager = get_config_manager()
+    llm_manager = get_llm_manager()
+    
+    # Serve without an LLM if none is configured; clients then use their own
+    daemon_llm = None
+    if config_manager.is_configured():
+        try:
+            provider = llm_manager.create_provider(config_manager.get('llm.provider'),
+                                                   config_manager.get_llm_config())
+            llm_manager.set_provider(provider)
+            daemon_llm = llm_manager
+        except Exception as e:
+            console.print(f"Warning: LLM provider not loaded: {e}")
+    
+    try:
+        daemon = ContextDaemon(Path.cwd(), daemon_llm)
+        daemon.context_manager.migrate_rules()
+        daemon.serve_forever()
+    except RuntimeError as e:
+        console.print(str(e))
+        raise typer.Exit(1)
+    except KeyboardInterrupt:
+        pass
+    console.print("Daemon stopped")
+
 @app.command()
 def agent(goal: str, auto_approve: bool = False):
     """Run the intelligent code agent to accomplish a coding goal"""
     ensure_configured()
+    from kodo.agent.core import CodeAgent
     
     console.print("[bold cyan]Initializing Code Agent...[/bold cyan]")
     console.print(f"[dim]Goal: {goal}[/dim]")
     
     try:
         # Create the agent
-        agent = CodeAgent(llm_manager, Path.cwd())
+        agent = CodeAgent(get_llm_manager(), Path.cwd(), get_context_manager())
         
         # Execute the goal
         success = agent.execute_goal(goal, auto_approve)
@@ -0,0 +1,156 @@
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Default size budget of the on-disk cache
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Eviction trims the cache to this fraction of its budget, so it does not
+# run again on the very next write
+EVICT_TO = 0.9
+
+# Queued entries written per transaction; bounds memory on first runs
+FLUSH_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used);
+"""
+
+
+def default_cache_dir() -> Path:
+    """User-level cache directory, honouring XDG_CACHE_HOME"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'kodo' / 'parse'
+
+
+class ParseCache:
+    """Content-addressed cache of parser output, shared by all projects.
+
+    Entries are keyed by the content hash of a file plus an identifier of
+    the parser that produced them, so identical files on other branches,
+    worktrees or vendored copies are parsed once. Writes and LRU
+    timestamps are buffered and written in one transaction by ``flush``;
+    eviction then drops the least recently used entries once the cache
+    outgrows ``max_bytes``. Any SQLite failure (read-only home, locked
+    database) disables the cache instead of failing the snapshot.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.db_path = self.directory / 'cache.db'
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = False
+        self._pending: Dict[str, Tuple[str, int]] = {}
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._disabled:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(str(self.db_path), timeout=30)
+                # WAL lets parallel workers and other kodo runs read while one writes
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(SCHEMA)
+            except (OSError, sqlite3.Error):
+                self._disable()
+        return self._conn
+
+    def _disable(self):
+        self._disabled = True
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+        self._pending.clear()
+        self._touched.clear()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached parser output for a key, or None"""
+        if key in self._pending:
+            self.hits += 1
+            return json.loads(self._pending[key][0])
+        conn = self.conn
+        if conn is None:
+            return None
+        try:
+            row = conn.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            self._disable()
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched[key] = time.time()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict):
+        """Queue parser output for the next flush"""
+        if self._disabled:
+            return
+        data = json.dumps(value)
+        self._pending[key] = (data, len(data))
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Write queued entries and LRU timestamps, then evict if over budget"""
+        if not self._pending and not self._touched:
+            return
+        conn = self.conn
+        if conn is None:
+            return
+        now = time.time()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, data, size, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, data, size, now) for key, (data, size) in self._pending.items()]
+                )
+                conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(used, key) for key, used in self._touched.items()]
+                )
+            wrote = bool(self._pending)
+            self._pending.clear()
+            self._touched.clear()
+            if wrote:
+                self._evict()
+        except sqlite3.Error:
+            self._disable()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - int(self.max_bytes * EVICT_TO)
+        doomed: List[str] = []
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            doomed.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        with self.conn:
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in doomed])
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
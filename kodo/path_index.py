@@ -0,0 +1,107 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Bump when the file format or the keys indexed change
+INDEX_VERSION = 1
+
+
+def _suffixes(path: str) -> List[str]:
+    """Lookup keys of a path: each trailing run of components, plus the bare file stem.
+
+    ``kodo/agent/core.py`` gives core.py, agent/core.py, kodo/agent/core.py
+    and core, so a mention is resolved by one dictionary lookup.
+    """
+    parts = path.lower().split('/')
+    keys = ['/'.join(parts[i:]) for i in range(len(parts) - 1, -1, -1)]
+    stem = parts[-1].rsplit('.', 1)[0]
+    if stem and stem != parts[-1]:
+        keys.append(stem)
+    return keys
+
+
+def _distance(path: str, base: List[str]) -> int:
+    """Directory steps from the base directory to the directory of a path"""
+    directories = path.split('/')[:-1]
+    common = 0
+    for mine, theirs in zip(directories, base):
+        if mine != theirs:
+            break
+        common += 1
+    return (len(base) - common) + (len(directories) - common)
+
+
+class PathIndex:
+    """Resolves file mentions to snapshot paths by basename and path suffix.
+
+    This is a reversed-path trie flattened into a dictionary: every
+    trailing run of path components (and the stem of the file name) maps
+    to the files ending that way, so ``core.py``, ``agent/core.py`` or
+    ``core`` are each found in time proportional to the mention, whatever
+    the size of the snapshot.
+    """
+
+    def __init__(self, paths: List[str], suffixes: Dict[str, List[int]], source: str = ''):
+        self.paths = paths
+        self.suffixes = suffixes
+        # snapshot_id() of the snapshot the index was built from
+        self.source = source
+
+    @classmethod
+    def build(cls, paths, source: str = '') -> 'PathIndex':
+        """Index snapshot file paths"""
+        paths = list(paths)
+        suffixes: Dict[str, List[int]] = {}
+        for doc, path in enumerate(paths):
+            for key in _suffixes(path):
+                suffixes.setdefault(key, []).append(doc)
+        return cls(paths, suffixes, source)
+
+    def save(self, path: Path):
+        """Write the index as compact JSON, atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        data = json.dumps({
+            'version': INDEX_VERSION,
+            'source': self.source,
+            'paths': self.paths,
+            'suffixes': self.suffixes
+        }, separators=(',', ':'))
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['PathIndex']:
+        """Load a saved index, or None if it is missing, unreadable or outdated"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        return cls(data['paths'], data['suffixes'], data.get('source', ''))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def lookup(self, mention: str, near: str = '') -> List[str]:
+        """Snapshot paths a mention can refer to, nearest to ``near`` first.
+
+        ``near`` is a directory relative to the project root (the current
+        directory, usually). Ties go to the shorter path, then to snapshot
+        order.
+        """
+        key = mention.strip().replace('\\', '/').lower()
+        while key.startswith('./'):
+            key = key[2:]
+        docs = self.suffixes.get(key.strip('/'), [])
+        if len(docs) < 2:
+            return [self.paths[doc] for doc in docs]
+
+        base = [part for part in near.replace('\\', '/').split('/') if part and part != '.']
+        ranked = sorted(docs, key=lambda doc: (_distance(self.paths[doc], base),
+                                               self.paths[doc].count('/'), doc))
+        return [self.paths[doc] for doc in ranked]
@@ -0,0 +1,186 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Rows shown in the slowest files and directories tables
+TOP_N = 10
+
+
+class PhaseProfiler:
+    """Wall time per phase of a snapshot build, plus time per file.
+
+    Phases nest: time spent in an inner phase is not counted again in the
+    outer one, so the rows of the report add up to the measured total.
+    A disabled profiler turns every method into a cheap no-op, so callers
+    instrument unconditionally.
+    """
+
+    def __init__(self, enabled: bool = True, dump_path: Optional[Path] = None):
+        self.enabled = enabled
+        # Where the optional cProfile/pstats dump of the session is written
+        self.dump_path = dump_path
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.file_times: Dict[str, float] = {}
+        self.wall_time = 0.0
+        # Batches of worker-process times merged in
+        self.merged_batches = 0
+        # [phase, start, time spent in nested phases]
+        self._stack: List[list] = []
+
+    def start(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def stop(self) -> float:
+        """End the innermost phase; returns its elapsed time, nested phases included."""
+        name, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed - nested
+        self.counts[name] = self.counts.get(name, 0) + 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        return elapsed
+
+    def phase(self, name: str):
+        """Context manager timing a block as one call of a phase."""
+        return self._phase(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _phase(self, name: str):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def file(self, path: str):
+        """Like phase(), and also records the time spent on one file."""
+        return self._file(path) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _file(self, path: str):
+        self.start('per-file overhead')
+        try:
+            yield
+        finally:
+            self.file_times[path] = self.stop()
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """Wrap a function so every call is timed as the given phase."""
+        if not self.enabled:
+            return func
+
+        def wrapper(*args, **kwargs):
+            self.start(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.stop()
+        return wrapper
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Iterate, timing only the work done to produce each item."""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            self.start(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.stop()
+            yield item
+
+    def drain(self) -> Optional[Dict]:
+        """Hand over and reset what was recorded (sent back by worker processes)."""
+        if not self.enabled:
+            return None
+        data = {'totals': self.totals, 'counts': self.counts, 'file_times': self.file_times}
+        self.totals, self.counts, self.file_times = {}, {}, {}
+        return data
+
+    def merge(self, data: Optional[Dict]):
+        """Add phase and file times drained from a worker process."""
+        if not data:
+            return
+        for name, seconds in data['totals'].items():
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+        for name, count in data['counts'].items():
+            self.counts[name] = self.counts.get(name, 0) + count
+        self.file_times.update(data['file_times'])
+        self.merged_batches += 1
+
+    @contextmanager
+    def session(self):
+        """Measure the total wall time, under cProfile if a dump path is set."""
+        profile = None
+        if self.dump_path:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_time = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(str(self.dump_path))
+
+    def slowest_directories(self) -> List[tuple]:
+        """(directory, seconds, files) by total time of the files directly inside."""
+        directories: Dict[str, list] = {}
+        for path, seconds in self.file_times.items():
+            entry = directories.setdefault(os.path.dirname(path) or '.', [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+        return sorted(((d, s, n) for d, (s, n) in directories.items()),
+                      key=lambda row: row[1], reverse=True)[:TOP_N]
+
+    def print_report(self, console):
+        """Print the phase breakdown and the slowest files and directories."""
+        from rich.table import Table
+
+        measured = sum(self.totals.values())
+        total = max(self.wall_time, measured)
+        table = Table(title="Profile")
+        table.add_column("Phase")
+        table.add_column("Time (s)", justify="right")
+        table.add_column("%", justify="right")
+        table.add_column("Calls", justify="right")
+        for name, seconds in sorted(self.totals.items(), key=lambda item: item[1], reverse=True):
+            share = f"{seconds / total * 100:.1f}" if total else "-"
+            table.add_row(name, f"{seconds:.3f}", share, f"{self.counts.get(name, 0):,}")
+        if self.wall_time:
+            table.add_row("unaccounted", f"{max(self.wall_time - measured, 0.0):.3f}", "", "")
+            table.add_row("total (wall)", f"{self.wall_time:.3f}", "", "")
+        console.print(table)
+        if self.merged_batches:
+            console.print(f"Per-file phases include {self.merged_batches} batches parsed by worker "
+                          "processes; their times are summed and can exceed the wall time.")
+
+        if self.file_times:
+            files = Table(title="Slowest files")
+            files.add_column("File")
+            files.add_column("Time (ms)", justify="right")
+            for path, seconds in sorted(self.file_times.items(), key=lambda item: item[1],
+                                        reverse=True)[:TOP_N]:
+                files.add_row(path, f"{seconds * 1000:.1f}")
+            console.print(files)
+
+            directories = Table(title="Slowest directories")
+            directories.add_column("Directory")
+            directories.add_column("Time (ms)", justify="right")
+            directories.add_column("Files", justify="right")
+            for directory, seconds, count in self.slowest_directories():
+                directories.add_row(directory, f"{seconds * 1000:.1f}", f"{count:,}")
+            console.print(directories)
+
+        if self.dump_path:
+            console.print(f"cProfile stats written to {self.dump_path} "
+                          f"(python -m pstats {self.dump_path})")
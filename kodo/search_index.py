@@ -0,0 +1,358 @@
+import bisect
+import json
+import math
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Bump when tokenization or the file format changes
+INDEX_VERSION = 1
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+# Term weights per field: a term in the path counts three times, in a
+# class or function name twice, in an import once
+PATH_WEIGHT = 3
+SYMBOL_WEIGHT = 2
+IMPORT_WEIGHT = 1
+
+# Query terms this long also match index terms they are a prefix of
+# ("auth" -> "authentication"), at a discount and up to a limit
+MIN_PREFIX = 3
+PREFIX_DISCOUNT = 0.5
+MAX_PREFIX_TERMS = 50
+
+# Terms in more than this fraction of files do not select candidate
+# files; they only add to the scores of files rarer terms matched. A term
+# in fewer files than the floor is never common, so small repositories get
+# exact BM25 rankings
+COMMON_TERM_FRACTION = 0.1
+COMMON_TERM_FLOOR = 1000
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me my of on or
+please show that the this to what when where which why with you
+""".split())
+
+_WORD = re.compile(r'[A-Za-z0-9_]+')
+_PART = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, splitting identifiers as well.
+
+    Each identifier is kept whole and split into its snake_case and
+    camelCase parts: ``getHTTPResponse_v2`` gives gethttpresponse_v2,
+    gethttpresponse, v2, get, http and response. Single characters and
+    bare numbers are dropped.
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        if len(lower) > 1 and not lower.isdigit():
+            terms.append(lower)
+        pieces = [piece for piece in word.split('_') if piece]
+        if len(pieces) > 1:
+            terms.extend(p.lower() for p in pieces if len(p) > 1 and not p.isdigit())
+        for piece in pieces:
+            parts = _PART.findall(piece)
+            if len(parts) > 1:
+                terms.extend(p.lower() for p in parts if len(p) > 1 and not p.isdigit())
+    return terms
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy if it is installed, else None (batch scoring then runs in pure Python)"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _posting_position(flat: List[int], doc: int) -> int:
+    """Index of doc in a flat [doc, tf, ...] posting list (sorted by doc), or -1"""
+    low, high = 0, len(flat) // 2
+    while low < high:
+        middle = (low + high) // 2
+        if flat[2 * middle] < doc:
+            low = middle + 1
+        else:
+            high = middle
+    return 2 * low if 2 * low < len(flat) and flat[2 * low] == doc else -1
+
+
+def _names(entries: List) -> Iterable[str]:
+    for entry in entries:
+        name = entry.get('name') if isinstance(entry, dict) else entry
+        if name:
+            yield name
+
+
+def snapshot_id(meta: Dict) -> str:
+    """Identify a snapshot revision; an index is only valid for the one it was built from."""
+    return f"{meta.get('created_at', '')}|{meta.get('updated_at', '')}"
+
+
+class SearchIndex:
+    """BM25 inverted index over snapshot file paths, symbol names and imports.
+
+    Postings map each term to a flat [doc, weighted tf, doc, tf, ...]
+    list in increasing doc order, which is also how they are stored on
+    disk, keeping the JSON compact and quick to load.
+    """
+
+    def __init__(self, paths: List[str], lengths: List[int], postings: Dict[str, List[int]],
+                 source: str = ''):
+        self.paths = paths
+        self.lengths = lengths
+        self.postings = postings
+        # snapshot_id() of the snapshot the index was built from
+        self.source = source
+        self.avg_length = (sum(lengths) / len(lengths) if lengths else 0.0) or 1.0
+        # Length normalisation of each file, the tf-independent part of BM25
+        self.norms = [K1 * (1 - B + B * length / self.avg_length) for length in lengths]
+        self._terms: Optional[List[str]] = None
+        # NumPy copy of norms and the rank of each path in sorted order,
+        # made by the first batch search that uses NumPy
+        self._norm_array = None
+        self._path_ranks = None
+
+    @classmethod
+    def build(cls, files: Iterable[Tuple[str, Dict]], source: str = '') -> 'SearchIndex':
+        """Index (path, file data) pairs from a snapshot"""
+        paths = []
+        lengths = []
+        term_docs: Dict[str, Dict[int, int]] = {}
+        # Symbol and import names repeat a lot across files
+        tokenized: Dict[str, List[str]] = {}
+
+        def terms_of(name: str) -> List[str]:
+            terms = tokenized.get(name)
+            if terms is None:
+                terms = tokenized[name] = tokenize(name)
+            return terms
+
+        for doc, (path, data) in enumerate(files):
+            weights: Dict[str, int] = {}
+            for term in tokenize(path):
+                weights[term] = weights.get(term, 0) + PATH_WEIGHT
+            for category in ('classes', 'functions'):
+                for name in _names(data.get(category, [])):
+                    for term in terms_of(name):
+                        weights[term] = weights.get(term, 0) + SYMBOL_WEIGHT
+            for name in _names(data.get('imports', [])):
+                for term in terms_of(name):
+                    weights[term] = weights.get(term, 0) + IMPORT_WEIGHT
+
+            paths.append(path)
+            lengths.append(sum(weights.values()))
+            for term, weight in weights.items():
+                term_docs.setdefault(term, {})[doc] = weight
+
+        # Sorted terms let prefix lookups bisect instead of scanning
+        postings = {}
+        for term in sorted(term_docs):
+            flat = []
+            for doc, weight in term_docs[term].items():
+                flat.append(doc)
+                flat.append(weight)
+            postings[term] = flat
+        return cls(paths, lengths, postings, source)
+
+    def save(self, path: Path):
+        """Write the index as compact JSON, atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        # json.dumps runs entirely in C; json.dump would encode chunk by chunk in Python
+        data = json.dumps({
+            'version': INDEX_VERSION,
+            'source': self.source,
+            'paths': self.paths,
+            'lengths': self.lengths,
+            'postings': self.postings
+        }, separators=(',', ':'))
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['SearchIndex']:
+        """Load a saved index, or None if it is missing, unreadable or outdated"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        return cls(data['paths'], data['lengths'], data['postings'], data.get('source', ''))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def terms(self) -> List[str]:
+        if self._terms is None:
+            # Saved in sorted order, so this normally does not sort anything
+            self._terms = list(self.postings)
+            if any(a > b for a, b in zip(self._terms, self._terms[1:])):
+                self._terms.sort()
+        return self._terms
+
+    def _prefix_terms(self, term: str) -> List[str]:
+        """Index terms that a query term is a proper prefix of"""
+        if len(term) < MIN_PREFIX:
+            return []
+        terms = self.terms
+        start = bisect.bisect_right(terms, term)
+        matches = []
+        for candidate in terms[start:start + MAX_PREFIX_TERMS]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def _idf(self, frequency: int) -> float:
+        count = len(self.paths)
+        return math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+
+    def _matches(self, query_terms) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+        """(term, boost) pairs of the index terms a query matches exactly and by prefix"""
+        exact = [(term, 1.0) for term in query_terms if term in self.postings]
+        prefixed = [(candidate, PREFIX_DISCOUNT) for candidate in dict.fromkeys(
+            candidate for term in query_terms for candidate in self._prefix_terms(term)
+            if candidate not in query_terms)]
+        return exact, prefixed
+
+    def _plan(self, query: str) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+        """(term, weight) pairs that select candidate files and that only add to their scores.
+
+        Candidate files are selected by the rare exact terms of the query,
+        or by rare prefix matches if no exact term is rare. All other
+        terms then only add to the scores of those candidates, looking each
+        candidate up in their postings by binary search, so a query costs
+        about the size of its rarest postings (times the log of the common
+        ones) instead of visiting every file that contains a common word. Weights are the idf of
+        the term times its boost; each list is in increasing postings size.
+        """
+        query_terms = dict.fromkeys(t for t in tokenize(query) if t not in STOPWORDS)
+        if not query_terms or not self.paths:
+            return [], []
+
+        postings = self.postings
+        common = max(len(self.paths) * COMMON_TERM_FRACTION, COMMON_TERM_FLOOR)
+        exact, prefixed = self._matches(query_terms)
+
+        def rare(matches):
+            return [match for match in matches if len(postings[match[0]]) // 2 <= common]
+
+        selectors = rare(exact) or rare(prefixed) or exact + prefixed
+        others = [match for match in exact + prefixed if match not in selectors]
+
+        def weighted(matches):
+            return [(term, self._idf(len(postings[term]) // 2) * boost)
+                    for term, boost in sorted(matches, key=lambda match: len(postings[match[0]]))]
+        return weighted(selectors), weighted(others)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Files ranked by BM25 score for a free-text query, best first"""
+        selectors, others = self._plan(query)
+        postings = self.postings
+        norms = self.norms
+        scores: Dict[int, float] = {}
+        for matches, restricted in ((selectors, False), (others, True)):
+            for term, idf in matches:
+                flat = postings[term]
+                size = len(flat) // 2
+                if not restricted:
+                    pairs = zip(flat[0::2], flat[1::2])
+                elif len(scores) * size.bit_length() < size:
+                    # Look the candidates up in the postings rather than walk them
+                    pairs = [(doc, flat[position + 1]) for doc in scores
+                             for position in (_posting_position(flat, doc),) if position >= 0]
+                else:
+                    pairs = [(doc, tf) for doc, tf in zip(flat[0::2], flat[1::2]) if doc in scores]
+                for doc, tf in pairs:
+                    scores[doc] = scores.get(doc, 0.0) + idf * (tf * (K1 + 1) / (tf + norms[doc]))
+
+        # Ties go to the first path in sorted order, as in search_batch
+        paths = self.paths
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], paths[item[0]]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.paths[doc], score) for doc, score in ranked]
+
+    def search_batch(self, queries: List[str], limit: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """Rank files for many queries at once, one ranking per query.
+
+        With NumPy installed, the queries form a sparse query-term matrix
+        that is multiplied with the term-document matrix of BM25 weights,
+        so each posting list is converted and weighted once however many
+        queries share the term. Without it, each query is searched in turn.
+        Rankings are the same as search() gives either way: scores are
+        computed with the same operations, summed in the same term order,
+        and ties are broken by path.
+        """
+        numpy = _numpy()
+        if numpy is None or not self.paths:
+            return [self.search(query, limit) for query in queries]
+
+        plans = [self._plan(query) for query in queries]
+        if self._norm_array is None:
+            self._norm_array = numpy.array(self.norms)
+        if self._path_ranks is None:
+            self._path_ranks = numpy.empty(len(self.paths), dtype=numpy.int64)
+            self._path_ranks[sorted(range(len(self.paths)), key=self.paths.__getitem__)] = \
+                numpy.arange(len(self.paths))
+        # term -> (docs, BM25 term weights without idf), shared by all queries
+        weights: Dict[str, tuple] = {}
+
+        def term_weights(term):
+            if term not in weights:
+                flat = numpy.array(self.postings[term])
+                docs, tfs = flat[0::2], flat[1::2]
+                weights[term] = docs, tfs * (K1 + 1) / (tfs + self._norm_array[docs])
+            return weights[term]
+
+        # Selecting terms: one (query, file, score) triple per posting, summed
+        # into a dense queries x files matrix, which is the matrix product
+        count = len(self.paths)
+        rows, columns, values = [], [], []
+        for number, (selectors, _) in enumerate(plans):
+            for term, idf in selectors:
+                docs, saturation = term_weights(term)
+                rows.append(numpy.full(len(docs), number))
+                columns.append(docs)
+                values.append(saturation * idf)
+        if not rows:
+            return [[] for _ in queries]
+        cells = numpy.concatenate(rows) * count + numpy.concatenate(columns)
+        scores = numpy.bincount(cells, weights=numpy.concatenate(values),
+                                minlength=len(queries) * count).reshape(len(queries), count)
+
+        # Other terms only add to files their query already selected
+        for number, (_, others) in enumerate(plans):
+            row = scores[number]
+            for term, idf in others:
+                docs, saturation = term_weights(term)
+                selected = row[docs] != 0
+                row[docs[selected]] += saturation[selected] * idf
+
+        rankings = []
+        for row in scores:
+            matched = numpy.flatnonzero(row)
+            if limit is not None and len(matched) > limit:
+                # Keep everything tied with the last place, then order by (-score, path)
+                threshold = numpy.partition(row[matched], -limit)[-limit]
+                matched = matched[row[matched] >= threshold]
+            ordered = matched[numpy.lexsort((self._path_ranks[matched], -row[matched]))]
+            if limit is not None:
+                ordered = ordered[:limit]
+            rankings.append([(self.paths[doc], float(row[doc])) for doc in ordered])
+        return rankings
@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# Bump when the schema changes; recorded as the database's user_version.
+# Version 1 also had symbols and imports tables, which nothing read
+SCHEMA_VERSION = 2
+
+SCHEMA = f"""
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+# Snapshot sections stored whole in the meta table
+SECTIONS = ('meta', 'summary', 'indexes')
+
+
+class SnapshotStore:
+    """SQLite-backed AST snapshot with per-file lazy loading.
+
+    Each file entry is its own row, so context building loads only the
+    files it uses (path and keyword lookups go through the search and path
+    indexes). ``load_snapshot``/``export_json`` rebuild the regular
+    dictionary form when it is needed.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Long-lived owners (the daemon) may use the store from several
+            # threads; they serialise access themselves
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def exists(self) -> bool:
+        return self.db_path.exists()
+
+    def write_snapshot(self, snapshot: Dict):
+        """Replace the stored snapshot.
+
+        The database is built under a temporary name and moved into place,
+        so readers never see a half-written snapshot.
+        """
+        self.close()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.db_path.with_name(f"{self.db_path.name}.{os.getpid()}.tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        conn = sqlite3.connect(str(tmp_path))
+        try:
+            conn.executescript(SCHEMA)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)",
+                    [(section, json.dumps(snapshot.get(section, {}))) for section in SECTIONS]
+                )
+                conn.executemany(
+                    "INSERT INTO files (path, data) VALUES (?, ?)",
+                    ((path, json.dumps(data)) for path, data in snapshot.get('files', {}).items())
+                )
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, self.db_path)
+
+    def get_section(self, section: str) -> Dict:
+        """Load one of the whole-snapshot sections (meta, summary, indexes)."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (section,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def get(self, key: str, default=None):
+        """Dictionary-style access to snapshot sections"""
+        if key in SECTIONS:
+            return self.get_section(key)
+        if key == 'files':
+            return dict(self.iter_files())
+        return default
+
+    def get_file(self, path: str) -> Optional[Dict]:
+        """Load a single file entry"""
+        row = self.conn.execute("SELECT data FROM files WHERE path = ?", (path,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_files(self) -> Iterator[Tuple[str, Dict]]:
+        """Iterate over all file entries in snapshot order"""
+        for path, data in self.conn.execute("SELECT path, data FROM files ORDER BY id"):
+            yield path, json.loads(data)
+
+    def load_snapshot(self) -> Dict:
+        """Rebuild the full snapshot dictionary"""
+        snapshot = {section: self.get_section(section) for section in SECTIONS}
+        snapshot['files'] = dict(self.iter_files())
+        return {key: snapshot[key] for key in ('meta', 'files', 'summary', 'indexes')}
+
+    def export_json(self, path: Path):
+        """Write the snapshot in the JSON format used by save_ast_snapshot"""
+        from kodo.ast_generator import save_ast_snapshot
+        save_ast_snapshot(self.load_snapshot(), path)